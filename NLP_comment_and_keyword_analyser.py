@@ -1,43 +1,265 @@
-from sentence_transformers import SentenceTransformer, util
-import torch
+from collections import namedtuple
+import os
+import threading
 import warnings
 
+import numpy as np
+
+from config import env_flag
+from embedding_cache import cache_from_env
+import startup_report
+from metrics import span
+
 # Suppress transformer and CUDA warnings
 warnings.filterwarnings("ignore", category=UserWarning)
 
-# ✅ Load the lightweight model globally
-model = SentenceTransformer('sentence-transformers/paraphrase-MiniLM-L6-v2')
+MODEL_NAME = 'sentence-transformers/paraphrase-MiniLM-L6-v2'
+
+# Inference backends selectable with STEGO_NLP_BACKEND:
+#   torch      - fp32 PyTorch (default)
+#   torch-int8 - PyTorch with dynamically quantized int8 Linear layers
+#   onnx       - ONNX Runtime (needs `optimum[onnxruntime]` installed)
+BACKENDS = ("torch", "torch-int8", "onnx")
+BACKEND = os.getenv("STEGO_NLP_BACKEND", "torch")
+
+# Loaded on first use by get_model(); torch is not imported until then
+model = None
+_models = {}
+_model_lock = threading.Lock()
+
+# Comments encoded per forward pass
+DEFAULT_BATCH_SIZE = 64
+
+# Embeddings of previously seen comments and keywords
+embedding_cache = cache_from_env(MODEL_NAME)
+
+MatchResult = namedtuple("MatchResult", ["keyword", "score", "comment"])
+
+
+def _load_model(backend):
+    with startup_report.timed("nlp_import"):
+        from sentence_transformers import SentenceTransformer
 
-def find_best_match(keywords, comments, threshold=0.4):
+    with startup_report.timed("nlp_model_load"):
+        if backend == "torch":
+            return SentenceTransformer(MODEL_NAME)
+
+        if backend == "torch-int8":
+            import torch
+            fp32_model = SentenceTransformer(MODEL_NAME, device="cpu")
+            return torch.ao.quantization.quantize_dynamic(fp32_model, {torch.nn.Linear}, dtype=torch.qint8)
+
+        if backend == "onnx":
+            try:
+                return SentenceTransformer(MODEL_NAME, device="cpu", backend="onnx")
+            except ImportError as e:
+                raise RuntimeError(f"❌ ONNX backend requires optimum[onnxruntime]: {e}")
+
+    raise ValueError(f"Unknown NLP backend: {backend}. Choose one of {', '.join(BACKENDS)}")
+
+
+def get_model(backend=None):
+    """Returns the shared SentenceTransformer for `backend`, loading it once in a thread-safe way."""
+    global model
+    backend = backend or BACKEND
+    loaded = _models.get(backend)
+    if loaded is None:
+        with _model_lock:
+            loaded = _models.get(backend)
+            if loaded is None:
+                loaded = _models[backend] = _load_model(backend)
+                if backend == BACKEND:
+                    model = loaded
+    return loaded
+
+
+def preload_model():
     """
-    Finds the keyword that best matches any of the comments based on semantic similarity.
+    Loads the model eagerly.
+
+    Called in the gunicorn master when STEGO_PRELOAD_MODEL is set, so forked
+    workers share the weights copy-on-write instead of each loading a copy.
+    """
+    get_model()
+
+
+def preload_requested():
+    return env_flag("STEGO_PRELOAD_MODEL")
+
+
+def encode_texts(texts, batch_size=DEFAULT_BATCH_SIZE, backend=None):
+    """Embeds `texts` through the embedding cache; only unseen texts reach the model."""
+    backend = backend or BACKEND
+
+    def encode(pending):
+        with span("embed", backend=backend):
+            return get_model(backend).encode(pending, batch_size=batch_size, convert_to_numpy=True)
+
+    return embedding_cache.encode(
+        encode,
+        texts,
+        namespace=f"{MODEL_NAME}:{backend}",
+    )
+
+
+def _normalize_rows(embeddings):
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class StreamingMatcher:
+    """
+    Scores comments against keywords as they arrive, keeping the best pair.
+
+    Keywords are encoded on the first non-empty feed, so a post without
+    comments never touches the model.
+    """
+
+    def __init__(self, keywords, threshold=0.4, batch_size=DEFAULT_BATCH_SIZE, certain_threshold=None, backend=None):
+        self.keywords = keywords
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.certain_threshold = certain_threshold
+        self.backend = backend
+        self.best = None
+        self.comments_seen = 0
+        self._keyword_embeddings = None
+        # keyword index -> best MatchResult for that keyword (scores >= threshold only)
+        self._by_keyword = {}
+
+    @property
+    def certain(self):
+        """True once a score reached certain_threshold; later comments cannot change the outcome that matters."""
+        return bool(self.best and self.certain_threshold is not None and self.best.score >= self.certain_threshold)
+
+    def feed(self, comments):
+        """
+        Scores a page of comments in batches of `batch_size`.
+
+        Returns:
+            bool: True if the match is certain and no more comments are needed.
+        """
+        if not self.keywords:
+            self.comments_seen += len(comments)
+            return False
+
+        for start in range(0, len(comments), self.batch_size):
+            if self.certain:
+                break
+            batch = comments[start:start + self.batch_size]
+            self.comments_seen += len(batch)
+
+            # ✅ Batch encode keywords once
+            if self._keyword_embeddings is None:
+                self._keyword_embeddings = _normalize_rows(encode_texts(self.keywords, backend=self.backend))
+
+            comment_embeddings = _normalize_rows(encode_texts(batch, self.batch_size, self.backend))
+            similarity_scores = comment_embeddings @ self._keyword_embeddings.T  # Shape: (len(batch), len(keywords))
+
+            # argmax over the flattened matrix keeps the first comment/keyword on ties
+            flat_idx = int(np.argmax(similarity_scores))
+            comment_idx, keyword_idx = divmod(flat_idx, len(self.keywords))
+            max_score = float(similarity_scores[comment_idx, keyword_idx])
+
+            if max_score > (self.best.score if self.best else 0.0) and max_score >= self.threshold:
+                self.best = MatchResult(self.keywords[keyword_idx], max_score, batch[comment_idx])
+
+            # Best comment per keyword, for the runner-up candidates
+            for keyword_idx, comment_idx in enumerate(np.argmax(similarity_scores, axis=0)):
+                score = float(similarity_scores[comment_idx, keyword_idx])
+                current = self._by_keyword.get(keyword_idx)
+                if score >= self.threshold and (current is None or score > current.score):
+                    self._by_keyword[keyword_idx] = MatchResult(self.keywords[keyword_idx], score, batch[comment_idx])
+
+        return self.certain
+
+    def candidates(self, limit=None):
+        """
+        Keywords that passed threshold, best score first, one entry per distinct keyword.
+
+        The first entry is the same keyword as `best`.
+
+        Returns:
+            list: MatchResult per keyword, at most `limit` of them.
+        """
+        ranked = [self.best] if self.best else []
+        seen = {match.keyword for match in ranked}
+        for keyword_idx, match in sorted(self._by_keyword.items(), key=lambda item: (-item[1].score, item[0])):
+            if match.keyword not in seen:
+                seen.add(match.keyword)
+                ranked.append(match)
+        return ranked[:limit]
+
+
+def find_best_match_details(keywords, comments, threshold=0.4, batch_size=DEFAULT_BATCH_SIZE, certain_threshold=None, backend=None):
+    """
+    Finds the keyword/comment pair with the highest semantic similarity.
+
+    Comments are encoded in batches of `batch_size` and each batch is scored
+    against every keyword with a single similarity matrix.
 
     Args:
         keywords (list): List of keyword strings.
         comments (list): List of comment strings.
         threshold (float): Minimum cosine similarity to accept a match.
+        batch_size (int): Number of comments encoded per forward pass.
+        certain_threshold (float or None): Stop encoding further batches once a
+            score reaches this value.
+        backend (str or None): Inference backend; defaults to STEGO_NLP_BACKEND.
 
     Returns:
-        str or None: Best matching keyword, or None if no match passes threshold.
+        MatchResult or None: Best keyword, its score and the matching comment,
+        or None if no match passes threshold.
     """
     if not keywords or not comments:
         return None
 
-    # ✅ Batch encode keywords once
-    keyword_embeddings = model.encode(keywords, convert_to_tensor=True)
+    matcher = StreamingMatcher(keywords, threshold, batch_size, certain_threshold, backend)
+    matcher.feed(comments)
+    return matcher.best
+
 
-    best_score = 0.0
-    matched_keyword = None
+def find_best_match_in_pages(keywords, pages, threshold=0.4, batch_size=DEFAULT_BATCH_SIZE, certain_threshold=None, backend=None):
+    """
+    Like find_best_match_details, but consumes comments page by page.
 
-    for comment in comments:
-        comment_embedding = model.encode(comment, convert_to_tensor=True)
-        similarity_scores = util.cos_sim(comment_embedding, keyword_embeddings)[0]  # Shape: (len(keywords),)
+    Once a score reaches certain_threshold the remaining pages are never
+    requested: `pages` is closed, which stops a scraper generator from
+    fetching further pages.
 
-        max_score = float(torch.max(similarity_scores))
-        max_idx = int(torch.argmax(similarity_scores))
+    Args:
+        keywords (list): List of keyword strings.
+        pages (iterable): Iterable of comment lists, e.g. from comment_scraper.iter_comment_pages.
 
-        if max_score > best_score and max_score >= threshold:
-            best_score = max_score
-            matched_keyword = keywords[max_idx]
+    Returns:
+        tuple: (MatchResult or None, number of comments scored)
+    """
+    matcher = StreamingMatcher(keywords, threshold, batch_size, certain_threshold, backend)
+    try:
+        for page in pages:
+            if matcher.feed(page):
+                break
+    finally:
+        close = getattr(pages, "close", None)
+        if close is not None:
+            close()
+    return matcher.best, matcher.comments_seen
+
+
+def find_best_match(keywords, comments, threshold=0.4, batch_size=DEFAULT_BATCH_SIZE, certain_threshold=None, backend=None):
+    """
+    Finds the keyword that best matches any of the comments based on semantic similarity.
 
-    return matched_keyword
+    Args:
+        keywords (list): List of keyword strings.
+        comments (list): List of comment strings.
+        threshold (float): Minimum cosine similarity to accept a match.
+        batch_size (int): Number of comments encoded per forward pass.
+        certain_threshold (float or None): Stop early once a score reaches this value.
+        backend (str or None): Inference backend; defaults to STEGO_NLP_BACKEND.
+
+    Returns:
+        str or None: Best matching keyword, or None if no match passes threshold.
+    """
+    match = find_best_match_details(keywords, comments, threshold, batch_size, certain_threshold, backend)
+    return match.keyword if match else None
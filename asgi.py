@@ -0,0 +1,139 @@
+import asyncio
+import contextlib
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+from decrypt_pipeline import (
+    parse_form, wants_job, submit_decrypt_job, download_carrier, extract_carrier, combine_containers, check_window,
+    open_comment_stream, new_matcher, decrypt_matched, DOWNLOAD_TIMEOUT, DEBUG_TIMINGS,
+)
+from stage_timer import StageTimer
+import warmup
+from final import app as flask_app, REQUEST_SECONDS, CORS_ORIGINS, CORS_CREDENTIALS
+
+# ASGI service mode: /decrypt runs on the event loop, every other route is the
+# unchanged Flask app mounted through a WSGI bridge.
+#
+#   uvicorn asgi:app --host 0.0.0.0 --port 10000
+#
+# The scrapers and the image download use blocking clients, so network stages
+# are awaited on a wide I/O pool; decode, extraction, NLP match and decryption
+# run on a small CPU pool so they cannot starve the network stages.
+ASGI_IO_THREADS = int(os.getenv("STEGO_ASGI_IO_THREADS", "64"))
+ASGI_CPU_THREADS = int(os.getenv("STEGO_ASGI_CPU_THREADS", str(os.cpu_count() or 1)))
+# Threads the WSGI bridge uses for the mounted Flask routes
+ASGI_WSGI_THREADS = int(os.getenv("STEGO_ASGI_WSGI_THREADS", "8"))
+
+IO_EXECUTOR = ThreadPoolExecutor(max_workers=ASGI_IO_THREADS, thread_name_prefix="asgi-io")
+CPU_EXECUTOR = ThreadPoolExecutor(max_workers=ASGI_CPU_THREADS, thread_name_prefix="asgi-cpu")
+
+
+def _run(executor, timer, stage, fn, *args):
+    """Schedules fn on executor under a timer stage and returns an awaitable future."""
+    return asyncio.get_running_loop().run_in_executor(executor, timer.wrap(stage, fn, *args))
+
+
+async def run_decrypt(form):
+    """
+    Async counterpart of decrypt_pipeline.run_decrypt with the same bodies and statuses.
+
+    Returns:
+        tuple: (response body dict, HTTP status, StageTimer)
+    """
+    timer = StageTimer()
+
+    params, error = parse_form(form)
+    if error:
+        return (*error, timer)
+
+    loop = asyncio.get_running_loop()
+    comment_pages = open_comment_stream(params["comment_url"], timer)
+
+    try:
+        # Every shard of a sharded message is downloaded at once
+        try:
+            download_results = await asyncio.wait_for(asyncio.gather(*[
+                _run(IO_EXECUTOR, timer, "download", download_carrier, url) for url in params["image_urls"]
+            ]), timeout=DOWNLOAD_TIMEOUT)
+        except asyncio.TimeoutError:
+            return {'error': 'Timed out downloading image'}, 504, timer
+
+        container_result = combine_containers(await asyncio.gather(*[
+            _run(CPU_EXECUTOR, timer, "extract", extract_carrier, url, download_result)
+            for url, download_result in zip(params["image_urls"], download_results)
+        ]))
+        if not container_result["success"]:
+            return {'error': container_result["error"]}, container_result["status"], timer
+
+        error = check_window(params, container_result["container"])
+        if error:
+            return (*error, timer)
+
+        # Waiting for a page holds an I/O thread, scoring it a CPU thread
+        matcher = new_matcher(params)
+        try:
+            with timer.measure("match"):
+                while True:
+                    page = await loop.run_in_executor(IO_EXECUTOR, comment_pages.next_page)
+                    if page is None or await loop.run_in_executor(CPU_EXECUTOR, matcher.feed, page):
+                        break
+        except TimeoutError:
+            return {'error': 'Timed out fetching comments'}, 504, timer
+
+        body, status = await loop.run_in_executor(
+            CPU_EXECUTOR, decrypt_matched, params, container_result["container"], matcher, timer
+        )
+        return body, status, timer
+    finally:
+        # Stops the scrape before its next page if it is still running
+        comment_pages.close()
+
+
+async def decrypt_handler(request):
+    started = time.perf_counter()
+    response = await _decrypt_response(request)
+    REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="decrypt_handler", status=str(response.status_code))
+    return response
+
+
+async def _decrypt_response(request):
+    try:
+        form = await request.form()
+        if wants_job(form):
+            body, status = submit_decrypt_job(form)
+            return JSONResponse(body, status_code=status)
+
+        body, status, timer = await run_decrypt(form)
+        headers = {'Server-Timing': timer.server_timing_header()} if DEBUG_TIMINGS else None
+        return JSONResponse(body, status_code=status, headers=headers)
+
+    except Exception as e:
+        traceback.print_exc()
+        return JSONResponse({'error': f'Decryption failed: {str(e)}'}, status_code=500)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    # Warm-up runs in its own thread; /readyz reports when it is done
+    warmup.start()
+    yield
+
+
+# Same CORS policy as the Flask app; it answers preflights for every route,
+# including /decrypt, which never reaches Flask
+app = Starlette(lifespan=lifespan, routes=[
+    Route('/decrypt', decrypt_handler, methods=['POST']),
+    Mount('/', app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)),
+], middleware=[
+    Middleware(CORSMiddleware, allow_origins=CORS_ORIGINS, allow_credentials=CORS_CREDENTIALS,
+               allow_methods=["*"], allow_headers=["*"]),
+])
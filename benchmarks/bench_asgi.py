@@ -0,0 +1,130 @@
+"""
+Sync gunicorn vs ASGI (uvicorn) /decrypt throughput and latency under load.
+
+Both servers run benchmarks.stubbed_app, so the image download and the comment
+scrape hit a local stub server that adds a fixed delay to each scrape.
+
+Usage:
+    python -m benchmarks.bench_asgi [--requests N] [--concurrency 8,32] \\
+        [--scrape-delay 0.2] [--gunicorn-workers 2] [--stub-nlp]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import requests
+
+from benchmarks.common import synthetic_image, synthetic_comments
+from benchmarks.stub_server import StubServer
+from stego_encoder import hide_message_in_bytes
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEYWORD = "coffee"
+MESSAGE = "benchmark secret"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, env, workers):
+    if kind == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(workers),
+               "-b", f"127.0.0.1:{port}", "benchmarks.stubbed_app:wsgi_app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "benchmarks.stubbed_app:asgi_app",
+               "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"]
+    proc = subprocess.Popen(cmd, cwd=REPO_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            requests.get(url + "/", timeout=5)
+            return proc, url
+        except requests.RequestException:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{kind} exited with status {proc.returncode}")
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{kind} did not start")
+
+
+def run(url, form, requests_total, concurrency):
+    local = threading.local()
+    latencies, failures = [], []
+
+    def one(_):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.post(url + "/decrypt", data=form, timeout=120)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200 or response.json().get("message") != MESSAGE:
+            failures.append(response.status_code)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    elapsed = time.perf_counter() - start
+    cuts = statistics.quantiles(latencies, n=100)
+    return requests_total / elapsed, cuts[49] * 1000, cuts[98] * 1000, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", default="8,32")
+    parser.add_argument("--scrape-delay", type=float, default=0.2, help="seconds added to every stub scrape")
+    parser.add_argument("--gunicorn-workers", type=int, default=2)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--stub-nlp", action="store_true", help="skip the model; first keyword always matches")
+    args = parser.parse_args()
+
+    now = int(time.time())
+    carrier = cv2.imencode(".png", synthetic_image(args.height, args.width))[1].tobytes()
+    stego = hide_message_in_bytes(carrier, MESSAGE, 12.3456, 77.5555, KEYWORD, "bench", now - 60, now + 3600)
+    comments = synthetic_comments(50) + [f"I love {KEYWORD} in the morning"]
+
+    def comments_route(handler, body):
+        time.sleep(args.scrape_delay)
+        return 200, {}, comments
+
+    routes = [
+        ("/stego.png", lambda handler, body: (200, {"Content-Type": "image/png"}, stego)),
+        ("/comments", comments_route),
+    ]
+
+    print(f"carrier: {args.width}x{args.height} PNG, {len(stego) / 1e6:.1f} MB, scrape delay {args.scrape_delay * 1000:.0f} ms")
+    print(f"{'server':>9} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    with StubServer(routes) as stub:
+        env = dict(os.environ, STEGO_BENCH_COMMENTS_URL=stub.url + "/comments",
+                   STEGO_BENCH_STUB_NLP="1" if args.stub_nlp else "")
+        form = dict(image_url=stub.url + "/stego.png", comment_url="https://www.youtube.com/watch?v=bench",
+                    keyword=KEYWORD, latitude="12.3456", longitude="77.5555", machine_id="bench",
+                    timestamp=str(now))
+        for kind in ("gunicorn", "uvicorn"):
+            proc, url = start_server(kind, free_port(), env, args.gunicorn_workers)
+            try:
+                run(url, form, 8, 4)  # warm-up: model load, payload cache
+                for concurrency in [int(c) for c in args.concurrency.split(",")]:
+                    throughput, p50, p99, failures = run(url, form, args.requests, concurrency)
+                    print(f"{kind:>9} {concurrency:>5} {throughput:>8.1f} {p50:>8.1f} {p99:>8.1f} {len(failures):>7}")
+                    assert not failures, f"{kind}: non-200 responses {failures[:5]}"
+            finally:
+                proc.terminate()
+                proc.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Peak memory and latency of container extraction: full cv2 decode vs carrier_io.
+
+Each measurement runs in a fresh subprocess so ru_maxrss reflects only that
+extraction. PNG carriers are decoded up to the rows holding the container;
+BMP/PPM/PGM files are memory-mapped. Both modes must return the same container.
+
+Usage:
+    python -m benchmarks.bench_carrier_io [--sizes 12MP] [--formats png,bmp,ppm,pgm16] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import IMAGE_SIZES, synthetic_image
+
+# name -> (extension, channels, dtype)
+FORMATS = {
+    "png": (".png", 3, np.uint8),
+    "png16": (".png", 3, np.uint16),
+    "bmp": (".bmp", 3, np.uint8),
+    "ppm": (".ppm", 3, np.uint8),
+    "pgm16": (".pgm", 1, np.uint16),
+}
+
+
+def _extract(mode, path):
+    from stego_container import read_container
+    from carrier_io import open_carrier, read_carrier_container
+
+    if mode == "cv2":
+        return read_container(cv2.imread(path, cv2.IMREAD_UNCHANGED))
+    return read_carrier_container(open_carrier(path))
+
+
+def child(mode, path, repeat):
+    """Runs in the subprocess: prints best ms, peak RSS and the container as JSON."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        container = _extract(mode, path)
+        best = min(best, time.perf_counter() - start)
+    print(json.dumps({"ms": best * 1000, "peak_mb": peak_rss() / 2**20, "container": repr(sorted(container.items()))}))
+
+
+def peak_rss():
+    """Peak resident set of this process in bytes."""
+    # Linux keeps ru_maxrss across exec, so it would report the (large) parent;
+    # VmHWM belongs to this process image only
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def measure(mode, path, repeat):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_carrier_io", "--child", mode, path,
+                             "--repeat", str(repeat)], capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="12MP", help=f"labels from {[s[0] for s in IMAGE_SIZES]}")
+    parser.add_argument("--formats", default=",".join(FORMATS), help=f"from {list(FORMATS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child, args.repeat)
+        return
+
+    from stego_encoder import hide_message_in_array
+
+    wanted = set(args.sizes.split(","))
+    sizes = [size for size in IMAGE_SIZES if size[0] in wanted]
+
+    print(f"{'carrier':>16} {'MB file':>8} {'cv2 ms':>8} {'cv2 MB':>8} {'io ms':>8} {'io MB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, height, width in sizes:
+            for name in args.formats.split(","):
+                ext, channels, dtype = FORMATS[name]
+                img = hide_message_in_array(synthetic_image(height, width, channels, dtype), "meet me at the old pier",
+                                            12.3456, 77.5555, "coffee", "bench-device", 1_700_000_000, 1_900_000_000)
+                path = os.path.join(tmp, f"{label}-{name}{ext}")
+                cv2.imwrite(path, img)
+                del img
+
+                full = measure("cv2", path, args.repeat)
+                mapped = measure("carrier_io", path, args.repeat)
+                assert mapped["container"] == full["container"], f"{name}: containers differ"
+                print(f"{label + '/' + name:>16} {os.path.getsize(path) / 2**20:>8.1f} {full['ms']:>8.1f} "
+                      f"{full['peak_mb']:>8.1f} {mapped['ms']:>8.1f} {mapped['peak_mb']:>8.1f}")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
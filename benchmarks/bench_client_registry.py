@@ -0,0 +1,95 @@
+"""
+Per-request client overhead: a fresh API client per call vs the client registry.
+
+YouTube and Apify calls go to a local stub server, so the numbers show client
+construction and connection setup rather than upstream latency. Reddit is
+measured on construction only, since praw needs a full OAuth flow to go further.
+
+Usage:
+    python -m benchmarks.bench_client_registry [--calls N]
+"""
+import argparse
+from urllib.parse import parse_qs, urlparse
+
+import praw
+from apify_client import ApifyClient
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+from benchmarks.common import best_of
+from benchmarks.stub_server import StubServer
+import client_registry
+
+YOUTUBE_PAGE = {"items": [{"snippet": {"topLevelComment": {"snippet": {"textDisplay": "nice"}}}}] * 20}
+APIFY_ITEMS = [{"text": "nice"}] * 20
+
+
+def apify_items(handler, body):
+    offset = int(parse_qs(urlparse(handler.path).query).get("offset", ["0"])[0])
+    items = APIFY_ITEMS if offset == 0 else []
+    headers = {
+        "x-apify-pagination-total": str(len(APIFY_ITEMS)),
+        "x-apify-pagination-offset": str(offset),
+        "x-apify-pagination-count": str(len(items)),
+        "x-apify-pagination-limit": "1000",
+        "x-apify-pagination-desc": "false",
+    }
+    return 200, headers, items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    routes = [
+        ("/youtube/v3/", lambda handler, body: (200, {}, YOUTUBE_PAGE)),
+        ("/v2/datasets/", apify_items),
+    ]
+
+    with StubServer(routes) as stub:
+        def new_youtube():
+            return build('youtube', 'v3', developerKey='stub', cache_discovery=False,
+                         client_options={"api_endpoint": stub.url + "/"})
+
+        def new_apify():
+            return ApifyClient('stub', api_url=stub.url)
+
+        def new_reddit():
+            return praw.Reddit(client_id='stub', client_secret='stub', user_agent='bench')
+
+        client_registry.register("bench_youtube", new_youtube)
+        client_registry.register("bench_youtube_http", build_http, per_thread=True)
+        client_registry.register("bench_apify", new_apify)
+        client_registry.register("bench_reddit", new_reddit, per_thread=True)
+
+        def youtube_call(youtube, http):
+            return youtube.commentThreads().list(part='snippet', videoId='stub').execute(http=http)
+
+        cases = {
+            "youtube": (
+                lambda: youtube_call(new_youtube(), build_http()),
+                lambda: youtube_call(client_registry.get("bench_youtube"), client_registry.get("bench_youtube_http")),
+            ),
+            "apify": (
+                lambda: list(new_apify().dataset("stub").iterate_items()),
+                lambda: list(client_registry.get("bench_apify").dataset("stub").iterate_items()),
+            ),
+            "reddit": (
+                new_reddit,
+                lambda: client_registry.get("bench_reddit"),
+            ),
+        }
+
+        print(f"{'client':>8} {'fresh ms':>9} {'pooled ms':>10} {'saved ms':>9}")
+        for name, (fresh, pooled) in cases.items():
+            pooled()  # first use builds the registry entry
+            fresh_seconds, _ = best_of(lambda: [fresh() for _ in range(args.calls)], 1)
+            pooled_seconds, _ = best_of(lambda: [pooled() for _ in range(args.calls)], 1)
+            fresh_ms = fresh_seconds * 1000 / args.calls
+            pooled_ms = pooled_seconds * 1000 / args.calls
+            print(f"{name:>8} {fresh_ms:>9.2f} {pooled_ms:>10.2f} {fresh_ms - pooled_ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
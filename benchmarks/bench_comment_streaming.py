@@ -0,0 +1,141 @@
+"""
+Full comment scrape + match vs page-by-page matching with early stop.
+
+YouTube and Apify (Instagram) are served by a local stub that pages the
+comments and delays every page, as the real APIs do. The matching comment
+sits on an early page; streaming should stop fetching right after it.
+
+Usage:
+    python -m benchmarks.bench_comment_streaming [--pages 5] [--page-size 100] \\
+        [--match-page 1] [--page-delay 0.15] [--stop-score 0.8]
+"""
+import argparse
+import time
+from urllib.parse import parse_qs, urlparse
+
+from apify_client import ApifyClient
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+from benchmarks.common import synthetic_comments
+from benchmarks.stub_server import StubServer
+import client_registry
+import instagram_scraper
+import youtube_scraper
+from NLP_comment_and_keyword_analyser import find_best_match_details, find_best_match_in_pages
+
+KEYWORDS = ["espresso", "mountain bike", "violin"]
+MATCH_COMMENT = "espresso"
+
+
+class PagedComments:
+    """Comment pages shared by both stubs; counts the pages served."""
+
+    def __init__(self, pages, page_size, match_page, delay):
+        self.pages = [synthetic_comments(page_size, seed=i) for i in range(pages)]
+        self.pages[match_page][page_size // 2] = MATCH_COMMENT
+        self.delay = delay
+        self.served = 0
+
+    def serve(self, index):
+        time.sleep(self.delay)
+        self.served += 1
+        return self.pages[index] if index < len(self.pages) else []
+
+
+def youtube_route(comments):
+    def route(handler, body):
+        query = parse_qs(urlparse(handler.path).query)
+        index = int(query.get("pageToken", ["0"])[0])
+        items = [{"snippet": {"topLevelComment": {"snippet": {"textDisplay": text}}}} for text in comments.serve(index)]
+        payload = {"items": items}
+        if index + 1 < len(comments.pages):
+            payload["nextPageToken"] = str(index + 1)
+        return 200, {}, payload
+    return route
+
+
+def apify_routes(comments, page_size):
+    # Every field newer apify-client versions validate on a run object
+    run = {"id": "stub-run", "actId": "stub", "userId": "stub", "startedAt": "2024-01-01T00:00:00Z",
+           "status": "RUNNING", "buildId": "stub", "meta": {"origin": "API"}, "stats": {},
+           "options": {"build": "latest", "timeoutSecs": 300, "memoryMbytes": 1024, "diskMbytes": 2048},
+           "defaultDatasetId": "stub-dataset", "defaultKeyValueStoreId": "stub-kvs",
+           "defaultRequestQueueId": "stub-rq"}
+
+    def items(handler, body):
+        query = parse_qs(urlparse(handler.path).query)
+        offset = int(query.get("offset", ["0"])[0])
+        page = [{"text": text} for text in comments.serve(offset // page_size)]
+        headers = {
+            "x-apify-pagination-total": str(offset + len(page)),
+            "x-apify-pagination-offset": str(offset),
+            "x-apify-pagination-count": str(len(page)),
+            "x-apify-pagination-limit": str(page_size),
+            "x-apify-pagination-desc": "false",
+        }
+        return 200, headers, page
+
+    def run_state(status):
+        return lambda handler, body: (200, {}, {"data": dict(run, status=status)})
+
+    # Polling the run reports it finished, so the first empty dataset page ends the scrape.
+    # Older apify-client versions start runs under /v2/acts/, newer ones under /v2/actors/.
+    return [
+        ("/v2/acts/", run_state("RUNNING")),
+        ("/v2/actors/", run_state("RUNNING")),
+        ("/v2/datasets/", items),
+        ("/v2/actor-runs/stub-run/abort", run_state("ABORTED")),
+        ("/v2/actor-runs/", run_state("SUCCEEDED")),
+    ]
+
+
+def measure(comments, scrape):
+    comments.served = 0
+    start = time.perf_counter()
+    match = scrape()
+    return match, comments.served, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--match-page", type=int, default=1)
+    parser.add_argument("--page-delay", type=float, default=0.15)
+    parser.add_argument("--stop-score", type=float, default=0.8)
+    args = parser.parse_args()
+
+    comments = PagedComments(args.pages, args.page_size, args.match_page, args.page_delay)
+    routes = [("/youtube/v3/", youtube_route(comments))] + apify_routes(comments, args.page_size)
+
+    with StubServer(routes) as stub:
+        youtube_scraper.YOUTUBE_API_KEY = instagram_scraper.APIFY_TOKEN = "stub"
+        client_registry.register("youtube", lambda: build('youtube', 'v3', developerKey='stub', cache_discovery=False,
+                                                          client_options={"api_endpoint": stub.url + "/"}))
+        client_registry.register("youtube_http", build_http, per_thread=True)
+        client_registry.register("apify", lambda: ApifyClient('stub', api_url=stub.url))
+
+        sources = {
+            "youtube": lambda: youtube_scraper.iter_youtube_comment_pages("https://youtu.be/stub"),
+            "instagram": lambda: instagram_scraper.iter_instagram_comment_pages("https://instagram.com/p/stub",
+                                                                                page_size=args.page_size),
+        }
+
+        find_best_match_details(KEYWORDS, [MATCH_COMMENT])  # model load outside the timings
+        print(f"{args.pages} pages x {args.page_size} comments, match on page {args.match_page + 1}, "
+              f"{args.page_delay * 1000:.0f} ms/page")
+        print(f"{'source':>10} {'mode':>10} {'pages':>6} {'ms':>8} {'keyword':>10}")
+        for name, pages in sources.items():
+            full, full_pages, full_ms = measure(comments, lambda: find_best_match_details(
+                KEYWORDS, [c for page in pages() for c in page]))
+            (streamed, _), streamed_pages, streamed_ms = measure(comments, lambda: find_best_match_in_pages(
+                KEYWORDS, pages(), certain_threshold=args.stop_score))
+            print(f"{name:>10} {'full':>10} {full_pages:>6} {full_ms:>8.1f} {full.keyword:>10}")
+            print(f"{name:>10} {'streaming':>10} {streamed_pages:>6} {streamed_ms:>8.1f} {streamed.keyword:>10}")
+            assert streamed.keyword == full.keyword
+            assert streamed_pages < full_pages
+
+
+if __name__ == "__main__":
+    main()
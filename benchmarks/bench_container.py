@@ -0,0 +1,80 @@
+"""
+Compares the binary stego container with the legacy base64(JSON) + '###' payload.
+
+Reports the bytes each format needs for a range of message sizes, the largest
+message that fits a carrier, and the time to read the container back.
+
+Usage:
+    python -m benchmarks.bench_container [--repeat N]
+"""
+import argparse
+import os
+
+from benchmarks.common import IMAGE_SIZES, best_of, synthetic_image
+from stego_codec import embed_lsb
+from stego_container import FORMAT_BINARY, FORMAT_LEGACY, pack_container, read_container
+
+MESSAGE_SIZES = [16, 256, 4096, 65536]
+FORMATS = [FORMAT_LEGACY, FORMAT_BINARY]
+
+
+def synthetic_fields(message_size):
+    """Random cipher fields shaped like hide_message_in_image's output."""
+    return {
+        'iv': os.urandom(12),
+        'tag': os.urandom(16),
+        'msg': os.urandom(message_size),
+        'start_timestamp': 1_700_000_000,
+        'end_timestamp': 1_700_000_600,
+        'ttl': 600,
+        'lat': os.urandom(6),
+        'lon': os.urandom(6),
+        'iv_loc': os.urandom(12),
+        'tag_loc': os.urandom(16),
+    }
+
+
+def max_message(capacity, container_format):
+    """Largest message (bytes) whose container still fits `capacity` bytes."""
+    low, high = 0, capacity
+    while low < high:
+        mid = (low + high + 1) // 2
+        if len(pack_container(synthetic_fields(mid), container_format)) <= capacity:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("Container size (bytes)")
+    print(f"{'message':>8} {'legacy':>8} {'binary':>8} {'ratio':>6}")
+    for size in MESSAGE_SIZES:
+        fields = synthetic_fields(size)
+        legacy = len(pack_container(fields, FORMAT_LEGACY))
+        binary = len(pack_container(fields, FORMAT_BINARY))
+        print(f"{size:>8} {legacy:>8} {binary:>8} {legacy / binary:>5.2f}x")
+
+    print("\nLargest message per carrier (bytes) and read time (ms) for a 4 KB message")
+    print(f"{'size':>6} {'legacy':>9} {'binary':>9} {'legacy ms':>10} {'binary ms':>10}")
+    fields = synthetic_fields(4096)
+    for label, height, width in IMAGE_SIZES:
+        capacity = (height * width * 3) // 8
+        carrier = synthetic_image(height, width)
+        row = [max_message(capacity, fmt) for fmt in FORMATS]
+
+        for fmt in FORMATS:
+            img = embed_lsb(carrier.copy(), pack_container(fields, fmt))
+            seconds, decoded = best_of(lambda: read_container(img), args.repeat)
+            assert decoded['msg'] == fields['msg'], f"{fmt} round trip failed at {label}"
+            row.append(seconds * 1000)
+
+        print(f"{label:>6} {row[0]:>9} {row[1]:>9} {row[2]:>10.3f} {row[3]:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
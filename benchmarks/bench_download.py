@@ -0,0 +1,76 @@
+"""
+Disk vs in-memory image download + decode under concurrent load.
+
+Images are served by a local stub server, so the numbers isolate the cost of
+buffering, disk round-trips and decoding.
+
+Usage:
+    python -m benchmarks.bench_download [--requests N] [--concurrency 1,8,32]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from benchmarks.common import synthetic_image
+from benchmarks.stub_server import StubServer
+from download_image import download_image, download_image_bytes
+
+
+def disk_path(url, save_dir):
+    result = download_image(url, save_dir=save_dir)
+    img = cv2.imread(result["image_path"], cv2.IMREAD_UNCHANGED)
+    os.remove(result["image_path"])
+    return img
+
+
+def memory_path(url, save_dir):
+    result = download_image_bytes(url)
+    return cv2.imdecode(np.frombuffer(result["data"], dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+
+
+def run(path, url, save_dir, requests, concurrency):
+    latencies = []
+
+    def one(_):
+        start = time.perf_counter()
+        img = path(url, save_dir)
+        latencies.append(time.perf_counter() - start)
+        assert img is not None
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, statistics.median(latencies) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--width", type=int, default=1920)
+    args = parser.parse_args()
+
+    png = cv2.imencode(".png", synthetic_image(args.height, args.width))[1].tobytes()
+    route = ("/carrier.png", lambda handler, body: (200, {"Content-Type": "image/png"}, png))
+    save_dir = tempfile.mkdtemp()
+
+    print(f"carrier: {args.width}x{args.height} PNG, {len(png) / 1e6:.1f} MB")
+    print(f"{'conc':>5} {'path':>7} {'req/s':>8} {'p50 ms':>8}")
+    with StubServer([route]) as stub:
+        url = stub.url + "/carrier.png"
+        for concurrency in [int(c) for c in args.concurrency.split(",")]:
+            for name, path in (("disk", disk_path), ("memory", memory_path)):
+                throughput, p50 = run(path, url, save_dir, args.requests, concurrency)
+                print(f"{concurrency:>5} {name:>7} {throughput:>8.1f} {p50:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Measures find_best_match on a cold vs warm embedding cache.
+
+Usage:
+    python -m benchmarks.bench_embedding_cache [--comments N] [--disk PATH]
+"""
+import argparse
+import os
+import tempfile
+
+from benchmarks.common import best_of, synthetic_comments
+import NLP_comment_and_keyword_analyser as analyser
+from embedding_cache import EmbeddingCache
+
+KEYWORDS = ["sunset", "coffee", "concert", "birthday", "hiking"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--comments", type=int, default=1000)
+    parser.add_argument("--disk", default=os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3"))
+    args = parser.parse_args()
+
+    comments = synthetic_comments(args.comments)
+
+    analyser.embedding_cache = EmbeddingCache(analyser.MODEL_NAME, disk_path=args.disk)
+    cold, match = best_of(lambda: analyser.find_best_match_details(KEYWORDS, comments), 1)
+    warm, warm_match = best_of(lambda: analyser.find_best_match_details(KEYWORDS, comments), 1)
+    memory_stats = analyser.embedding_cache.stats()
+
+    # A fresh process only has the on-disk store to rely on
+    analyser.embedding_cache = EmbeddingCache(analyser.MODEL_NAME, disk_path=args.disk)
+    disk, disk_match = best_of(lambda: analyser.find_best_match_details(KEYWORDS, comments), 1)
+    disk_stats = analyser.embedding_cache.stats()
+
+    assert match.keyword == warm_match.keyword == disk_match.keyword
+
+    print(f"cold cache   : {cold:.3f}s")
+    print(f"warm (LRU)   : {warm:.4f}s  {memory_stats}")
+    print(f"warm (disk)  : {disk:.4f}s  {disk_stats}")
+
+
+if __name__ == "__main__":
+    main()
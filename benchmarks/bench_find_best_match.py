@@ -0,0 +1,68 @@
+"""
+Compares the batched find_best_match with the original per-comment loop on CPU.
+
+Usage:
+    python -m benchmarks.bench_find_best_match [--sizes 100,1000,10000] [--batch-size N]
+"""
+import argparse
+
+import torch
+from sentence_transformers import util
+
+from benchmarks.common import best_of, synthetic_comments
+import NLP_comment_and_keyword_analyser as analyser
+
+KEYWORDS = ["sunset", "coffee", "concert", "birthday", "hiking"]
+
+
+def legacy_find_best_match(keywords, comments, threshold=0.4):
+    """One forward pass per comment, as find_best_match did originally."""
+    keyword_embeddings = analyser.get_model().encode(keywords, convert_to_tensor=True)
+    best_score = 0.0
+    matched_keyword = None
+
+    for comment in comments:
+        comment_embedding = analyser.get_model().encode(comment, convert_to_tensor=True)
+        similarity_scores = util.cos_sim(comment_embedding, keyword_embeddings)[0]
+        max_score = float(torch.max(similarity_scores))
+        max_idx = int(torch.argmax(similarity_scores))
+        if max_score > best_score and max_score >= threshold:
+            best_score = max_score
+            matched_keyword = keywords[max_idx]
+
+    return matched_keyword
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--batch-size", type=int, default=analyser.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--certain", type=float, default=0.9, help="certain_threshold for the early-exit run")
+    parser.add_argument("--skip-legacy-above", type=int, default=1000,
+                        help="skip the slow per-comment loop for larger corpora")
+    args = parser.parse_args()
+
+    print(f"{'comments':>9} {'legacy s':>9} {'batched s':>10} {'early s':>8} {'keyword':>10}")
+
+    for size in [int(s) for s in args.sizes.split(",")]:
+        comments = synthetic_comments(size)
+
+        legacy_seconds = float("nan")
+        if size <= args.skip_legacy_above:
+            legacy_seconds, legacy = best_of(lambda: legacy_find_best_match(KEYWORDS, comments), 1)
+
+        batched_seconds, match = best_of(
+            lambda: analyser.find_best_match_details(KEYWORDS, comments, batch_size=args.batch_size), 1)
+        early_seconds, _ = best_of(
+            lambda: analyser.find_best_match_details(KEYWORDS, comments, batch_size=args.batch_size,
+                                                     certain_threshold=args.certain), 1)
+
+        if size <= args.skip_legacy_above:
+            assert (match.keyword if match else None) == legacy, f"batched result differs at {size} comments"
+
+        keyword = match.keyword if match else None
+        print(f"{size:>9} {legacy_seconds:>9.2f} {batched_seconds:>10.2f} {early_seconds:>8.2f} {keyword!s:>10}")
+
+
+if __name__ == "__main__":
+    main()
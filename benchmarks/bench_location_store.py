@@ -0,0 +1,156 @@
+"""
+Load test for the per-session location store behind /store-location and /encrypt.
+
+Part 1 hammers each store backend with concurrent senders, each writing and
+reading back its own record, and counts records that came back belonging to
+someone else. The legacy backend is the old single location_temp.json file.
+
+Part 2 drives the real endpoints through the Flask test client: every sender
+stores its own coordinates and then encrypts, and the resulting image must
+decrypt with that sender's key. Without a session token (no cookie) /encrypt
+must refuse with 400 rather than use another sender's location.
+
+Usage:
+    python -m benchmarks.bench_location_store [--senders 128]
+"""
+import argparse
+import io
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from benchmarks.common import synthetic_image
+from location_store import MemoryLocationStore, SQLiteLocationStore
+
+
+class LegacyFileStore:
+    """The pre-session behaviour: one JSON file shared by every sender."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def put(self, token, record):
+        with open(self.path, "w") as f:
+            json.dump(record, f)
+
+    def get(self, token):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except ValueError:
+            # Read while another sender was rewriting the file
+            return None
+
+
+def sender_record(index):
+    return {"sender_email": f"user{index}@example.com", "latitude": 10 + index / 1000,
+            "longitude": 70 + index / 1000, "device_id": f"device-{index}"}
+
+
+def store_load(store, senders, rounds):
+    latencies, wrong = [], 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(senders)
+
+    def sender(index):
+        nonlocal wrong
+        token = f"token-{index}"
+        record = sender_record(index)
+        barrier.wait()
+        for _ in range(rounds):
+            start = time.perf_counter()
+            store.put(token, record)
+            stored = store.get(token)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                wrong += stored != record
+
+    with ThreadPoolExecutor(senders) as pool:
+        list(pool.map(sender, range(senders)))
+    return wrong, latencies
+
+
+def endpoint_load(senders, use_tokens):
+    import final
+    from stego_container import read_container
+    from stego_crypto import generate_key, decrypt_message
+
+    png = cv2.imencode(".png", synthetic_image(64, 64))[1].tobytes()
+    latencies, wrong = [], 0
+    lock = threading.Lock()
+    barrier = threading.Barrier(senders)
+
+    def sender(index):
+        nonlocal wrong
+        client = final.app.test_client(use_cookies=use_tokens)
+        record = sender_record(index)
+        barrier.wait()
+        start = time.perf_counter()
+        client.post("/store-location", json={"senderEmail": record["sender_email"], "latitude": record["latitude"],
+                                             "longitude": record["longitude"], "deviceId": record["device_id"]})
+        response = client.post("/encrypt", content_type="multipart/form-data", data={
+            "image": (io.BytesIO(png), "carrier.png"), "message": f"hello {index}", "keyword": "coffee",
+            "startTimestamp": "2026-01-01T10:00", "endTimestamp": "2026-01-01T11:00"})
+        elapsed = time.perf_counter() - start
+
+        if not use_tokens:
+            ok = response.status_code == 400
+        elif response.status_code != 200:
+            ok = False
+        else:
+            fields = read_container(cv2.imdecode(np.frombuffer(response.data, np.uint8), cv2.IMREAD_UNCHANGED))
+            key = generate_key(round(record["latitude"], 3), round(record["longitude"], 3), "coffee",
+                               record["device_id"])
+            try:
+                ok = decrypt_message(key, fields["iv"], fields["tag"], fields["msg"]) == f"hello {index}".encode()
+            except Exception:
+                ok = False
+        with lock:
+            latencies.append(elapsed)
+            wrong += not ok
+
+    with ThreadPoolExecutor(senders) as pool:
+        list(pool.map(sender, range(senders)))
+    return wrong, latencies
+
+
+def report(label, senders, wrong, latencies):
+    p50 = statistics.median(latencies) * 1000
+    p99 = statistics.quantiles(latencies, n=100)[98] * 1000
+    print(f"{label:>22} {senders:>8} {wrong:>7} {p50:>8.2f} {p99:>8.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--senders", type=int, default=128)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    print(f"{'backend':>22} {'senders':>8} {'wrong':>7} {'p50 ms':>8} {'p99 ms':>8}")
+
+    stores = {
+        "legacy json file": LegacyFileStore(os.path.join(workdir, "location_temp.json")),
+        "memory": MemoryLocationStore(),
+        "sqlite (WAL)": SQLiteLocationStore(os.path.join(workdir, "locations.sqlite3")),
+    }
+    for label, store in stores.items():
+        wrong, latencies = store_load(store, args.senders, args.rounds)
+        report(label, args.senders, wrong, latencies)
+
+    os.environ.setdefault("STEGO_LOCATION_DB", os.path.join(workdir, "endpoints.sqlite3"))
+    for label, use_tokens in (("endpoints, no token", False), ("endpoints, session", True)):
+        wrong, latencies = endpoint_load(args.senders, use_tokens)
+        report(label, args.senders, wrong, latencies)
+
+
+if __name__ == "__main__":
+    main()
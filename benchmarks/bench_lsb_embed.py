@@ -0,0 +1,45 @@
+"""
+Compares the LSB embedding engines in stego_codec across carrier sizes.
+
+Usage:
+    python -m benchmarks.bench_lsb_embed [--payload BYTES] [--repeat N]
+"""
+import argparse
+
+import cv2
+
+from benchmarks.common import IMAGE_SIZES, best_of, synthetic_image, synthetic_payload
+from stego_codec import EMBED_ENGINES, embed_lsb
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payload", type=int, default=1024, help="payload size in bytes")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.payload)
+    print(f"{'size':>6} {'engine':>6} {'seconds':>10} {'speedup':>8}")
+
+    for label, height, width in IMAGE_SIZES:
+        carrier = synthetic_image(height, width)
+        timings = {}
+        outputs = {}
+
+        for engine in EMBED_ENGINES:
+            seconds, img = best_of(lambda: embed_lsb(carrier.copy(), payload, engine=engine), args.repeat)
+            timings[engine] = seconds
+            outputs[engine] = cv2.imencode(".png", img)[1].tobytes()
+
+        # Every engine must produce the same PNG as the reference loop
+        reference = outputs["loop"]
+        for engine, png in outputs.items():
+            assert png == reference, f"{engine} output differs from the loop engine at {label}"
+
+        for engine, seconds in timings.items():
+            speedup = timings["loop"] / seconds if seconds else float("inf")
+            print(f"{label:>6} {engine:>6} {seconds:>10.4f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Compares the chunked LSB extractor in stego_codec with the original /decrypt loop.
+
+Usage:
+    python -m benchmarks.bench_lsb_extract [--payload BYTES] [--repeat N]
+"""
+import argparse
+
+from benchmarks.common import IMAGE_SIZES, best_of, synthetic_image, synthetic_payload
+from stego_codec import embed_lsb, extract_lsb
+
+
+def legacy_extract(img):
+    """The string-building loop decrypt_handler used before stego_codec."""
+    bits = []
+    for row in img:
+        for pixel in row:
+            for channel in range(len(pixel)):
+                bits.append(str(pixel[channel] & 1))
+
+    binary_data = ''.join(bits)
+    bytes_data = [binary_data[i:i + 8] for i in range(0, len(binary_data), 8)]
+    extracted_message = ''.join(chr(int(b, 2)) for b in bytes_data if int(b, 2) != 0)
+    return extracted_message.split("###")[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payload", type=int, default=1024, help="payload size in bytes")
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    payload = synthetic_payload(args.payload)
+    print(f"{'size':>6} {'legacy s':>10} {'chunked s':>10} {'speedup':>9}")
+
+    for label, height, width in IMAGE_SIZES:
+        carrier = embed_lsb(synthetic_image(height, width), payload)
+
+        legacy_seconds, legacy = best_of(lambda: legacy_extract(carrier), args.repeat)
+        chunked_seconds, chunked = best_of(lambda: extract_lsb(carrier), args.repeat)
+
+        # Round trip: both extractors must recover exactly what was embedded
+        assert chunked == payload[:-3], f"chunked extractor lost the payload at {label}"
+        assert chunked.decode("latin-1") == legacy, f"extractors disagree at {label}"
+
+        print(f"{label:>6} {legacy_seconds:>10.3f} {chunked_seconds:>10.5f} {legacy_seconds / chunked_seconds:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Accuracy parity and CPU throughput of the analyser's inference backends.
+
+Parity: every backend must pick the same keyword as fp32 torch on a fixed
+comment/keyword corpus, and its embeddings must stay close to fp32.
+Throughput: comments/second encoded by each backend with the cache bypassed.
+
+Usage:
+    python -m benchmarks.bench_nlp_backends [--backends torch,torch-int8,onnx] [--comments N]
+"""
+import argparse
+
+import numpy as np
+
+from benchmarks.common import best_of, synthetic_comments
+import NLP_comment_and_keyword_analyser as analyser
+
+# (keywords, comments, expected keyword) - expected is what fp32 torch picks
+PARITY_CORPUS = [
+    (["sunset", "coffee", "concert"], ["what a beautiful evening sky over the sea", "nice shot"], "sunset"),
+    (["sunset", "coffee", "concert"], ["need my espresso before work", "lol"], "coffee"),
+    (["sunset", "coffee", "concert"], ["the band was so loud last night", "first!"], "concert"),
+    (["puppy", "birthday", "mountain"], ["happy bday, have a great year!", "wow"], "birthday"),
+    (["puppy", "birthday", "mountain"], ["the summit view after the climb was worth it"], "mountain"),
+    (["puppy", "birthday", "mountain"], ["my little dog learned to sit today", "cute"], "puppy"),
+    (["rain", "football", "pizza"], ["that last minute goal was unreal", "ref was blind"], "football"),
+    (["rain", "football", "pizza"], ["extra cheese and pepperoni please"], "pizza"),
+    (["rain", "football", "pizza"], ["got soaked walking home, umbrella broke"], "rain"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", default=",".join(analyser.BACKENDS))
+    parser.add_argument("--comments", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=analyser.DEFAULT_BATCH_SIZE)
+    parser.add_argument("--min-cosine", type=float, default=0.98,
+                        help="lowest acceptable mean cosine similarity to fp32 embeddings")
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    comments = synthetic_comments(args.comments)
+    reference = analyser.get_model("torch").encode(comments[:256], convert_to_numpy=True)
+    reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+
+    print(f"{'backend':>11} {'parity':>7} {'cosine':>7} {'comments/s':>11}")
+    for backend in backends:
+        try:
+            backend_model = analyser.get_model(backend)
+        except Exception as e:
+            print(f"{backend:>11} skipped: {e}")
+            continue
+
+        picks = [analyser.find_best_match(keywords, corpus_comments, backend=backend)
+                 for keywords, corpus_comments, _ in PARITY_CORPUS]
+        parity = sum(pick == expected for pick, (_, _, expected) in zip(picks, PARITY_CORPUS))
+
+        embeddings = backend_model.encode(comments[:256], convert_to_numpy=True)
+        embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+        cosine = float(np.mean(np.sum(embeddings * reference, axis=1)))
+
+        seconds, _ = best_of(lambda: backend_model.encode(comments, batch_size=args.batch_size), 1)
+        print(f"{backend:>11} {parity:>3}/{len(PARITY_CORPUS):<3} {cosine:>7.4f} {len(comments) / seconds:>11.0f}")
+
+        assert parity == len(PARITY_CORPUS), f"{backend} disagrees with fp32 on the parity corpus: {picks}"
+        assert cosine >= args.min_cosine, f"{backend} embeddings drift from fp32 (mean cosine {cosine:.4f})"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Single-image vs sharded carriers: capacity, embed throughput, and fetch + reassembly.
+
+Capacity is the largest message one carrier, or N carriers together, can take.
+Embedding compares one carrier holding a payload with N carriers holding a
+shard each, embedded in parallel. Fetching downloads every carrier from a
+local stub that delays each response, as a remote host would, and joins the
+shards through the /decrypt pipeline's fetch stage.
+
+Usage:
+    python -m benchmarks.bench_sharding [--size HD] [--shards 2,4,8] [--delay 0.05] [--repeat 3]
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+os.environ.setdefault("STEGO_PAYLOAD_CACHE_SIZE", "0")
+os.environ.setdefault("STEGO_JOB_BACKEND", "memory")
+
+import cv2
+
+from benchmarks.common import IMAGE_SIZES, synthetic_image, best_of
+from benchmarks.stub_server import StubServer
+from stego_container import SHARD_HEADER
+from stego_crypto import generate_key, decrypt_message
+from stego_encoder import build_container, hide_payload_in_bytes, hide_message_across_bytes, carrier_capacity
+import decrypt_pipeline
+from stage_timer import StageTimer
+
+LAT, LON, KEYWORD, MACHINE_ID = 12.3456, 77.5555, "coffee", "bench-device"
+START, END = 1_700_000_000, 1_900_000_000
+
+
+def message_capacity(capacities):
+    """Longest ASCII message whose container fits in carriers of these capacities (binary search)."""
+    sharded = len(capacities) > 1
+    room = sum(c - SHARD_HEADER.size for c in capacities) if sharded else capacities[0]
+    low, high = 0, room
+    while low < high:
+        mid = (low + high + 1) // 2
+        if len(build_container("x" * mid, LAT, LON, KEYWORD, MACHINE_ID, START, END)) <= room:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def fetch(urls):
+    """The /decrypt fetch stage for these carriers: concurrent download + extract, then join."""
+    timer = StageTimer()
+    futures = [decrypt_pipeline.DECRYPT_EXECUTOR.submit(decrypt_pipeline.fetch_container, url, timer) for url in urls]
+    wait(futures)
+    result = decrypt_pipeline.combine_containers([future.result() for future in futures])
+    assert result["success"], result
+    return result["container"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", default="HD", help=f"carrier size label from {[s[0] for s in IMAGE_SIZES]}")
+    parser.add_argument("--shards", default="2,4,8")
+    parser.add_argument("--delay", type=float, default=0.05, help="seconds the stub waits before each image")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    _, height, width = next(size for size in IMAGE_SIZES if size[0] == args.size)
+    counts = [int(n) for n in args.shards.split(",")]
+    carriers = [cv2.imencode(".png", synthetic_image(height, width, seed=seed))[1].tobytes()
+                for seed in range(max(counts))]
+    capacity = carrier_capacity(carriers[0])
+
+    # A payload that fills most of one carrier, so every mode moves the same bytes
+    message = "x" * int(message_capacity([capacity]) * 0.9)
+    print(f"{args.size} carriers ({width}x{height}), {len(message)} byte message, "
+          f"{args.delay * 1000:.0f} ms per image download, {os.cpu_count()} CPUs")
+
+    print(f"\n{'carriers':>8} {'max message KB':>15}")
+    for n in [1] + counts:
+        print(f"{n:>8} {message_capacity([capacity] * n) / 1024:>15.1f}")
+
+    routes = []
+    with ProcessPoolExecutor(max_workers=max(counts)) as pool, StubServer(routes) as stub:
+        data = build_container(message, LAT, LON, KEYWORD, MACHINE_ID, START, END)
+        key = generate_key(LAT, LON, KEYWORD, MACHINE_ID)
+        list(pool.map(hide_payload_in_bytes, [carriers[0]] * max(counts), [b""] * max(counts)))  # start workers
+
+        print(f"\n{'carriers':>8} {'embed ms':>9} {'fetch+join ms':>14}")
+        for n in [1] + counts:
+            if n == 1:
+                embed = lambda: [hide_payload_in_bytes(carriers[0], data)]
+            else:
+                embed = lambda n=n: hide_message_across_bytes(carriers[:n], message, LAT, LON, KEYWORD, MACHINE_ID,
+                                                              START, END, executor=pool)
+            embed_seconds, pngs = best_of(embed, args.repeat)
+
+            # Serve this round's carriers, each behind the download delay
+            routes[:] = [(f"/{n}/{i}.png", lambda handler, body, png=png: (time.sleep(args.delay), (
+                200, {"Content-Type": "image/png"}, png))[1]) for i, png in enumerate(pngs)]
+            urls = [f"{stub.url}/{n}/{i}.png" for i in range(n)]
+            fetch_seconds, container = best_of(lambda: fetch(urls), args.repeat)
+            assert decrypt_message(key, container["iv"], container["tag"], container["msg"]).decode() == message
+            print(f"{n:>8} {embed_seconds * 1000:>9.1f} {fetch_seconds * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
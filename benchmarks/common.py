@@ -0,0 +1,56 @@
+import os
+import sys
+import time
+
+import numpy as np
+
+# Benchmarks import the service modules the same way comment_scraper does.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# (label, height, width) of the synthetic carriers used across benchmarks
+IMAGE_SIZES = [
+    ("VGA", 480, 640),
+    ("HD", 720, 1280),
+    ("FHD", 1080, 1920),
+    ("12MP", 3000, 4000),
+]
+
+
+def synthetic_image(height, width, channels=3, dtype=np.uint8, seed=0):
+    """Random carrier image shaped like cv2.imread output."""
+    rng = np.random.default_rng(seed)
+    high = np.iinfo(dtype).max + 1
+    shape = (height, width) if channels == 1 else (height, width, channels)
+    return rng.integers(0, high, size=shape, dtype=dtype)
+
+
+def synthetic_payload(size, seed=0):
+    """Base64-alphabet payload terminated like the legacy stego format."""
+    rng = np.random.default_rng(seed)
+    alphabet = np.frombuffer(b"ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/", dtype=np.uint8)
+    return rng.choice(alphabet, size=size).tobytes() + b"###"
+
+
+def best_of(fn, repeat=3):
+    """Runs fn `repeat` times and returns (best seconds, last result)."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+_WORDS = (
+    "love this post great video so cool amazing view sunset beach coffee morning "
+    "mountain hike city lights rainy day music concert dog cat pizza travel friends "
+    "happy birthday congrats wow nice shot beautiful colours weekend vibes"
+).split()
+
+
+def synthetic_comments(count, seed=0, min_words=3, max_words=15):
+    """Random short comments drawn from a small social-media vocabulary."""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(min_words, max_words + 1, size=count)
+    return [" ".join(rng.choice(_WORDS, size=n)) for n in lengths]
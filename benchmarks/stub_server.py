@@ -0,0 +1,70 @@
+import json
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Routes GET/POST requests to the callables in `server.routes` by path prefix."""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body go out in separate writes; avoid Nagle/delayed-ACK stalls on keep-alive
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def _dispatch(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        for prefix, route in self.server.routes:
+            if self.path.startswith(prefix):
+                status, headers, payload = route(self, body)
+                break
+        else:
+            status, headers, payload = 404, {}, b"not found"
+
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode()
+            headers.setdefault("Content-Type", "application/json")
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    do_GET = do_POST = do_HEAD = _dispatch
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """
+    Local HTTP server standing in for Reddit/YouTube/Apify and image hosts.
+
+    Each route is a (path prefix, handler) pair; handlers receive the request
+    handler and raw body and return (status, headers, payload). JSON payloads
+    may be given as plain Python objects.
+    """
+
+    def __init__(self, routes):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.httpd.routes = routes
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def json_route(payload, status=200, headers=None):
+    return lambda handler, body: (status, dict(headers or {}), payload)
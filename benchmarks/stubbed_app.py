@@ -0,0 +1,52 @@
+"""
+The service with its upstreams replaced by a local stub, for load tests.
+
+    STEGO_BENCH_COMMENTS_URL=http://127.0.0.1:PORT/comments \\
+        gunicorn benchmarks.stubbed_app:wsgi_app
+        uvicorn benchmarks.stubbed_app:asgi_app
+
+Comments are fetched over HTTP from STEGO_BENCH_COMMENTS_URL (a JSON list)
+instead of Reddit/YouTube/Instagram. STEGO_BENCH_STUB_NLP=1 also replaces the
+keyword matcher with "first keyword wins" so runs measure the I/O path without
+loading the model.
+"""
+import os
+
+import requests
+
+import benchmarks.common  # noqa: F401  (puts the service modules on sys.path)
+from config import env_flag
+import decrypt_pipeline
+from NLP_comment_and_keyword_analyser import MatchResult
+
+COMMENTS_URL = os.environ["STEGO_BENCH_COMMENTS_URL"]
+STUB_NLP = env_flag("STEGO_BENCH_STUB_NLP")
+
+
+def stream_stub_comments(url, stop=None):
+    response = requests.get(COMMENTS_URL, params={"url": url}, timeout=30)
+    response.raise_for_status()
+    yield response.json()
+
+
+class FirstKeywordMatcher:
+    """Stands in for StreamingMatcher: the first keyword is a certain match."""
+
+    def __init__(self, keywords, **kwargs):
+        self.best = MatchResult(keywords[0], 1.0, None)
+        self.comments_seen = 0
+
+    def feed(self, comments):
+        self.comments_seen += len(comments)
+        return True
+
+    def candidates(self, limit=None):
+        return [self.best]
+
+
+decrypt_pipeline.stream_comments = stream_stub_comments
+if STUB_NLP:
+    decrypt_pipeline.StreamingMatcher = FirstKeywordMatcher
+
+from final import app as wsgi_app  # noqa: E402
+from asgi import app as asgi_app  # noqa: E402
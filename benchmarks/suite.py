@@ -0,0 +1,320 @@
+"""
+Reproducible benchmark suite: encode, decode, crypto, matching and full endpoints.
+
+Every case runs on synthetic inputs with fixed seeds; network upstreams (image
+host, YouTube, Apify) are local stub servers. Caches are disabled so repeated
+runs measure the work itself. Results can be written as JSON and compared
+against a saved baseline; the exit status is 1 if any case regressed, errored,
+or is missing from the run.
+
+Usage:
+    python -m benchmarks.suite [--only PATTERN[,PATTERN]] [--sizes VGA,HD] [--repeat 5] \\
+        [--output results.json] [--baseline baseline.json] [--tolerance 0.15]
+
+PATTERN is an fnmatch pattern on case names, e.g. 'e2e/*' or '*/FHD'.
+"""
+import os
+
+# Before the service modules are imported: no caches, no files next to the repo
+for _name, _value in {
+    "STEGO_PAYLOAD_CACHE_SIZE": "0",
+    "STEGO_COMMENT_CACHE_TTL": "0",
+    "STEGO_EMBEDDING_CACHE_SIZE": "0",
+    "STEGO_LOCATION_BACKEND": "memory",
+    "STEGO_JOB_BACKEND": "memory",
+    "STEGO_MATCH_STOP_SCORE": "2",  # score every comment page, as a worst case
+}.items():
+    os.environ.setdefault(_name, _value)
+
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.common import IMAGE_SIZES, synthetic_image, synthetic_comments
+from benchmarks.stub_server import StubServer
+from benchmarks.bench_comment_streaming import PagedComments, youtube_route, apify_routes
+
+KEYWORDS = ["sunset", "coffee", "concert", "birthday", "hiking"]
+MESSAGE = "meet me at the old pier at nine"
+LAT, LON, MACHINE_ID = 12.3456, 77.5555, "bench-device"
+START, END = 1_700_000_000, 1_900_000_000
+
+
+class Case:
+    """A named benchmark: setup() builds inputs once, run(state) is timed `number` times per repeat."""
+
+    def __init__(self, name, setup, run, number=1, params=None):
+        self.name = name
+        self.setup = setup
+        self.run = run
+        self.number = number
+        self.params = params or {}
+
+
+def time_case(case, repeat):
+    state = case.setup()
+    case.run(state)  # warm-up: lazy imports, model load, connection setup
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(case.number):
+            case.run(state)
+        samples.append((time.perf_counter() - start) / case.number)
+    return {
+        "best": min(samples),
+        "median": statistics.median(samples),
+        "repeat": repeat,
+        "number": case.number,
+        "params": case.params,
+    }
+
+
+def _carrier_png(height, width):
+    return cv2.imencode(".png", synthetic_image(height, width))[1].tobytes()
+
+
+def encode_cases(sizes):
+    from stego_encoder import hide_message_in_array, encode_png
+
+    for label, height, width in sizes:
+        params = {"height": height, "width": width}
+        yield Case(f"encode/hide_message_in_array/{label}",
+                   lambda h=height, w=width: synthetic_image(h, w),
+                   lambda img: hide_message_in_array(img.copy(), MESSAGE, LAT, LON, "coffee", MACHINE_ID, START, END),
+                   params=params)
+        yield Case(f"encode/png_encode/{label}",
+                   lambda h=height, w=width: synthetic_image(h, w),
+                   encode_png,
+                   params=params)
+
+
+def decode_cases(sizes):
+    from stego_encoder import hide_message_in_array
+    from stego_container import read_container
+
+    for label, height, width in sizes:
+        yield Case(f"decode/read_container/{label}",
+                   lambda h=height, w=width: hide_message_in_array(
+                       synthetic_image(h, w), MESSAGE, LAT, LON, "coffee", MACHINE_ID, START, END),
+                   read_container,
+                   params={"height": height, "width": width})
+
+
+def crypto_cases():
+    from stego_crypto import generate_key, encrypt_message
+
+    yield Case("crypto/generate_key", lambda: None,
+               lambda _: generate_key(LAT, LON, "coffee", MACHINE_ID), number=2000)
+    yield Case("crypto/encrypt_message", lambda: generate_key(LAT, LON, "coffee", MACHINE_ID),
+               lambda key: encrypt_message(MESSAGE, key), number=2000)
+
+
+def match_cases():
+    from NLP_comment_and_keyword_analyser import find_best_match
+
+    for count in (100, 1000):
+        yield Case(f"match/find_best_match/{count}",
+                   lambda n=count: synthetic_comments(n),
+                   lambda comments: find_best_match(KEYWORDS, comments),
+                   params={"comments": count})
+
+
+@contextlib.contextmanager
+def upstream_stubs(stego_png, pages=3, page_size=100):
+    """Image host plus paged YouTube/Apify stubs, with the scrapers' clients pointed at them."""
+    from apify_client import ApifyClient
+    from googleapiclient.discovery import build
+    from googleapiclient.http import build_http
+    import client_registry
+    import instagram_scraper
+    import youtube_scraper
+
+    comments = PagedComments(pages, page_size, match_page=pages - 1, delay=0)
+    routes = [("/stego.png", lambda handler, body: (200, {"Content-Type": "image/png"}, stego_png)),
+              ("/youtube/v3/", youtube_route(comments))] + apify_routes(comments, page_size)
+
+    with StubServer(routes) as stub:
+        youtube_scraper.YOUTUBE_API_KEY = instagram_scraper.APIFY_TOKEN = "stub"
+        instagram_scraper.POLL_INTERVAL = 0
+        client_registry.register("youtube", lambda: build('youtube', 'v3', developerKey='stub', cache_discovery=False,
+                                                          client_options={"api_endpoint": stub.url + "/"}))
+        client_registry.register("youtube_http", build_http, per_thread=True)
+        client_registry.register("apify", lambda: ApifyClient('stub', api_url=stub.url))
+        yield stub
+
+
+class Endpoints:
+    """Flask test client and upstream stubs, started by the first e2e case that runs."""
+
+    def __init__(self, stack, size):
+        self.stack = stack
+        self.size = size
+        self.client = None
+        self.stub = None
+
+    def start(self):
+        if self.client is not None:
+            return self
+        import final
+        from stego_encoder import hide_message_in_bytes
+
+        self.client = final.app.test_client()
+        self.client.post('/store-location', json={"senderEmail": "bench@example.com", "latitude": LAT,
+                                                  "longitude": LON, "deviceId": MACHINE_ID})
+        _, height, width = self.size
+        # The paged stubs put "espresso" on their last page
+        stego = hide_message_in_bytes(_carrier_png(height, width), MESSAGE, LAT, LON, "espresso", MACHINE_ID, START, END)
+        self.stub = self.stack.enter_context(upstream_stubs(stego))
+        return self
+
+    def encrypt(self, png):
+        response = self.client.post('/encrypt', content_type='multipart/form-data', data={
+            "image": (io.BytesIO(png), "carrier.png"), "message": MESSAGE, "keyword": "espresso",
+            "startTimestamp": "2020-01-01T00:00", "endTimestamp": "2035-01-01T00:00",
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    def decrypt(self, comment_url):
+        response = self.client.post('/decrypt', data={
+            "image_url": self.stub.url + "/stego.png", "comment_url": comment_url, "keyword": "espresso, violin",
+            "latitude": str(LAT), "longitude": str(LON), "machine_id": MACHINE_ID, "timestamp": str(START + 60),
+        })
+        assert response.status_code == 200, response.get_data(as_text=True)
+        assert response.get_json()["message"] == MESSAGE
+
+
+def e2e_cases(sizes, stack):
+    """Full /encrypt and /decrypt requests through the Flask test client."""
+    endpoints = Endpoints(stack, sizes[0])
+
+    for label, height, width in sizes:
+        yield Case(f"e2e/encrypt/{label}",
+                   lambda h=height, w=width: (endpoints.start(), _carrier_png(h, w))[1],
+                   endpoints.encrypt,
+                   params={"height": height, "width": width})
+
+    label, height, width = sizes[0]
+    for platform_name, comment_url in (("youtube", "https://www.youtube.com/watch?v=bench"),
+                                       ("instagram", "https://www.instagram.com/p/bench/")):
+        yield Case(f"e2e/decrypt/{platform_name}/{label}",
+                   lambda url=comment_url: (endpoints.start(), url)[1],
+                   endpoints.decrypt,
+                   params={"height": height, "width": width, "comment_pages": 3})
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "opencv": cv2.__version__,
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit,
+        "timestamp": int(time.time()),
+    }
+
+
+def compare(results, baseline, tolerance, expected=None):
+    """
+    Prints current vs baseline best times and returns the names of regressed cases.
+
+    A case regresses when it is slower than 1 + tolerance, when it errored in
+    this run, or when the baseline has it but this run did not produce it.
+    `expected(name)` limits the last check to cases this run was asked for.
+    """
+    regressions = []
+    previous_results = baseline.get("results", {})
+    print(f"\n{'case':<44} {'baseline ms':>12} {'current ms':>11} {'ratio':>7}")
+    for name, result in results.items():
+        previous = previous_results.get(name)
+        if previous is None or "best" not in previous:
+            continue
+        if "best" not in result:
+            print(f"{name:<44} {previous['best'] * 1000:>12.3f} {'error':>11} {'':>7}  REGRESSION")
+            regressions.append(name)
+            continue
+        ratio = result["best"] / previous["best"]
+        flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+        print(f"{name:<44} {previous['best'] * 1000:>12.3f} {result['best'] * 1000:>11.3f} {ratio:>6.2f}x{flag}")
+        if flag:
+            regressions.append(name)
+    for name, previous in previous_results.items():
+        if name in results or "best" not in previous or (expected is not None and not expected(name)):
+            continue
+        print(f"{name:<44} {previous['best'] * 1000:>12.3f} {'missing':>11} {'':>7}  REGRESSION")
+        regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--only", default="*", help="comma-separated fnmatch patterns on case names")
+    parser.add_argument("--sizes", default="VGA,HD,FHD", help=f"labels from {[s[0] for s in IMAGE_SIZES]}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against a JSON file written by --output")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown before a case counts as regressed")
+    args = parser.parse_args()
+
+    wanted = set(args.sizes.split(","))
+    sizes = [size for size in IMAGE_SIZES if size[0] in wanted]
+    patterns = args.only.split(",")
+
+    results = {}
+    print(f"{'case':<44} {'best ms':>10} {'median ms':>10}")
+    with contextlib.ExitStack() as stack:
+        groups = [encode_cases(sizes), decode_cases(sizes), crypto_cases(), match_cases(), e2e_cases(sizes, stack)]
+        for group in groups:
+            for case in group:
+                if not any(fnmatch.fnmatch(case.name, pattern) for pattern in patterns):
+                    continue
+                try:
+                    # The service prints per-request progress; keep the table readable
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        result = time_case(case, args.repeat)
+                except Exception as e:
+                    results[case.name] = {"error": f"{type(e).__name__}: {e}", "params": case.params}
+                    print(f"{case.name:<44} {'error':>10}  {type(e).__name__}: {e}")
+                    continue
+                results[case.name] = result
+                print(f"{case.name:<44} {result['best'] * 1000:>10.3f} {result['median'] * 1000:>10.3f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2, sort_keys=True)
+        print(f"\nwrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        size_labels = {size[0] for size in IMAGE_SIZES}
+
+        def expected(name):
+            # Baseline cases outside this run's --only/--sizes selection are not missing
+            label = name.rsplit("/", 1)[-1]
+            return (any(fnmatch.fnmatch(name, pattern) for pattern in patterns)
+                    and (label not in size_labels or label in wanted))
+
+        regressions = compare(results, baseline, args.tolerance, expected)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) regressed: slower by more than {args.tolerance:.0%}, errored or missing")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
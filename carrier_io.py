@@ -0,0 +1,410 @@
+import mmap
+import os
+import struct
+import zlib
+
+import cv2
+import numpy as np
+
+from metrics import span
+from stego_codec import embed_lsb, read_lsb_bytes
+from stego_container import (
+    read_container as read_decoded_container, decode_framed, framed_length, SHARD_HEADER, ContainerError,
+)
+
+# Carrier I/O: reads and writes only the pixel samples that hold the payload.
+#
+# The LSB codec walks samples in cv2.imread(IMREAD_UNCHANGED) order (row,
+# column, channel with BGR/BGRA channels), and the payload sits in the first
+# few KB of samples. Carriers expose that prefix without decoding the rest:
+#
+#   PNG (8/16-bit gray, RGB, RGBA, non-interlaced) - scanlines are inflated and
+#       unfiltered only up to the last row needed
+#   BMP (24-bit, uncompressed), PGM/PPM (binary, 8/16-bit) - pixels are
+#       memory-mapped (files) or viewed in place (bytes), never copied whole
+#   anything else - decoded in full with cv2, as before
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# PNG color type -> channels; palette and gray+alpha are left to cv2
+PNG_CHANNELS = {0: 1, 2: 3, 6: 4}
+# Compressed bytes handed to zlib per call while inflating PNG rows
+INFLATE_INPUT = 64 * 1024
+# File extensions of the formats RawCarrier can map (subject to the header checks)
+RAW_EXTENSIONS = (".bmp", ".dib", ".pgm", ".ppm", ".pnm")
+
+
+class CarrierError(ValueError):
+    """Raised when a carrier cannot be decoded."""
+
+
+class DecodedCarrier:
+    """Fallback for formats read in full by cv2; also the source of truth the fast paths must match."""
+
+    def __init__(self, source):
+        with span("image_decode"):
+            if isinstance(source, (bytes, bytearray, memoryview, mmap.mmap)):
+                img = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+            else:
+                img = cv2.imread(source, cv2.IMREAD_UNCHANGED)
+        if img is None:
+            raise CarrierError("Invalid image data or unsupported format")
+        self.img = img
+        self.shape = img.shape
+        self.dtype = img.dtype
+
+    @property
+    def size(self):
+        return self.img.size
+
+    def samples(self, count):
+        return self.img.reshape(-1)[:count]
+
+    def decode(self):
+        return self.img
+
+
+class _RowCarrier:
+    """Base for carriers that can materialize the first rows of the image on their own."""
+
+    shape = None
+    dtype = None
+
+    @property
+    def size(self):
+        return int(np.prod(self.shape))
+
+    @property
+    def _row_samples(self):
+        return int(np.prod(self.shape[1:]))
+
+    def _rows(self, count):
+        """Returns the first `count` rows in cv2 layout."""
+        raise NotImplementedError
+
+    def samples(self, count):
+        """The first `count` samples in cv2 order, decoding only the rows they live in."""
+        count = min(count, self.size)
+        rows = -(-count // self._row_samples)
+        return np.ascontiguousarray(self._rows(rows)).reshape(-1)[:count]
+
+
+class PNGCarrier(_RowCarrier):
+    """
+    Non-interlaced 8/16-bit gray, RGB and RGBA PNGs, decoded row by row.
+
+    IDAT data is inflated incrementally, so reading the first rows of a large
+    carrier costs a few KB of zlib output instead of the whole bitmap.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self._decoded = None
+        width, height, depth, color_type, interlace, self._chunks = _parse_png(data)
+        channels = PNG_CHANNELS[color_type]
+        self.shape = (height, width) if channels == 1 else (height, width, channels)
+        self.dtype = np.dtype(np.uint8 if depth == 8 else np.uint16)
+        self._file_dtype = np.dtype(">u2") if depth == 16 else np.dtype(np.uint8)
+        self._bpp = channels * self._file_dtype.itemsize
+        self._stride = width * self._bpp
+        self._inflater = zlib.decompressobj()
+        self._pending = b""
+        self._tail = b""
+        self._raw = bytearray()
+        self._recon = []
+
+    def _inflate(self, needed):
+        while len(self._raw) < needed:
+            if self._tail:
+                data = self._tail
+            else:
+                if not self._pending:
+                    self._pending = next(self._chunks, None)
+                    if self._pending is None:
+                        raise CarrierError("PNG image data truncated")
+                # Fed in slices: encoders often write a single IDAT chunk, and
+                # zlib would copy all of it into unconsumed_tail on every call
+                data, self._pending = self._pending[:INFLATE_INPUT], self._pending[INFLATE_INPUT:]
+            self._raw += self._inflater.decompress(data, needed - len(self._raw))
+            self._tail = self._inflater.unconsumed_tail
+
+    def _rows(self, count):
+        if self._decoded is not None:
+            return self._decoded[:count]
+        with span("image_decode"):
+            self._inflate(count * (self._stride + 1))
+            prev = bytes(self._stride) if not self._recon else self._recon[-1]
+            for row in range(len(self._recon), count):
+                start = row * (self._stride + 1)
+                line = _unfilter(self._raw[start], self._raw[start + 1:start + 1 + self._stride], prev, self._bpp)
+                self._recon.append(line)
+                prev = line
+        pixels = np.frombuffer(b"".join(self._recon[:count]), dtype=self._file_dtype)
+        pixels = pixels.reshape((count,) + self.shape[1:]).astype(self.dtype)
+        return _rgb_to_bgr(pixels)
+
+    def decode(self):
+        if self._decoded is None:
+            self._decoded = DecodedCarrier(self.data).img
+        return self._decoded
+
+
+class RawCarrier(_RowCarrier):
+    """
+    Uncompressed BMP/PGM/PPM pixels addressed in place.
+
+    Backed by a memory map for files (optionally writable, for in-place
+    embedding) or a zero-copy view of downloaded bytes.
+    """
+
+    def __init__(self, buffer, layout, writable=False):
+        self._buffer = buffer
+        self.writable = writable
+        offset, height, width, channels, file_dtype, bottom_up, row_stride, reverse_channels = layout
+        self.shape = (height, width) if channels == 1 else (height, width, channels)
+        self.dtype = np.dtype(file_dtype).newbyteorder("=")
+        self._bottom_up = bottom_up
+        self._reverse_channels = reverse_channels
+        row_bytes = width * channels * np.dtype(file_dtype).itemsize
+        # Row-strided view over the pixel area; BMP rows are padded to 4 bytes
+        rows = np.ndarray((height, row_stride), dtype=np.uint8, buffer=buffer, offset=offset)[:, :row_bytes]
+        self._pixels = rows.view(file_dtype).reshape((height, width, channels))
+
+    def _file_rows(self, count):
+        height = self.shape[0]
+        if self._bottom_up:
+            return self._pixels[height - count:][::-1]
+        return self._pixels[:count]
+
+    def _rows(self, count):
+        rows = self._file_rows(count)
+        if self._reverse_channels:
+            rows = rows[..., ::-1]
+        return rows.astype(self.dtype).reshape((count,) + self.shape[1:])
+
+    def write_samples(self, values):
+        """Writes `values` over the first len(values) samples, in cv2 order."""
+        if not self.writable:
+            raise CarrierError("Carrier is read-only")
+        count = len(values)
+        rows = -(-count // self._row_samples)
+        current = np.ascontiguousarray(self._rows(rows)).reshape(-1)
+        current[:count] = values
+        updated = current.reshape((rows,) + self._pixels.shape[1:])
+        if self._reverse_channels:
+            updated = updated[..., ::-1]
+        self._file_rows(rows)[...] = updated
+
+    def flush(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.flush()
+
+    def decode(self):
+        return self._rows(self.shape[0])
+
+
+def _rgb_to_bgr(pixels):
+    if pixels.ndim == 3 and pixels.shape[2] in (3, 4):
+        order = [2, 1, 0] if pixels.shape[2] == 3 else [2, 1, 0, 3]
+        return pixels[..., order]
+    return pixels
+
+
+def _paeth(a, b, c):
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(filter_type, line, prev, bpp):
+    """Reverses one PNG scanline filter; `prev` is the previous reconstructed row."""
+    if filter_type == 0:
+        return bytes(line)
+    if filter_type == 2:
+        return (np.frombuffer(bytes(line), np.uint8) + np.frombuffer(prev, np.uint8)).tobytes()
+    if filter_type == 1:
+        # Sub is a running sum per byte lane; uint8 accumulation wraps modulo 256
+        lanes = np.frombuffer(bytes(line), np.uint8).reshape(-1, bpp)
+        return np.add.accumulate(lanes, axis=0, dtype=np.uint8).tobytes()
+
+    out = bytearray(line)
+    if filter_type == 3:
+        for i in range(len(out)):
+            left = out[i - bpp] if i >= bpp else 0
+            out[i] = (out[i] + ((left + prev[i]) >> 1)) & 0xFF
+    elif filter_type == 4:
+        for i in range(len(out)):
+            if i >= bpp:
+                out[i] = (out[i] + _paeth(out[i - bpp], prev[i], prev[i - bpp])) & 0xFF
+            else:
+                out[i] = (out[i] + prev[i]) & 0xFF
+    else:
+        raise CarrierError(f"Unknown PNG filter type: {filter_type}")
+    return bytes(out)
+
+
+def _parse_png(data):
+    """
+    Returns (width, height, depth, color_type, interlace, IDAT payload iterator), or raises ValueError if unsupported.
+
+    Chunks are walked lazily: on a mapped file only the pages up to the rows
+    actually inflated are touched.
+    """
+    view = memoryview(data)
+    pos = len(PNG_SIGNATURE)
+    header = None
+    while pos + 8 <= len(view):
+        length, chunk_type = struct.unpack_from(">I4s", view, pos)
+        if chunk_type == b"IHDR":
+            header = struct.unpack(">IIBBBBB", view[pos + 8:pos + 8 + length])
+        elif chunk_type == b"tRNS":
+            raise ValueError("transparency chunk")  # cv2 may expand it to an alpha channel
+        elif chunk_type in (b"IDAT", b"IEND"):
+            break  # tRNS and IHDR must precede the image data
+        pos += 12 + length
+
+    if header is None or pos + 8 > len(view) or chunk_type != b"IDAT":
+        raise ValueError("missing IHDR or IDAT")
+    width, height, depth, color_type, _, _, interlace = header
+    if interlace or depth not in (8, 16) or color_type not in PNG_CHANNELS:
+        raise ValueError("unsupported PNG layout")
+    return width, height, depth, color_type, interlace, _idat_chunks(view, pos)
+
+
+def _idat_chunks(view, pos):
+    while pos + 8 <= len(view):
+        length, chunk_type = struct.unpack_from(">I4s", view, pos)
+        if chunk_type == b"IEND":
+            return
+        if chunk_type == b"IDAT":
+            yield view[pos + 8:pos + 8 + length]
+        pos += 12 + length
+
+
+def _netpbm_layout(data):
+    """Layout of a binary PGM (P5) or PPM (P6) image."""
+    magic = bytes(data[:2])
+    if magic not in (b"P5", b"P6"):
+        raise ValueError("not a binary netpbm image")
+    fields = []
+    pos = 2
+    while len(fields) < 3:
+        while data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b"#":
+            while data[pos:pos + 1] not in (b"\n", b"\r", b""):
+                pos += 1
+            continue
+        start = pos
+        while data[pos:pos + 1].isdigit():
+            pos += 1
+        if start == pos:
+            raise ValueError("malformed netpbm header")
+        fields.append(int(data[start:pos]))
+    width, height, maxval = fields
+    channels = 3 if magic == b"P6" else 1
+    file_dtype = np.dtype(np.uint8) if maxval < 256 else np.dtype(">u2")
+    row_stride = width * channels * file_dtype.itemsize
+    # Exactly one whitespace byte separates maxval from the pixels
+    return pos + 1, height, width, channels, file_dtype, False, row_stride, channels == 3
+
+
+def _bmp_layout(data):
+    """Layout of an uncompressed 24-bit BMP."""
+    if bytes(data[:2]) != b"BM":
+        raise ValueError("not a BMP image")
+    offset, = struct.unpack_from("<I", data, 10)
+    width, height, _, bpp, compression = struct.unpack_from("<iiHHI", data, 18)
+    if bpp != 24 or compression != 0 or width <= 0 or height == 0:
+        raise ValueError("unsupported BMP layout")
+    row_stride = (width * 3 + 3) & ~3
+    return offset, abs(height), width, 3, np.dtype(np.uint8), height > 0, row_stride, False
+
+
+def _raw_layout(data):
+    for parse in (_bmp_layout, _netpbm_layout):
+        try:
+            layout = parse(data)
+        except (ValueError, struct.error, IndexError):
+            continue
+        offset, height, width, channels, file_dtype, _, row_stride, _ = layout
+        if offset + height * row_stride <= len(data):
+            return layout
+    return None
+
+
+def open_carrier(source, writable=False):
+    """
+    Opens a carrier image from encoded bytes or a file path.
+
+    Args:
+        source (bytes | str): Encoded image, or the path of an image file.
+        writable (bool): Map a raw (BMP/PGM/PPM) file read-write so
+            embed_into_file can modify it in place.
+
+    Returns:
+        PNGCarrier, RawCarrier or DecodedCarrier: All expose samples(count),
+        decode() and size.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        if bytes(source[:8]) == PNG_SIGNATURE:
+            try:
+                return PNGCarrier(source)
+            except (ValueError, struct.error):
+                pass
+        layout = _raw_layout(source)
+        if layout is not None:
+            return RawCarrier(source, layout)
+        return DecodedCarrier(source)
+
+    with open(source, "r+b" if writable else "rb") as f:
+        if os.fstat(f.fileno()).st_size:
+            # Only the pages holding headers and the payload rows are ever read in
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+            if buffer[:8] == PNG_SIGNATURE and not writable:
+                try:
+                    return PNGCarrier(buffer)
+                except (ValueError, struct.error):
+                    pass
+            layout = _raw_layout(buffer)
+            if layout is not None:
+                return RawCarrier(buffer, layout, writable)
+            buffer.close()
+    return DecodedCarrier(source)
+
+
+def read_carrier_container(carrier):
+    """
+    Reads the stego container from a carrier, touching only the samples it occupies.
+
+    Legacy delimiter payloads have no length header and fall back to a full decode.
+
+    Returns:
+        dict: Raw container fields, or {'shard': Shard} (see stego_container.decode_framed).
+    """
+    total = framed_length(read_lsb_bytes(carrier.samples(SHARD_HEADER.size * 8), SHARD_HEADER.size))
+    if total is not None:
+        if total * 8 > carrier.size:
+            raise ContainerError("Container body truncated")
+        return decode_framed(read_lsb_bytes(carrier.samples(total * 8), total))
+    return read_decoded_container(carrier.decode())
+
+
+def embed_into_file(path, data):
+    """
+    Embeds `data` into a BMP/PGM/PPM file in place, rewriting only the samples that carry it.
+
+    Raises:
+        CarrierError: If the file is not an uncompressed format this module can map.
+        ValueError: If the payload does not fit.
+    """
+    carrier = open_carrier(path, writable=True)
+    if not isinstance(carrier, RawCarrier):
+        raise CarrierError("In-place embedding needs an uncompressed BMP, PGM or PPM carrier")
+    if len(data) * 8 > carrier.size:
+        raise ValueError("Message too large to hide in image")
+    with span("lsb_embed"):
+        prefix = carrier.samples(len(data) * 8).copy()
+        carrier.write_samples(embed_lsb(prefix, data))
+        carrier.flush()
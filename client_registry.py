@@ -0,0 +1,51 @@
+import threading
+
+# Process-wide registry of API clients.
+#
+# Clients that are safe to share between threads are created once per process.
+# Clients whose transport is not thread-safe (praw's session, httplib2) are
+# created once per thread and then reused by every request served on it.
+_factories = {}
+_shared = {}
+_local = threading.local()
+_lock = threading.Lock()
+
+
+def register(name, factory, per_thread=False):
+    """Registers `factory` (a zero-argument callable) as the way to build client `name`."""
+    with _lock:
+        _factories[name] = (factory, per_thread)
+        _shared.pop(name, None)
+
+
+def get(name):
+    """Returns the client registered as `name`, building it on first use."""
+    factory, per_thread = _factories[name]
+
+    if per_thread:
+        clients = _local.__dict__.setdefault("clients", {})
+        if name not in clients:
+            clients[name] = factory()
+        return clients[name]
+
+    client = _shared.get(name)
+    if client is None:
+        with _lock:
+            client = _shared.get(name)
+            if client is None:
+                client = _shared[name] = factory()
+    return client
+
+
+def reset(name=None):
+    """Drops cached clients (all, or just `name`) so the next get() rebuilds them."""
+    with _lock:
+        if name is None:
+            _shared.clear()
+        else:
+            _shared.pop(name, None)
+    clients = _local.__dict__.get("clients", {})
+    if name is None:
+        clients.clear()
+    else:
+        clients.pop(name, None)
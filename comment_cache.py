@@ -0,0 +1,282 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+
+from sqlite_store import ThreadConnections
+
+# Query parameters that never change which post a URL points to
+TRACKING_PARAMS = ("si", "feature", "igshid", "igsh", "utm_source", "utm_medium",
+                   "utm_campaign", "utm_term", "utm_content", "share_id", "context")
+
+
+def canonicalize_url(url):
+    """Normalizes a post URL so share-link variants of the same post share a cache entry."""
+    parsed = urlparse(url.strip())
+    scheme = (parsed.scheme or "https").lower()
+    host = parsed.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if host.startswith("m."):
+        host = host[2:]
+    path = parsed.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parsed.query) if k.lower() not in TRACKING_PARAMS
+    ))
+    return urlunparse((scheme, host, path, "", query, ""))
+
+
+class MemoryCommentStore:
+    """Size-bounded in-process store; least recently used entries are evicted first."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, comments, fetched_at):
+        with self._lock:
+            self._entries[key] = (comments, fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteCommentStore:
+    """Local-file store shared by every worker on the host."""
+
+    def __init__(self, path, max_entries=256):
+        self.path = path
+        self.max_entries = max_entries
+        self._connections = ThreadConnections(path)
+        self._connections.create(
+            "CREATE TABLE IF NOT EXISTS comments ("
+            "key TEXT PRIMARY KEY, comments TEXT NOT NULL, "
+            "fetched_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+
+    def get(self, key):
+        conn = self._connections.get()
+        row = conn.execute("SELECT comments, fetched_at FROM comments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE comments SET accessed_at = ? WHERE key = ?", (time.time(), key))
+        conn.commit()
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, comments, fetched_at):
+        conn = self._connections.get()
+        conn.execute(
+            "INSERT OR REPLACE INTO comments (key, comments, fetched_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(comments), fetched_at, time.time()),
+        )
+        conn.execute(
+            "DELETE FROM comments WHERE key NOT IN "
+            "(SELECT key FROM comments ORDER BY accessed_at DESC LIMIT ?)",
+            (self.max_entries,),
+        )
+        conn.commit()
+
+
+class PageFlight:
+    """
+    One in-progress scrape, shared by every request streaming the same post.
+
+    The leader publishes pages as the scraper yields them; followers read them
+    in order and wait for more until the leader finishes. It doubles as the
+    scraper's stop event: is_set() once every reader has stopped.
+    """
+
+    def __init__(self):
+        self.pages = []
+        self.done = False
+        self.fallback = None
+        self._stops = []
+        self._cond = threading.Condition()
+
+    def join(self, stop=None):
+        """Registers a reader; returns the event that marks it stopped."""
+        stop = stop if stop is not None else threading.Event()
+        with self._cond:
+            self._stops.append(stop)
+        return stop
+
+    def publish(self, page):
+        with self._cond:
+            self.pages.append(page)
+            self._cond.notify_all()
+
+    def finish(self, fallback=None):
+        with self._cond:
+            self.done = True
+            self.fallback = fallback
+            self._cond.notify_all()
+
+    def read(self, index, stop):
+        """Returns page `index`, waiting for it; None once the scrape ended or `stop` is set."""
+        with self._cond:
+            while index >= len(self.pages) and not self.done and not stop.is_set():
+                self._cond.wait(0.1)
+            return self.pages[index] if index < len(self.pages) else None
+
+    def is_set(self):
+        with self._cond:
+            return all(stop.is_set() for stop in self._stops)
+
+    def wait(self, timeout):
+        """Sleeps up to `timeout` seconds, returning early (True) once every reader has stopped."""
+        deadline = time.monotonic() + timeout
+        while not self.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(remaining, 0.1))
+        return True
+
+
+class CommentCache:
+    """
+    TTL cache in front of the comment scrapers.
+
+    Concurrent misses for the same post share a single scrape (single-flight):
+    the first request streams the pages and every other one reads them as
+    they are published. Only a scrape that ran to its last page is cached.
+    When a refresh fails or comes back empty, which is how the scrapers
+    report failures, the stale entry keeps being served for up to
+    `stale_ttl` seconds instead of being overwritten.
+    """
+
+    def __init__(self, store, ttl=300, stale_ttl=3600):
+        self.store = store
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stale_hits = 0
+        self.deduplicated = 0
+
+    def stream(self, url, pages_fn, stop=None):
+        """
+        Yields comment pages for `url`: a fresh entry as one page, or the pages
+        of a scrape shared with concurrent requests for the same post.
+
+        Args:
+            url (str): Post URL.
+            pages_fn (callable): pages_fn(url, stop) yields comment pages and
+                raises if the scrape fails; `stop` is set once every reader
+                has stopped, so the scraper can give up between pages.
+            stop (threading.Event): Set by the caller when it stops reading.
+        """
+        key = canonicalize_url(url)
+        now = time.time()
+        entry = self.store.get(key)
+
+        if entry is not None and now - entry[1] < self.ttl:
+            with self._lock:
+                self.hits += 1
+            yield entry[0]
+            return
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = PageFlight()
+                self.misses += 1
+            else:
+                self.deduplicated += 1
+            stop = flight.join(stop)
+
+        if leader:
+            yield from self._lead(key, url, entry, now, flight, pages_fn, stop)
+        else:
+            yield from self._follow(flight, stop)
+
+    def _lead(self, key, url, entry, now, flight, pages_fn, stop):
+        # Keeps scraping after its own reader stops while followers still read
+        comments = []
+        reading = True
+        complete = failed = False
+        try:
+            with closing(pages_fn(url, flight)) as pages:
+                for page in pages:
+                    comments.extend(page)
+                    flight.publish(page)
+                    if reading:
+                        try:
+                            yield page
+                        except GeneratorExit:
+                            reading = False
+                            stop.set()
+                    if not reading and flight.is_set():
+                        break
+                else:
+                    # A scraper that gave up because every reader stopped may have returned early
+                    complete = not flight.is_set()
+        except Exception:
+            failed = True
+        finally:
+            fallback = None
+            if complete and comments:
+                self.store.set(key, comments, time.time())
+            elif (failed or complete) and entry is not None and now - entry[1] < self.stale_ttl:
+                with self._lock:
+                    self.stale_hits += 1
+                fallback = entry[0]
+            flight.finish(fallback)
+            with self._lock:
+                del self._inflight[key]
+        if reading:
+            try:
+                if fallback is not None:
+                    yield fallback
+            finally:
+                stop.set()
+
+    @staticmethod
+    def _follow(flight, stop):
+        try:
+            index = 0
+            while True:
+                page = flight.read(index, stop)
+                if page is None:
+                    break
+                index += 1
+                yield page
+            if flight.done and flight.fallback is not None:
+                yield flight.fallback
+        finally:
+            stop.set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale_hits": self.stale_hits,
+                "deduplicated": self.deduplicated,
+            }
+
+
+def cache_from_env():
+    """Builds the comment cache configured by STEGO_COMMENT_CACHE_* variables, or None if disabled."""
+    ttl = float(os.getenv("STEGO_COMMENT_CACHE_TTL", "300"))
+    if ttl <= 0:
+        return None
+
+    max_entries = int(os.getenv("STEGO_COMMENT_CACHE_SIZE", "256"))
+    path = os.getenv("STEGO_COMMENT_CACHE_PATH")
+    store = SQLiteCommentStore(path, max_entries) if path else MemoryCommentStore(max_entries)
+    return CommentCache(store, ttl=ttl, stale_ttl=float(os.getenv("STEGO_COMMENT_CACHE_STALE_TTL", "3600")))
@@ -1,38 +1,171 @@
 import sys
 import os
+import queue
+import threading
+import time
 
 sys.path.append(os.path.dirname(__file__))
 
 from url_identifier import identify_url_type
-from reddit_scraper import fetch_reddit_comments
-from instagram_scraper import fetch_instagram_comments
-from youtube_scraper import fetch_youtube_comments
+from reddit_scraper import iter_reddit_comment_pages
+from instagram_scraper import iter_instagram_comment_pages
+from youtube_scraper import iter_youtube_comment_pages
+from comment_cache import cache_from_env
+from metrics import STAGE_SECONDS
+from contextlib import closing
+
+# Shared by every request in this process; None when STEGO_COMMENT_CACHE_TTL=0
+comment_cache = cache_from_env()
 
 def fetch_comments(comment_url):
     """
     Main function called by decrypt_handler.
-    Accepts a comment_url and routes it to the appropriate scraper.
+    Accepts a comment_url and returns a list of extracted comments, served
+    from the comment cache when a fresh entry exists.
+    """
+    return [comment for page in stream_comments(comment_url) for comment in page]
+
+def scrape_comments(comment_url):
+    """
+    Routes comment_url to the appropriate scraper, bypassing the cache.
     Returns a list of extracted comments.
     """
+    return [comment for page in iter_comment_pages(comment_url) for comment in page]
+
+# Metric label for each platform identify_url_type recognizes
+PLATFORM_LABELS = {
+    "Reddit Post": "reddit",
+    "Instagram Post": "instagram",
+    "YouTube Video": "youtube",
+}
+
+def iter_comment_pages(comment_url, stop=None, raise_errors=False):
+    """
+    Routes comment_url to the appropriate scraper and yields comment pages as
+    they are fetched, bypassing the cache. Closing the generator stops the
+    scraper before its next page; setting `stop` also ends a scraper that is
+    waiting for its next page.
+
+    A scraper error ends the pages early. With raise_errors it is re-raised
+    after logging, so callers can tell a partial scrape from a complete one.
+    """
+    started = time.perf_counter()
+    platform = None
     try:
         platform = identify_url_type(comment_url)
-        print(f"🔎 Identified platform: {platform}")
 
         if platform == "Reddit Post":
-            comments = fetch_reddit_comments(comment_url)
+            pages = iter_reddit_comment_pages(comment_url)
 
         elif platform == "Instagram Post":
-            comments = fetch_instagram_comments(comment_url)
+            pages = iter_instagram_comment_pages(comment_url, stop=stop)
 
         elif platform == "YouTube Video":
-            comments = fetch_youtube_comments(comment_url)
+            pages = iter_youtube_comment_pages(comment_url)
 
         else:
             print("⚠️ Unknown or unsupported URL format.")
-            comments = []
+            return
 
-        return comments
+        yield from pages
 
     except Exception as e:
         print(f"❌ Error in fetching comments: {e}")
-        return []
+        if raise_errors:
+            raise
+    finally:
+        if platform in PLATFORM_LABELS:
+            # Time until the last page or an early stop, so it also reflects short-circuited scrapes
+            STAGE_SECONDS.observe(time.perf_counter() - started, stage="scrape", platform=PLATFORM_LABELS[platform])
+
+def stream_comments(comment_url, stop=None):
+    """
+    Cached counterpart of iter_comment_pages.
+
+    A fresh cache entry is yielded as a single page. Otherwise pages are
+    streamed from a scrape shared with concurrent requests for the same post
+    (see CommentCache.stream), and cached only once the scraper finished.
+    Set `stop` when no longer reading so a waiting scraper can give up.
+    """
+    if comment_cache is None:
+        yield from iter_comment_pages(comment_url, stop=stop)
+        return
+
+    yield from comment_cache.stream(
+        comment_url, lambda url, flight: iter_comment_pages(url, stop=flight, raise_errors=True), stop=stop
+    )
+
+
+_END = object()
+
+
+class PrefetchedPages:
+    """
+    Reads a page generator on an executor thread, up to `depth` pages ahead of
+    the consumer, so scraping overlaps with whatever the caller does first.
+
+    Iterating raises TimeoutError if the pages are not all consumed within
+    `timeout` seconds of the first read. close() sets `stop` and stops the
+    producer before its next page; the scraper generator is then closed on
+    the producer thread. Pass the same `stop` event to the page generator so
+    a scraper waiting for its next page gives up too.
+    """
+
+    def __init__(self, pages, executor, timeout=None, depth=2, timer=None, stop=None):
+        self.timeout = timeout
+        self.pages_fetched = 0
+        self._queue = queue.Queue(maxsize=depth)
+        self._stop = stop if stop is not None else threading.Event()
+        self._deadline = None
+        self._timer = timer
+        executor.submit(self._produce, pages)
+
+    def _put(self, item):
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, pages):
+        started = time.perf_counter()
+        try:
+            with closing(pages):
+                for page in pages:
+                    self.pages_fetched += 1
+                    if not self._put(page):
+                        break
+        except Exception as e:
+            self._put(e)
+        finally:
+            if self._timer is not None:
+                self._timer.record("scrape", time.perf_counter() - started)
+            self._put(_END)
+
+    def next_page(self):
+        """Returns the next page, or None when the scraper is exhausted."""
+        if self._deadline is None and self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
+        remaining = None if self._deadline is None else max(0.0, self._deadline - time.monotonic())
+        try:
+            item = self._queue.get(timeout=remaining)
+        except queue.Empty:
+            raise TimeoutError("Timed out fetching comments")
+        if item is _END:
+            self._queue.put(_END)  # keep later calls returning None
+            return None
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def __iter__(self):
+        while True:
+            page = self.next_page()
+            if page is None:
+                return
+            yield page
+
+    def close(self):
+        self._stop.set()
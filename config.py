@@ -0,0 +1,32 @@
+import os
+
+# Spellings accepted for boolean settings (environment variables, form flags)
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off")
+
+
+def parse_flag(value, default=False):
+    """
+    Reads a boolean setting.
+
+    Args:
+        value (str or None): Raw value; case and surrounding spaces are ignored.
+        default (bool): Result when the value is missing, empty or not a known spelling.
+
+    Returns:
+        bool
+    """
+    value = (value or "").strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    return default
+
+
+def env_flag(name, default=False):
+    """Boolean environment variable `name` (see parse_flag); unrecognized values are reported."""
+    raw = os.getenv(name)
+    if raw and raw.strip().lower() not in TRUE_VALUES + FALSE_VALUES:
+        print(f"⚠️ {name}={raw!r} is not a boolean; using {default}")
+    return parse_flag(raw, default)
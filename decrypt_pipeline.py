@@ -0,0 +1,437 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as futures_wait
+
+from config import env_flag, parse_flag
+from download_image import download_image, download_image_bytes, DOWNLOAD_MODE
+from comment_scraper import stream_comments, PrefetchedPages
+from NLP_comment_and_keyword_analyser import StreamingMatcher
+from stego_container import join_shards, ContainerError
+from carrier_io import open_carrier, read_carrier_container, CarrierError
+from stego_crypto import truncate_to_3_decimal_places, generate_key, decrypt_message
+from payload_cache import cache_from_env as payload_cache_from_env, content_hash
+from stage_timer import StageTimer
+import metrics
+from metrics import span
+from job_queue import queue_from_env as job_queue_from_env, dedup_key, DONE, FAILED
+
+# Stages of the /decrypt pipeline, shared by the WSGI app (final.py) and the
+# ASGI app (asgi.py). Stage functions return plain values or (body, status)
+# error tuples so each server can schedule them its own way.
+
+# Network stages run concurrently on this pool in the WSGI app
+DECRYPT_THREADS = int(os.getenv("STEGO_DECRYPT_THREADS", "8"))
+DOWNLOAD_TIMEOUT = float(os.getenv("STEGO_DOWNLOAD_TIMEOUT", "30"))  # seconds
+SCRAPE_TIMEOUT = float(os.getenv("STEGO_SCRAPE_TIMEOUT", "120"))  # seconds
+# Comment pages stop being fetched once a keyword scores at least this; above 1.0 always reads every page
+MATCH_STOP_SCORE = float(os.getenv("STEGO_MATCH_STOP_SCORE", "0.8"))
+# Matched keywords tried as AES-GCM keys, best score first, before a decrypt is reported as failed
+DECRYPT_CANDIDATES = int(os.getenv("STEGO_DECRYPT_CANDIDATES", "5"))
+# Image URLs one /decrypt may name when a message is sharded across carriers
+MAX_SHARD_IMAGES = int(os.getenv("STEGO_MAX_SHARD_IMAGES", "16"))
+# Per-request [DEBUG] prints; never includes the decrypted message
+DEBUG_LOG = env_flag("STEGO_DEBUG_LOG")
+# Adds a Server-Timing header with per-stage durations to /decrypt responses
+DEBUG_TIMINGS = env_flag("STEGO_DEBUG_TIMINGS")
+DECRYPT_EXECUTOR = ThreadPoolExecutor(max_workers=DECRYPT_THREADS, thread_name_prefix="decrypt")
+# Comment scrapers run on their own pool: a scrape still shared with other
+# requests outlives the request that started it, and must not hold up downloads
+SCRAPE_THREADS = int(os.getenv("STEGO_SCRAPE_THREADS", "8"))
+SCRAPE_EXECUTOR = ThreadPoolExecutor(max_workers=SCRAPE_THREADS, thread_name_prefix="scrape")
+
+# Extracted (still encrypted) containers of recently decrypted images; None when disabled
+payload_cache = payload_cache_from_env()
+# Background /decrypt runs for clients that poll instead of holding the request open;
+# started on first use (see get_decrypt_jobs)
+_decrypt_jobs = None
+_decrypt_jobs_lock = threading.Lock()
+
+KEY_ATTEMPTS = metrics.counter("stego_decrypt_key_attempts_total",
+                               "AES-GCM decrypt attempts with a candidate keyword's key, by outcome.")
+RETRIES_AVOIDED = metrics.counter("stego_decrypt_retries_avoided_total",
+                                  "Decrypts opened by a runner-up keyword; the top match alone would have failed.")
+
+
+def _cancel(*futures):
+    """Drops queued stages; a stage already running in a thread finishes in the background."""
+    for future in futures:
+        future.cancel()
+
+
+def _image_urls(form):
+    """All `image_url` values: repeated form fields, or a list in queued job fields."""
+    urls = form.getlist('image_url') if hasattr(form, 'getlist') else form.get('image_url')
+    if isinstance(urls, str):
+        urls = [urls]
+    return [url for url in urls or [] if url]
+
+
+def parse_form(form):
+    """
+    Validates the /decrypt form fields.
+
+    Returns:
+        tuple: (params dict, None) or (None, (error body, status))
+    """
+    image_urls = _image_urls(form)
+    image_url = image_urls[0] if image_urls else None
+    comment_url = form.get('comment_url')
+    keyword = form.get('keyword')
+    latitude = truncate_to_3_decimal_places(float(form.get('latitude')))
+    longitude = truncate_to_3_decimal_places(float(form.get('longitude')))
+    machine_id = form.get('machine_id')
+    timestamp = form.get('timestamp')
+
+    if DEBUG_LOG:
+        print(f"[DEBUG] Received -> Lat: {latitude}, Lon: {longitude}, Machine ID: {machine_id}, Timestamp: {timestamp}")
+        print(f"[DEBUG] Image URL(s): {', '.join(image_urls)}, Comment URL: {comment_url}")
+
+    if not all([image_url, comment_url, keyword, latitude, longitude, machine_id, timestamp]):
+        return None, ({'error': 'Missing required fields'}, 400)
+    if len(image_urls) > MAX_SHARD_IMAGES:
+        return None, ({'error': f'At most {MAX_SHARD_IMAGES} image URLs per request'}, 400)
+
+    return {
+        "image_url": image_url,
+        "image_urls": image_urls,
+        "comment_url": comment_url,
+        "keyword": keyword,
+        "keywords": [k.strip() for k in keyword.split(',') if k.strip()],
+        "latitude": latitude,
+        "longitude": longitude,
+        "machine_id": machine_id,
+        "timestamp": timestamp,
+    }, None
+
+
+def _use_payload_cache():
+    return payload_cache is not None and DOWNLOAD_MODE == "memory"
+
+
+def download_carrier(image_url):
+    """Network stage: downloads the carrier, revalidating a cached one with a conditional GET."""
+    with span("download"):
+        if DOWNLOAD_MODE == "memory":
+            validators = payload_cache.validators(image_url) if _use_payload_cache() else None
+            return download_image_bytes(image_url, headers=validators)
+        return download_image(image_url)
+
+
+def _open_carrier(download_result):
+    """Opens a download_image/download_image_bytes result as a carrier (see carrier_io.open_carrier)."""
+    image_path = download_result.get("image_path")
+    if image_path:
+        try:
+            return open_carrier(image_path)
+        finally:
+            # A memory-mapped carrier stays readable after the unlink
+            os.remove(image_path)
+    return open_carrier(download_result["data"])
+
+
+def extract_carrier(image_url, download_result):
+    """
+    CPU stage: extracts the (still encrypted) stego container from a downloaded carrier.
+
+    An unchanged image (304) or a body already seen under another URL is served
+    from the payload cache, skipping image decode and LSB extraction. Otherwise only the pixel
+    rows holding the container are decoded (see carrier_io).
+
+    Returns:
+        dict: {"success": True, "container": dict} or {"success": False, "error": str, "status": int}
+    """
+    if not download_result["success"]:
+        return {"success": False, "error": f'Failed to download image. Detail: {download_result["error"]}', "status": 400}
+
+    if download_result.get("not_modified"):
+        container = payload_cache.not_modified(image_url)
+        if container is not None:
+            return {"success": True, "container": container}
+        # Evicted between the lookup and the 304: fetch the body unconditionally
+        download_result = download_image_bytes(image_url)
+        if not download_result["success"]:
+            return {"success": False, "error": f'Failed to download image. Detail: {download_result["error"]}', "status": 400}
+
+    use_cache = _use_payload_cache()
+    digest = None
+    if use_cache:
+        digest = content_hash(download_result["data"])
+        container = payload_cache.get(digest)
+        if container is not None:
+            payload_cache.remember_url(image_url, digest, len(download_result["data"]),
+                                       download_result.get("etag"), download_result.get("last_modified"))
+            return {"success": True, "container": container}
+
+    try:
+        carrier = _open_carrier(download_result)
+    except CarrierError:
+        return {"success": False, "error": 'Failed to load image', "status": 400}
+
+    try:
+        with span("lsb_extract"):
+            container = read_carrier_container(carrier)
+    except CarrierError:
+        return {"success": False, "error": 'Failed to load image', "status": 400}
+    except ContainerError as e:
+        print(f"[ERROR] Error decoding stego container: {e}")
+        return {"success": False, "error": f'Error decoding hidden message: {str(e)}', "status": 400}
+
+    # Shards are only part of a container; the cache holds whole ones
+    if use_cache and 'shard' not in container:
+        payload_cache.put(image_url, digest, container, len(download_result["data"]),
+                          download_result.get("etag"), download_result.get("last_modified"))
+
+    return {"success": True, "container": container}
+
+
+def fetch_container(image_url, timer):
+    """Downloads the carrier image and extracts its stego container (see extract_carrier)."""
+    with timer.measure("download"):
+        download_result = download_carrier(image_url)
+    with timer.measure("extract"):
+        return extract_carrier(image_url, download_result)
+
+
+def combine_containers(container_results):
+    """
+    Joins the extract_carrier results of every image URL into one result.
+
+    A single image must hold a whole container; several images must hold all
+    the shards of one container (see stego_container.join_shards).
+
+    Returns:
+        dict: {"success": True, "container": dict} or {"success": False, "error": str, "status": int}
+    """
+    for result in container_results:
+        if not result["success"]:
+            return result
+
+    containers = [result["container"] for result in container_results]
+    shards = [container['shard'] for container in containers if 'shard' in container]
+    if not shards:
+        if len(containers) > 1:
+            return {"success": False, "error": 'Each image holds a separate message; send one image URL', "status": 400}
+        return container_results[0]
+    if len(shards) < len(containers):
+        return {"success": False, "error": 'Images mix a whole message with message shards', "status": 400}
+
+    try:
+        return {"success": True, "container": join_shards(shards)}
+    except ContainerError as e:
+        print(f"[ERROR] Error joining stego container shards: {e}")
+        return {"success": False, "error": f'Error decoding hidden message: {str(e)}', "status": 400}
+
+
+def check_window(params, container):
+    """Returns an error tuple if the request time is outside the container's window, else None."""
+    start_timestamp = container['start_timestamp']
+    end_timestamp = container['end_timestamp']
+    current_timestamp = int(params["timestamp"])
+    if DEBUG_LOG:
+        print(f"[DEBUG] Allowed window: {start_timestamp} to {end_timestamp} | Current time: {current_timestamp}")
+    if not (start_timestamp <= current_timestamp <= end_timestamp):
+        return {"error": "Session Expired: The current time is outside the allowed window."}, 403
+    return None
+
+
+def open_comment_stream(comment_url, timer):
+    """Starts scraping comment pages in the background (see comment_scraper.PrefetchedPages)."""
+    stop = threading.Event()
+    return PrefetchedPages(stream_comments(comment_url, stop=stop), SCRAPE_EXECUTOR,
+                           timeout=SCRAPE_TIMEOUT, timer=timer, stop=stop)
+
+
+def new_matcher(params):
+    return StreamingMatcher(params["keywords"], certain_threshold=MATCH_STOP_SCORE)
+
+
+def match_comments(params, comment_pages, timer):
+    """
+    Feeds comment pages to the keyword matcher as they arrive and stops the
+    scrape once the match is certain.
+
+    Returns:
+        tuple: (StreamingMatcher, None) or (None, (error body, status))
+    """
+    matcher = new_matcher(params)
+    try:
+        with timer.measure("match"):
+            for page in comment_pages:
+                if matcher.feed(page):
+                    break
+    except TimeoutError:
+        return None, ({'error': 'Timed out fetching comments'}, 504)
+    finally:
+        comment_pages.close()
+    return matcher, None
+
+
+def decrypt_matched(params, container, matcher, timer, keys=None):
+    """
+    CPU stage: derives keys from the matched keywords and AES-GCM decrypts the message.
+
+    Candidates are tried best score first; a wrong key fails the GCM tag check
+    after one block cipher pass, so a runner-up keyword is tried here instead
+    of the client re-running download, scrape and match.
+
+    Args:
+        keys (dict or None): Keys already derived in this request, by keyword;
+            filled in as candidates are tried. Location and machine id are
+            fixed per request, so keys only vary by keyword.
+
+    Returns:
+        tuple: (response body dict, HTTP status)
+    """
+    if not matcher.comments_seen:
+        return {'error': 'No comments found to match keyword'}, 400
+
+    iv = container['iv']
+    tag = container['tag']
+    encrypted_message = container['msg']
+
+    if any(x is None for x in [iv, tag, encrypted_message]):
+        return {'error': 'Invalid decryption data'}, 400
+
+    # No keyword passed threshold: the key is derived from None, as it always has been
+    keywords = [match.keyword for match in matcher.candidates(DECRYPT_CANDIDATES)] or [None]
+
+    keys = {} if keys is None else keys
+
+    with timer.measure("decrypt"):
+        for rank, keyword in enumerate(keywords):
+            if keyword not in keys:
+                keys[keyword] = generate_key(params["latitude"], params["longitude"], keyword, params["machine_id"])
+            try:
+                decrypted_message = decrypt_message(keys[keyword], iv, tag, encrypted_message)
+            except Exception as e:
+                KEY_ATTEMPTS.inc(outcome="rejected")
+                if DEBUG_LOG:
+                    print(f"[DEBUG] Decryption with candidate {rank + 1}/{len(keywords)} failed: {e!r}")
+                continue
+            KEY_ATTEMPTS.inc(outcome="ok")
+            if rank:
+                RETRIES_AVOIDED.inc()
+            break
+        else:
+            return {'error': 'Decryption failed. Possibly incorrect key or corrupted data.'}, 400
+
+    if DEBUG_LOG:
+        print(f"[DEBUG] Decrypted {len(decrypted_message)} bytes from {params['image_url']} | "
+              f"Keyword used: {keyword} (candidate {rank + 1}/{len(keywords)})")
+
+    return {"message": decrypted_message.decode()}, 200
+
+
+def run_decrypt(form):
+    """
+    Runs the /decrypt pipeline for the submitted form fields.
+
+    The image download and the comment scrape run concurrently. LSB extraction
+    and the timestamp-window check run as soon as the image arrives, so expired
+    or malformed images are rejected before waiting on the scrape or the NLP match.
+    Comment pages are matched as they arrive, and the scrape stops once a
+    keyword scores MATCH_STOP_SCORE. A message sharded across several images
+    names them all in repeated image_url fields; they are downloaded and
+    extracted concurrently, then reassembled.
+
+    Returns:
+        tuple: (response body dict, HTTP status, StageTimer)
+    """
+    timer = StageTimer()
+
+    # 1. Extract data from form
+    params, error = parse_form(form)
+    if error:
+        return (*error, timer)
+
+    # 2. Fetch the images' containers and scrape comments concurrently
+    container_futures = [DECRYPT_EXECUTOR.submit(fetch_container, url, timer) for url in params["image_urls"]]
+    comment_pages = open_comment_stream(params["comment_url"], timer)
+
+    _, pending = futures_wait(container_futures, timeout=DOWNLOAD_TIMEOUT)
+    if pending:
+        _cancel(*container_futures)
+        comment_pages.close()
+        return {'error': 'Timed out downloading image'}, 504, timer
+
+    container_result = combine_containers([future.result() for future in container_futures])
+    if not container_result["success"]:
+        comment_pages.close()
+        return {'error': container_result["error"]}, container_result["status"], timer
+
+    # 3. Check the time window before any NLP work
+    error = check_window(params, container_result["container"])
+    if error:
+        comment_pages.close()
+        return (*error, timer)
+
+    # 4. Match the keyword as comment pages arrive
+    matcher, error = match_comments(params, comment_pages, timer)
+    if error:
+        return (*error, timer)
+
+    # 5. Decrypt
+    return (*decrypt_matched(params, container_result["container"], matcher, timer), timer)
+
+
+def get_decrypt_jobs():
+    """Job queue for async /decrypt, built on first use so importing the pipeline touches no files."""
+    global _decrypt_jobs
+    if _decrypt_jobs is None:
+        with _decrypt_jobs_lock:
+            if _decrypt_jobs is None:
+                _decrypt_jobs = job_queue_from_env()
+    return _decrypt_jobs
+
+
+def wants_job(form):
+    """True if the client asked for an async job (form field async=1) instead of a blocking response."""
+    return parse_flag(form.get('async'))
+
+
+def _run_decrypt_job(fields):
+    body, status, _ = run_decrypt(fields)
+    return body, status
+
+
+def submit_decrypt_job(form):
+    """
+    Queues the /decrypt pipeline as a background job.
+
+    Identical in-flight submissions share one job id. Missing fields are still
+    rejected synchronously.
+
+    Returns:
+        tuple: (response body dict, HTTP status)
+    """
+    fields = {k: form.get(k) for k in form.keys() if k != 'async'}
+    image_urls = _image_urls(form)
+    if len(image_urls) > 1:
+        fields['image_url'] = image_urls
+    _, error = parse_form(fields)
+    if error:
+        return error
+
+    jobs = get_decrypt_jobs()
+    job_id, created = jobs.submit(dedup_key(fields), _run_decrypt_job, fields)
+    print(f"[JOB] {'Queued' if created else 'Deduplicated onto'} job {job_id[:8]}")
+    job = jobs.status(job_id)
+    return {"jobId": job_id, "status": job["status"], "statusUrl": f"/decrypt-jobs/{job_id}"}, 202
+
+
+def decrypt_job_status(job_id):
+    """
+    Poll response for a /decrypt job. Finished jobs carry the body and status
+    the blocking /decrypt call would have returned.
+
+    Returns:
+        tuple: (response body dict, HTTP status)
+    """
+    job = get_decrypt_jobs().status(job_id)
+    if job is None:
+        return {"error": "Unknown or expired job"}, 404
+    body = {"jobId": job_id, "status": job["status"]}
+    if job["status"] in (DONE, FAILED):
+        body["result"] = job["body"]
+        body["resultStatus"] = job["http_status"]
+    return body, 200
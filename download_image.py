@@ -1,6 +1,30 @@
 import requests
 import os
+import tempfile
 from urllib.parse import urlparse, unquote
+from requests.adapters import HTTPAdapter
+
+import client_registry
+
+# Largest image accepted from a remote host
+MAX_IMAGE_BYTES = int(os.getenv("STEGO_MAX_IMAGE_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 256 * 1024
+# "memory" keeps downloads in RAM; "disk" writes them under save_dir
+DOWNLOAD_MODE = os.getenv("STEGO_DOWNLOAD_MODE", "memory")
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+VALID_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp')
+
+def _build_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+# One keep-alive connection pool per process for all image hosts
+client_registry.register("image_http", _build_session)
 
 def convert_blob_to_raw(url):
     """Convert a GitHub blob URL to a raw content URL."""
@@ -9,32 +33,95 @@ def convert_blob_to_raw(url):
         url = url.replace("/blob/", "/")
     return url
 
-def download_image(image_url, save_dir='github_downloads'):
+def _open_image(image_url, headers=None):
+    """Validates the URL, starts a streamed GET and checks the content type."""
+    image_url = convert_blob_to_raw(image_url)
+
+    # Extract and validate filename
+    parsed_url = urlparse(image_url)
+    filename = os.path.basename(unquote(parsed_url.path))
+    if not filename.lower().endswith(VALID_EXTENSIONS):
+        return None, filename, "URL does not point to a valid image file"
+
+    response = client_registry.get("image_http").get(image_url, stream=True, headers=headers)
+    response.raise_for_status()
+    if response.status_code == 304:
+        return response, filename, None
+
+    content_type = response.headers.get("content-type", "")
+    if not (content_type.startswith("image") or content_type == "application/octet-stream"):
+        response.close()
+        return None, filename, f"Unexpected content-type: {content_type}"
+
+    return response, filename, None
+
+def download_image_bytes(image_url, max_bytes=MAX_IMAGE_BYTES, chunk_size=CHUNK_SIZE, headers=None):
+    """
+    Downloads an image into memory.
+
+    The buffer is pre-sized from Content-Length when the server sends one, and
+    the download is aborted as soon as it exceeds max_bytes. Pass conditional
+    request headers (If-None-Match / If-Modified-Since) to revalidate a
+    previously downloaded image.
+
+    Returns:
+        dict: {"success": True, "data": bytes-like, "etag": str, "last_modified": str},
+        {"success": True, "not_modified": True} on a 304, or {"success": False, "error": str}
+    """
     try:
-        image_url = convert_blob_to_raw(image_url)
-        headers = {"User-Agent": "Mozilla/5.0"}
+        response, _, error = _open_image(image_url, headers)
+        if error:
+            return {"success": False, "error": error}
 
-        # Extract and validate filename
-        parsed_url = urlparse(image_url)
-        filename = os.path.basename(unquote(parsed_url.path))
-        valid_extensions = ('.png', '.jpg', '.jpeg', '.webp')
-        if not filename.lower().endswith(valid_extensions):
-            return {"success": False, "error": "URL does not point to a valid image file"}
+        if response.status_code == 304:
+            response.close()
+            return {"success": True, "not_modified": True}
 
-        # Create output directory
-        os.makedirs(save_dir, exist_ok=True)
-        file_path = os.path.join(save_dir, filename)
+        etag = response.headers.get("etag")
+        last_modified = response.headers.get("last-modified")
+
+        with response:
+            declared = int(response.headers.get("content-length") or 0)
+            if declared > max_bytes:
+                return {"success": False, "error": f"Image exceeds {max_bytes} bytes"}
 
-        # Download the file
-        response = requests.get(image_url, stream=True, headers=headers)
-        response.raise_for_status()
+            buffer = bytearray(declared)
+            view = memoryview(buffer)
+            size = 0
+            for chunk in response.iter_content(chunk_size):
+                end = size + len(chunk)
+                if end > max_bytes:
+                    return {"success": False, "error": f"Image exceeds {max_bytes} bytes"}
+                if end <= len(buffer):
+                    view[size:end] = chunk
+                else:
+                    # No (or a wrong) Content-Length: fall back to growing the buffer
+                    view.release()
+                    del buffer[size:]
+                    buffer += chunk
+                    view = memoryview(buffer)
+                size = end
 
-        content_type = response.headers.get("content-type", "")
-        if not (content_type.startswith("image") or content_type == "application/octet-stream"):
-            return {"success": False, "error": f"Unexpected content-type: {content_type}"}
+        view.release()
+        del buffer[size:]
+        return {"success": True, "data": buffer, "etag": etag, "last_modified": last_modified}
+
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def download_image(image_url, save_dir='github_downloads'):
+    try:
+        response, filename, error = _open_image(image_url)
+        if error:
+            return {"success": False, "error": error}
+
+        # Create output directory; a unique name keeps concurrent downloads of
+        # same-named files from overwriting each other
+        os.makedirs(save_dir, exist_ok=True)
+        fd, file_path = tempfile.mkstemp(prefix="dl_", suffix="_" + filename, dir=save_dir)
 
-        with open(file_path, "wb") as f:
-            for chunk in response.iter_content(1024):
+        with response, os.fdopen(fd, "wb") as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
                 f.write(chunk)
 
         return {"success": True, "image_path": file_path}
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+
+import numpy as np
+
+from sqlite_store import ThreadConnections
+
+
+def normalize_text(text):
+    """Unicode-normalizes and collapses whitespace so trivial variants share an entry."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def text_key(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).digest()
+
+
+class SQLiteEmbeddingStore:
+    """On-disk embedding store; vectors are kept as float16 blobs keyed by (model namespace, text hash)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = ThreadConnections(path)
+        self._connections.create(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "model TEXT NOT NULL, key BLOB NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (model, key))"
+        )
+
+    def get_many(self, namespace, keys):
+        """Looks up (namespace, text hash) keys; returns the found vectors by key."""
+        if not keys:
+            return {}
+        by_hash = {key[1]: key for key in keys}
+        hashes = list(by_hash)
+        found = {}
+        conn = self._connections.get()
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                [namespace, *chunk],
+            ).fetchall()
+            for key, vector in rows:
+                found[by_hash[bytes(key)]] = np.frombuffer(vector, dtype=np.float16).astype(np.float32)
+        return found
+
+    def put_many(self, namespace, items):
+        conn = self._connections.get()
+        conn.executemany(
+            "INSERT OR REPLACE INTO embeddings (model, key, vector) VALUES (?, ?, ?)",
+            [(namespace, key[1], vector.astype(np.float16).tobytes()) for key, vector in items],
+        )
+        conn.commit()
+
+
+class EmbeddingCache:
+    """
+    Caches sentence embeddings in front of a model's encode function.
+
+    Lookups go to a size-bounded in-process LRU first, then to the optional
+    on-disk store. Only texts missing from both are sent to the model.
+    """
+
+    def __init__(self, model_name, max_entries=10000, disk_path=None):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.store = SQLiteEmbeddingStore(disk_path) if disk_path else None
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def encode(self, encode_fn, texts, namespace=None):
+        """
+        Returns a float32 array of embeddings for `texts`, one row per text.
+
+        Args:
+            encode_fn (callable): Encodes a list of strings into an (n, dim) array.
+            texts (list): Strings to embed.
+            namespace (str or None): Keeps embeddings from different model
+                variants apart; defaults to the cache's model name.
+        """
+        namespace = namespace or self.model_name
+        keys = [(namespace, text_key(t)) for t in texts]
+        vectors = {}
+
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    vectors[key] = vector
+            self.hits += sum(1 for key in keys if key in vectors)
+
+        # Deduplicate misses so repeated comments are embedded once
+        pending = OrderedDict((key, text) for key, text in zip(keys, texts) if key not in vectors)
+
+        if pending and self.store is not None:
+            from_disk = self.store.get_many(namespace, list(pending))
+            vectors.update(from_disk)
+            with self._lock:
+                self.disk_hits += sum(1 for key in keys if key in from_disk)
+                for key, vector in from_disk.items():
+                    self._remember(key, vector)
+            for key in from_disk:
+                del pending[key]
+
+        if pending:
+            encoded = np.asarray(encode_fn(list(pending.values())), dtype=np.float32)
+            new_items = list(zip(pending, encoded))
+            vectors.update(new_items)
+            with self._lock:
+                self.misses += sum(1 for key in keys if key in pending)
+                for key, vector in new_items:
+                    self._remember(key, vector)
+            if self.store is not None:
+                self.store.put_many(namespace, new_items)
+
+        return np.stack([vectors[key] for key in keys])
+
+    def stats(self):
+        """Hit/miss counters and current LRU occupancy."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._lru),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+
+def cache_from_env(model_name):
+    """Builds the embedding cache configured by STEGO_EMBEDDING_CACHE_* variables."""
+    return EmbeddingCache(
+        model_name,
+        max_entries=int(os.getenv("STEGO_EMBEDDING_CACHE_SIZE", "10000")),
+        disk_path=os.getenv("STEGO_EMBEDDING_CACHE_PATH") or None,
+    )
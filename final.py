@@ -1,106 +1,130 @@
-import os
-import cv2
-import numpy as np
-import base64
 import time
+_import_started = time.perf_counter()
+import os
 import json
-from datetime import datetime
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, request, g, jsonify, send_file, Response, stream_with_context
+import io
 from flask_cors import CORS
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
-from hashlib import sha256
 from werkzeug.utils import secure_filename
-import tempfile
+from werkzeug.exceptions import RequestEntityTooLarge
 from datetime import datetime, timezone, timedelta
-from download_image import download_image
-from comment_scraper import fetch_comments
-from NLP_comment_and_keyword_analyser import find_best_match
-import hashlib
+from comment_scraper import comment_cache
+from NLP_comment_and_keyword_analyser import preload_model, preload_requested, embedding_cache
+# generate_key, encrypt_message and hide_message_in_image used to be defined here; still importable from final
+from stego_crypto import truncate_to_3_decimal_places, generate_key, encrypt_message  # noqa: F401
+from stego_encoder import hide_message_in_image, hide_message_in_bytes, hide_message_across_bytes, DEFAULT_TTL  # noqa: F401
+from decrypt_pipeline import (
+    run_decrypt, wants_job, submit_decrypt_job, decrypt_job_status, payload_cache, DEBUG_TIMINGS, DEBUG_LOG,
+    MAX_SHARD_IMAGES,
+)
+from location_store import store_from_env as location_store_from_env, new_session_token, LATEST_KEY
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import threading
+import zipfile
+from config import env_flag
+import startup_report
+import warmup
+import metrics
+
+startup_report.record("app_import", time.perf_counter() - _import_started)
 
 # Constants
-DEFAULT_TTL = 600  # 10 minutes
-UPLOAD_FOLDER = 'uploads'
-ENCRYPTED_FOLDER = 'encrypted'
+# Uploads are held in memory, so their size is capped (413 beyond the limit)
+MAX_UPLOAD_BYTES = int(os.getenv("STEGO_MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("STEGO_MAX_BATCH_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+# zlib level 0-9 for PNG output: lower is faster, higher is smaller (unset = OpenCV default)
+PNG_COMPRESSION = int(os.environ["STEGO_PNG_COMPRESSION"]) if os.getenv("STEGO_PNG_COMPRESSION") else None
+
+# Sender location/device per session token, shared by all workers; opened on first use
+_location_store = None
+_location_store_lock = threading.Lock()
+SESSION_COOKIE = "stego_session"
+# Requests without a session token use the most recently stored location of
+# any sender. Only safe with a single sender; off unless explicitly enabled.
+LATEST_LOCATION_FALLBACK = env_flag("STEGO_LOCATION_LATEST_FALLBACK")
+# Frontend origins allowed to call the API; with explicit origins, browsers may
+# also send the session cookie cross-site (credentialed CORS)
+CORS_ORIGINS = [origin.strip() for origin in os.getenv("STEGO_CORS_ORIGINS", "*").split(",") if origin.strip()]
+CORS_CREDENTIALS = "*" not in CORS_ORIGINS
+
+# /encrypt-batch: LSB embedding and PNG encoding are CPU-bound, so they run in processes
+BATCH_PROCESSES = int(os.getenv("STEGO_BATCH_PROCESSES", str(os.cpu_count() or 2)))
+MAX_BATCH_IMAGES = int(os.getenv("STEGO_MAX_BATCH_IMAGES", "100"))
+_batch_pool = None
+_batch_pool_lock = threading.Lock()
+
+class InMemoryRequest(Request):
+    """Keeps uploaded files in memory instead of spooling large ones to temp files."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return io.BytesIO()
+
 
 app = Flask(__name__)
-CORS(app)  # Enable Cross-Origin Resource Sharing
+app.request_class = InMemoryRequest
+CORS(app, origins=CORS_ORIGINS, supports_credentials=CORS_CREDENTIALS)  # Enable Cross-Origin Resource Sharing
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['ENCRYPTED_FOLDER'] = ENCRYPTED_FOLDER
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-os.makedirs(ENCRYPTED_FOLDER, exist_ok=True)
+# Upper bound for any request body; /encrypt lowers it per request
+app.config['MAX_CONTENT_LENGTH'] = MAX_BATCH_UPLOAD_BYTES
 
-def truncate_to_3_decimal_places(value):
-    return float(str(value).split('.')[0] + '.' + str(value).split('.')[1][:3])
+# With gunicorn --preload this runs once in the master and workers inherit the model
+if preload_requested():
+    preload_model()
 
-# Define IST timezone
-IST = timezone(timedelta(hours=5, minutes=30))
+REQUEST_SECONDS = metrics.histogram("stego_http_request_duration_seconds", "Request latency by endpoint and status.")
 
-@app.route('/')
-def index():
-    return "✅ Backend is running!"
 
-def generate_key(lat, lon, keyword, machine_id):
-    lat = truncate_to_3_decimal_places(lat)
-    lon = truncate_to_3_decimal_places(lon)
-    key_data = f"{lat}_{lon}_{keyword}_{machine_id}"
-    return sha256(key_data.encode()).digest()
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
 
-def encrypt_message(message, key):
-    iv = os.urandom(12)
-    cipher = Cipher(algorithms.AES(key), modes.GCM(iv), backend=default_backend())
-    encryptor = cipher.encryptor()
-    encrypted_message = encryptor.update(message.encode()) + encryptor.finalize()
-    return iv, encryptor.tag, base64.b64encode(encrypted_message).decode()
 
-def hide_message_in_image(image_path, message, output_path, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL):
-    key = generate_key(lat, lon, keyword, machine_id)
-    iv, tag, encrypted_message = encrypt_message(message, key)
+@app.after_request
+def _observe_request(response):
+    started = g.pop("request_started", None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started,
+                                endpoint=request.endpoint or "unknown", status=str(response.status_code))
+    return response
 
-    lat = truncate_to_3_decimal_places(lat)
-    lon = truncate_to_3_decimal_places(lon)
 
-    # Encrypt lat/lon
-    iv_loc, tag_loc, encrypted_lat = encrypt_message(str(lat), key)
-    _, _, encrypted_lon = encrypt_message(str(lon), key)
+# Define IST timezone
+IST = timezone(timedelta(hours=5, minutes=30))
 
-    data_dict = {
-        'iv': base64.b64encode(iv).decode(),
-        'tag': base64.b64encode(tag).decode(),
-        'msg': encrypted_message,
-        'start_timestamp': int(start_timestamp),
-        'end_timestamp': int(end_timestamp),
-        'ttl': ttl,
-        'lat': encrypted_lat,
-        'lon': encrypted_lon,
-        'iv_loc': base64.b64encode(iv_loc).decode(),
-        'tag_loc': base64.b64encode(tag_loc).decode()
-    }
+@app.route('/')
+def index():
+    return "✅ Backend is running!"
 
-    data = base64.b64encode(json.dumps(data_dict).encode()).decode() + '###'
 
-    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-    if img is None:
-        raise ValueError("Invalid image path or unsupported format")
+@app.route('/healthz')
+def healthz():
+    """Liveness: the worker is up and serving requests, warmed up or not."""
+    return jsonify({"status": "ok", "pid": os.getpid()})
 
-    height, width, _ = img.shape
-    max_bytes = (height * width * 3) // 8
 
-    if len(data) > max_bytes:
-        raise ValueError("Message too large to hide in image")
+@app.route('/readyz')
+def readyz():
+    """Readiness: 200 once this worker's warm-up finished (possibly degraded), 503 before, with its timings."""
+    state = warmup.status()
+    return jsonify(state), 200 if state["ready"] else 503
 
-    binary_message = ''.join(format(ord(c), '08b') for c in data)
-    data_index = 0
 
-    for row in img:
-        for pixel in row:
-            for channel in range(len(pixel)):
-                if data_index < len(binary_message):
-                    pixel[channel] = (pixel[channel] & 0xFE) | int(binary_message[data_index])
-                    data_index += 1
+@app.route('/cache-stats')
+def cache_stats():
+    """Hit/miss counters of this worker's caches."""
+    return jsonify({
+        "payload": payload_cache.stats() if payload_cache else None,
+        "comments": comment_cache.stats() if comment_cache else None,
+        "embeddings": embedding_cache.stats(),
+    })
 
-    cv2.imwrite(output_path, img)
+
+@app.route('/metrics')
+def metrics_handler():
+    """Prometheus exposition of the stage and request histograms, summed across workers."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route('/store-location', methods=['POST'])
@@ -111,216 +135,328 @@ def store_location():
         latitude = truncate_to_3_decimal_places(float(data['latitude']))
         longitude = truncate_to_3_decimal_places(float(data['longitude']))
         device_id = data['deviceId']
-
-        print(f"[Location Received] From: {sender_email}, Location: ({latitude}, {longitude}), Device ID: {device_id}")
-
-        # Store only the requir   ed fields
-        with open("location_temp.json", "w") as f:
-            json.dump({
-                "sender_email": sender_email,
-                "latitude": latitude,
-                "longitude": longitude,
-                "device_id": device_id
-            }, f)
-
-        return jsonify({"message": "Location stored successfully!"}), 200
+        session_token = data.get('sessionToken')
+        location_store = get_location_store()
+        if session_token == LATEST_KEY:
+            return jsonify({"error": "Invalid session token"}), 400
+        # Only a live session minted here can be refreshed; any other token gets a new one
+        if not session_token or location_store.get(session_token) is None:
+            session_token = new_session_token()
+
+        if DEBUG_LOG:
+            print(f"[DEBUG] Location received from {sender_email}, device {device_id}")
+
+        # Store only the required fields, keyed by the sender's session
+        record = {
+            "sender_email": sender_email,
+            "latitude": latitude,
+            "longitude": longitude,
+            "device_id": device_id
+        }
+        location_store.put(session_token, record)
+        if LATEST_LOCATION_FALLBACK:
+            location_store.put(LATEST_KEY, record)
+
+        response = jsonify({"message": "Location stored successfully!", "sessionToken": session_token})
+        # A cross-site frontend only gets the cookie back with SameSite=None, which requires Secure
+        cross_site = CORS_CREDENTIALS and request.is_secure
+        response.set_cookie(SESSION_COOKIE, session_token, max_age=int(location_store.ttl),
+                            httponly=True, secure=request.is_secure, samesite="None" if cross_site else "Lax")
+        return response, 200
 
     except Exception as e:
         print(f"[ERROR] Failed to store location: {str(e)}")
         return jsonify({"error": "Failed to store location"}), 500
 
 
+def _parse_window(form):
+    """Parses the startTimestamp/endTimestamp form fields (IST) into Unix timestamps."""
+    start_dt = datetime.strptime(form['startTimestamp'], "%Y-%m-%dT%H:%M").replace(tzinfo=IST)
+    end_dt = datetime.strptime(form['endTimestamp'], "%Y-%m-%dT%H:%M").replace(tzinfo=IST)
+    return int(start_dt.timestamp()), int(end_dt.timestamp())
+
+
+def _load_sender_location():
+    """
+    Returns (lat, lon, machine_id) stored by /store-location for this sender, or None.
+
+    The session comes from the `sessionToken` form field or the session cookie.
+    Clients that send neither get None (a 400), unless
+    STEGO_LOCATION_LATEST_FALLBACK serves them the most recently stored location.
+    """
+    session_token = request.form.get('sessionToken') or request.cookies.get(SESSION_COOKIE)
+    if session_token == LATEST_KEY or (not session_token and not LATEST_LOCATION_FALLBACK):
+        return None
+    location_data = get_location_store().get(session_token or LATEST_KEY)
+    if location_data is None:
+        return None
+
+    lat = round(float(location_data.get("latitude")), 3)
+    lon = round(float(location_data.get("longitude")), 3)
+    machine_id = location_data.get("device_id")
+
+    if not all([lat, lon, machine_id]):
+        return None
+    return lat, lon, machine_id
+
+
 @app.route("/encrypt", methods=["POST"])
 def encrypt_handler():
+    request.max_content_length = MAX_UPLOAD_BYTES
     try:
         # ✅ Step 1: Receive data from frontend
         image = request.files['image']
         message = request.form['message']
         keyword = request.form['keyword']
-        start_timestamp_str = request.form['startTimestamp']
-        end_timestamp_str = request.form['endTimestamp']
 
         # Parse input and localize to IST
-        start_dt = datetime.strptime(start_timestamp_str, "%Y-%m-%dT%H:%M").replace(tzinfo=IST)
-        end_dt = datetime.strptime(end_timestamp_str, "%Y-%m-%dT%H:%M").replace(tzinfo=IST)
-        start_timestamp = int(start_dt.timestamp())
-        end_timestamp = int(end_dt.timestamp())
+        start_timestamp, end_timestamp = _parse_window(request.form)
 
-        # ✅ Step 2: Load stored geolocation and device data from location_temp.json
-        with open("location_temp.json", "r") as f:
-            location_data = json.load(f)
-
-        lat = round(float(location_data.get("latitude")), 3)
-        lon = round(float(location_data.get("longitude")), 3)
-        machine_id = location_data.get("device_id")
+        # ✅ Step 2: Load this sender's stored geolocation and device data
+        location = _load_sender_location()
 
         # ❗ Optional check
-        if not all([lat, lon, machine_id]):
+        if location is None:
             return jsonify({"error": "Missing geolocation or device data. Please click the tracking link again."}), 400
+        lat, lon, machine_id = location
 
-        # ✅ Step 3: Save the uploaded image temporarily
+        # ✅ Step 3: Decode the upload straight from the request body
         filename = secure_filename(image.filename)
-        input_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
         encrypted_filename = "encrypted_" + os.path.splitext(filename)[0] + ".png"
-        output_path = os.path.join(app.config['ENCRYPTED_FOLDER'], encrypted_filename)
-
-        image.save(input_path)
 
         # ✅ Step 4: Encrypt the message into the image using all date
-        hide_message_in_image(
-            image_path=input_path, 
+        png_bytes = hide_message_in_bytes(
+            image_bytes=image.read(),
             message=message,
-            output_path=output_path,
             lat=lat,
             lon=lon,
             keyword=keyword,
             machine_id=machine_id,
             start_timestamp=start_timestamp,
             end_timestamp=end_timestamp,
-            ttl=DEFAULT_TTL
+            ttl=DEFAULT_TTL,
+            compression=PNG_COMPRESSION
         )
 
         # ✅ Step 5: Send encrypted image back to frontend as a downloadable file
         return send_file(
-            output_path,
+            io.BytesIO(png_bytes),
             mimetype='image/png',
             as_attachment=True,
             download_name=encrypted_filename
         )
 
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Image exceeds the {MAX_UPLOAD_BYTES} byte upload limit"}), 413
+
     except Exception as e:
         print(f"[ERROR] /encrypt: {e}")
         return jsonify({"error": str(e)}), 500
 
 
+class _ZipStream:
+    """Write-only, unseekable sink for zipfile; drain() hands out what was written so far."""
+
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def write(self, data):
+        self._buffer += data
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+def get_location_store():
+    """Session location store, built on first use so importing the app touches no files."""
+    global _location_store
+    if _location_store is None:
+        with _location_store_lock:
+            if _location_store is None:
+                _location_store = location_store_from_env()
+    return _location_store
+
+
+def get_batch_pool():
+    """Process pool for CPU-bound batch embedding, started on first use."""
+    global _batch_pool
+    if _batch_pool is None:
+        with _batch_pool_lock:
+            if _batch_pool is None:
+                # spawn keeps children from inheriting this worker's threads and sockets
+                _batch_pool = ProcessPoolExecutor(max_workers=BATCH_PROCESSES, mp_context=multiprocessing.get_context("spawn"))
+    return _batch_pool
+
+
+def _discard_batch_pool(pool):
+    """Drops a pool that lost a worker (BrokenProcessPool); the next get_batch_pool() starts a new one."""
+    global _batch_pool
+    with _batch_pool_lock:
+        if _batch_pool is not pool:
+            return
+        _batch_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+    print("⚠️ Batch process pool is broken; starting a new one")
+
+
+def run_in_batch_pool(fn):
+    """Calls fn(pool) with the batch pool, once more on a new pool if the current one is broken."""
+    pool = get_batch_pool()
+    try:
+        return fn(pool)
+    except BrokenProcessPool:
+        _discard_batch_pool(pool)
+        return fn(get_batch_pool())
+
+
+@app.route("/encrypt-batch", methods=["POST"])
+def encrypt_batch_handler():
+    """
+    Embeds one message (or one message per image) into many images.
+
+    Form fields are the same as /encrypt, with repeated `images` files and an
+    optional repeated `messages` field matching them one-to-one. Responds with a
+    streamed ZIP of the encrypted PNGs plus a `results.json` manifest listing
+    per-image errors; a failing image does not fail the batch.
+    """
+    try:
+        images = request.files.getlist('images')
+        messages = request.form.getlist('messages') or [request.form['message']] * len(images)
+        keyword = request.form['keyword']
+        start_timestamp, end_timestamp = _parse_window(request.form)
+
+        if not images:
+            return jsonify({"error": "No images uploaded"}), 400
+        if len(messages) != len(images):
+            return jsonify({"error": "Provide one message, or exactly one message per image"}), 400
+        if len(images) > MAX_BATCH_IMAGES:
+            return jsonify({"error": f"At most {MAX_BATCH_IMAGES} images per batch"}), 400
+
+        location = _load_sender_location()
+        if location is None:
+            return jsonify({"error": "Missing geolocation or device data. Please click the tracking link again."}), 400
+        lat, lon, machine_id = location
+
+        # Read every upload before the response starts streaming
+        futures = {}
+        for index, (image, message) in enumerate(zip(images, messages)):
+            filename = secure_filename(image.filename) or f"image_{index}"
+            name = f"{index:03d}_encrypted_{os.path.splitext(filename)[0]}.png"
+            args = (image.read(), message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp,
+                    DEFAULT_TTL, PNG_COMPRESSION)
+            pool, future = run_in_batch_pool(lambda pool: (pool, pool.submit(hide_message_in_bytes, *args)))
+            futures[future] = (index, filename, name, pool)
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Batch exceeds the {MAX_BATCH_UPLOAD_BYTES} byte upload limit"}), 413
+
+    except Exception as e:
+        print(f"[ERROR] /encrypt-batch: {e}")
+        return jsonify({"error": str(e)}), 500
+
+    def generate():
+        stream = _ZipStream()
+        results = []
+        # PNGs are already deflated, so store them as-is
+        with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_STORED) as archive:
+            for future in as_completed(futures):
+                index, filename, name, pool = futures[future]
+                try:
+                    archive.writestr(name, future.result())
+                    results.append({"index": index, "filename": filename, "output": name})
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died; later requests get a new pool
+                        _discard_batch_pool(pool)
+                    print(f"[ERROR] /encrypt-batch item {index} ({filename}): {e}")
+                    results.append({"index": index, "filename": filename, "error": str(e)})
+                yield stream.drain()
+
+            results.sort(key=lambda item: item["index"])
+            archive.writestr("results.json", json.dumps(results, indent=2))
+        yield stream.drain()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/zip',
+        headers={"Content-Disposition": "attachment; filename=encrypted_batch.zip"}
+    )
+
+
+@app.route("/encrypt-sharded", methods=["POST"])
+def encrypt_sharded_handler():
+    """
+    Splits one message across several images, for messages too large for any single one.
+
+    Form fields are the same as /encrypt, with repeated `images` files. Responds
+    with a ZIP of the carrier PNGs; /decrypt needs all of their URLs (repeated
+    `image_url` fields, in any order) to read the message back.
+    """
+    try:
+        images = request.files.getlist('images')
+        message = request.form['message']
+        keyword = request.form['keyword']
+        start_timestamp, end_timestamp = _parse_window(request.form)
+
+        if not images:
+            return jsonify({"error": "No images uploaded"}), 400
+        if len(images) > MAX_SHARD_IMAGES:
+            return jsonify({"error": f"At most {MAX_SHARD_IMAGES} images per message"}), 400
+
+        location = _load_sender_location()
+        if location is None:
+            return jsonify({"error": "Missing geolocation or device data. Please click the tracking link again."}), 400
+        lat, lon, machine_id = location
+
+        carriers = [image.read() for image in images]
+
+        def embed(executor):
+            return hide_message_across_bytes(carriers, message, lat, lon, keyword, machine_id,
+                                             start_timestamp, end_timestamp, DEFAULT_TTL, PNG_COMPRESSION,
+                                             executor=executor)
+
+        pngs = run_in_batch_pool(embed) if len(images) > 1 else embed(None)
+
+        archive_bytes = io.BytesIO()
+        # PNGs are already deflated, so store them as-is
+        with zipfile.ZipFile(archive_bytes, "w", compression=zipfile.ZIP_STORED) as archive:
+            for index, (image, png) in enumerate(zip(images, pngs)):
+                filename = secure_filename(image.filename) or f"image_{index}"
+                archive.writestr(f"{index:03d}_encrypted_{os.path.splitext(filename)[0]}.png", png)
+
+        return send_file(
+            io.BytesIO(archive_bytes.getvalue()),
+            mimetype='application/zip',
+            as_attachment=True,
+            download_name="encrypted_shards.zip"
+        )
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload exceeds the {MAX_BATCH_UPLOAD_BYTES} byte limit"}), 413
+
+    except Exception as e:
+        print(f"[ERROR] /encrypt-sharded: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 @app.route('/decrypt', methods=['POST'])
 def decrypt_handler():
     try:
-        # 1. Extract data from form
-        image_url = request.form.get('image_url')
-        comment_url = request.form.get('comment_url')
-        keyword = request.form.get('keyword')
-        latitude = truncate_to_3_decimal_places(float(request.form.get('latitude')))
-        longitude = truncate_to_3_decimal_places(float(request.form.get('longitude')))
-        machine_id = request.form.get('machine_id')
-        timestamp = request.form.get('timestamp')
-        
-        print(f"[DEBUG] Received -> Lat: {latitude}, Lon: {longitude}, Machine ID: {machine_id}, Timestamp: {timestamp}")
-        print(f"[DEBUG] Image URL: {image_url}, Comment URL: {comment_url}, Keyword(s): {keyword}")
-
-        if not all([image_url, comment_url, keyword, latitude, longitude, machine_id, timestamp]):
-            return jsonify({'error': 'Missing required fields'}), 400
-
-        keywords = [k.strip() for k in keyword.split(',') if k.strip()]
-
-        try:
-            readable_time = datetime.fromtimestamp(int(timestamp)).strftime('%Y-%m-%d %H:%M:%S')
-        except:
-            readable_time = 'Invalid timestamp'
-
-        # 2. Download the image
-        download_result = download_image(image_url)
-        if not download_result["success"]:
-            return jsonify({'error': f'Failed to download image. Detail: {download_result["error"]}'}), 400
-        image_path = download_result["image_path"]
-
-        # 3. Scrape comments
-        comments = fetch_comments(comment_url)
-        if not comments:
-            return jsonify({'error': 'No comments found to match keyword'}), 400
-
-        # 4. NLP: Find matched keyword
-        matched_keyword = find_best_match(keywords, comments)
-
-        # 5. Generate decryption key
-        key = generate_key(latitude, longitude, matched_keyword, machine_id)
-
-        # 6. Decode LSB message from image
-        img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
-        if img is None:
-            return jsonify({'error': 'Failed to load image'}), 400
-
-        bits=[]
-        for row in img:
-            for pixel in row:
-                for channel in range(len(pixel)):
-                    bits.append(str(pixel[channel] & 1))
-
-        binary_data = ''.join(bits)
-        bytes_data = [binary_data[i:i + 8] for i in range(0, len(binary_data), 8)]
-        extracted_message = ''.join(chr(int(b, 2)) for b in bytes_data if int(b, 2) != 0)
-        extracted_message = extracted_message.split("###")[0]
-
-
-        # 🔍 Log the raw extracted message (for debugging)
-        message_digest = hashlib.sha256(extracted_message.encode('utf-8')).hexdigest()
-        print(f"[DEBUG] Message length (chars): {len(extracted_message)}")
-        print(f"[DEBUG] Contains delimiter ###: {'###' in extracted_message}")
-        print(f"[DEBUG] SHA256 digest of message: {hashlib.sha256(extracted_message.encode()).hexdigest()}")
-     
-        try:
-            decoded_data = json.loads(base64.b64decode(extracted_message).decode())
-            print("[DEBUG] Successfully decoded base64 and JSON")
-        except Exception as e:
-            print(f"[ERROR] Error decoding base64/JSON: {e}")
-            return jsonify({'error': f'Error decoding base64 message: {str(e)}'}), 400
-
-        # 7. Extract encryption fields
-        try:
-            iv = base64.b64decode(decoded_data['iv'])
-            tag = base64.b64decode(decoded_data['tag'])
-            encrypted_message = base64.b64decode(decoded_data['msg'])
-            start_timestamp = decoded_data['start_timestamp']
-            end_timestamp = decoded_data['end_timestamp']
-            ttl = decoded_data['ttl']
-            print(f"[DEBUG] IV length: {len(iv)} | Tag length: {len(tag)} | Encrypted msg length: {len(encrypted_message)}")
-        except Exception as e:
-            print(f"[ERROR] Failed to extract decryption fields: {e}")
-            return jsonify({'error': 'Missing or malformed encryption fields'}), 400
-
-        
-        print(f"[DEBUG] Allowed window: {start_timestamp} to {end_timestamp}")
-        current_timestamp = int(timestamp)
-        print(f"[DEBUG] Current time: {current_timestamp}")
-        if not (start_timestamp <= current_timestamp <= end_timestamp):
-            print("[ERROR] Timestamp outside allowed window.")
-            return jsonify({"error": "Session Expired: The current time is outside the allowed window."}), 403
-
-        # 8. Decrypt AES-GCM
-        if any(x is None for x in [key, iv, tag, encrypted_message]):
-            return jsonify({'error': 'Invalid decryption data'}), 400
-
-        print("[STEP 8] Decrypting message using AES-GCM")
-        try:
-            cipher = Cipher(algorithms.AES(key), modes.GCM(iv, tag), backend=default_backend())
-            decryptor = cipher.decryptor()
-            decrypted_message = decryptor.update(encrypted_message) + decryptor.finalize()
-            print("[🔓 SUCCESS] Decryption completed.")
-        except Exception as e:
-            print(f"[❌ ERROR] Decryption failed: {e}")
-            return jsonify({'error': 'Decryption failed. Possibly incorrect key or corrupted data.'}), 400
-        
-        # 9. Print decryption details
-        print("[🔓 DECRYPTION SUCCESS]")
-        print(f"Image URL        : {image_url}")
-        print(f"Keyword(s)       : {keyword}")
-        print(f"Matched Keyword  : {matched_keyword}")
-        print(f"Latitude         : {latitude}")
-        print(f"Longitude        : {longitude}")
-        print(f"Machine ID       : {machine_id}")
-        print(f"Decrypted Message: {decrypted_message.decode()}")
-
-        print("[STEP 9] Final output and cleanup")
-        print(f"🧾 Decrypted Message: {decrypted_message.decode()}")
-        print(f"📌 Source: {image_url} | Keyword Used: {matched_keyword} | Location: ({latitude}, {longitude}) | Device: {machine_id}")
-
-        # 10. Cleanup
-        os.remove(image_path)
-
-        # 11. Return decrypted result
-        return jsonify({
-            "message": decrypted_message.decode()
-        })
+        if wants_job(request.form):
+            body, status = submit_decrypt_job(request.form)
+            return jsonify(body), status
+
+        body, status, timer = run_decrypt(request.form)
+        response = jsonify(body)
+        if DEBUG_TIMINGS:
+            response.headers['Server-Timing'] = timer.server_timing_header()
+        return response, status
 
     except Exception as e:
         import traceback
@@ -328,5 +464,13 @@ def decrypt_handler():
         return jsonify({'error': f'Decryption failed: {str(e)}'}), 500
 
 
+@app.route('/decrypt-jobs/<job_id>', methods=['GET'])
+def decrypt_job_handler(job_id):
+    body, status = decrypt_job_status(job_id)
+    return jsonify(body), status
+
+
 if __name__ == '__main__':
+    warmup.start()
+    print(startup_report.format_report())
     app.run(host='0.0.0.0', port=10000)
@@ -0,0 +1,39 @@
+import glob
+import os
+import tempfile
+
+from config import env_flag
+import startup_report
+
+# Workers write metric snapshots here so /metrics can sum them; set before the
+# app (and metrics.py) is imported by the master or the workers.
+if not os.getenv("STEGO_METRICS_DIR"):
+    os.environ["STEGO_METRICS_DIR"] = tempfile.mkdtemp(prefix="stego-metrics-")
+
+# STEGO_PRELOAD_MODEL=1 imports the app (and loads the NLP model) in the master
+# before forking, so every worker shares one copy of the weights.
+preload_app = env_flag("STEGO_PRELOAD_MODEL")
+
+
+def when_ready(server):
+    if preload_app:
+        server.log.info(startup_report.format_report())
+
+
+def post_worker_init(worker):
+    worker.log.info(startup_report.format_report())
+    # Each worker warms its own model and codecs; /readyz turns 200 when done
+    import warmup
+    warmup.start()
+
+
+def on_starting(server):
+    # Counters restart at zero with the server; drop snapshots of a previous run
+    for path in glob.glob(os.path.join(os.environ["STEGO_METRICS_DIR"], "metrics-*.json")):
+        os.remove(path)
+
+
+def worker_exit(server, worker):
+    # Persist the last observations of a worker that is restarted or shut down
+    import metrics
+    metrics.flush()
@@ -1,38 +1,89 @@
 import os
+import time
 from apify_client import ApifyClient
 
+import client_registry
+
 # Get Apify token from environment
 APIFY_TOKEN = os.getenv("APIFY_API_TOKEN")
 
-def fetch_instagram_comments(instagram_url):
+# ApifyClient's HTTP client is thread-safe, so one instance serves the process
+client_registry.register("apify", lambda: ApifyClient(APIFY_TOKEN))
+
+ACTOR_ID = "apify/instagram-comment-scraper"
+RESULTS_LIMIT = 1000
+# Dataset items read per page while the actor run is still producing them
+PAGE_SIZE = int(os.getenv("STEGO_INSTAGRAM_PAGE_SIZE", "100"))
+# Seconds between dataset polls when no new items have arrived yet
+POLL_INTERVAL = float(os.getenv("STEGO_INSTAGRAM_POLL_INTERVAL", "2"))
+
+TERMINAL_STATUSES = ("SUCCEEDED", "FAILED", "ABORTED", "TIMED-OUT")
+
+def _field(record, key, attr):
+    # apify-client < 2 returns plain dicts, newer versions return models
+    return record[key] if isinstance(record, dict) else getattr(record, attr)
+
+def _run_status(client, run_id):
+    status = _field(client.run(run_id).get(), "status", "status")
+    return getattr(status, "value", status)
+
+def iter_instagram_comment_pages(instagram_url, page_size=PAGE_SIZE, stop=None):
+    """
+    Starts the comment scraper actor and yields comments as they land in its dataset.
+
+    If the consumer stops early (closes the generator, or sets `stop` while
+    this waits for new items), the actor run is aborted so it stops scraping
+    and billing. Errors while reading results are raised after the abort.
+    """
     if not APIFY_TOKEN:
         raise Exception("❌ Apify API token not found. Make sure 'APIFY_API_TOKEN' is set in .env.")
 
-    # Initialize Apify client
-    client = ApifyClient(APIFY_TOKEN)
+    client = client_registry.get("apify")
 
     run_input = {
         "directUrls": [instagram_url],
-        "resultsLimit": 1000,
+        "resultsLimit": RESULTS_LIMIT,
         "scrollWaitSecs": 3,
         "proxy": {"useApifyProxy": True},
     }
 
-    # Start the actor
+    # Start the actor without waiting for it to finish
     try:
-        run = client.actor("apify/instagram-comment-scraper").call(run_input=run_input)
+        run = client.actor(ACTOR_ID).start(run_input=run_input)
     except Exception as e:
         print(f"❌ Error triggering Apify actor: {e}")
-        return []
+        return
+
+    run_id = _field(run, "id", "id")
+    dataset = client.dataset(_field(run, "defaultDatasetId", "default_dataset_id"))
+    finished = False
+    offset = 0
 
-    comments_list = []
     try:
-        for item in client.dataset(run["defaultDatasetId"]).iterate_items():
-            comment = item.get("text")
-            if comment:
-                comments_list.append(comment)
+        while offset < RESULTS_LIMIT:
+            items = dataset.list_items(offset=offset, limit=min(page_size, RESULTS_LIMIT - offset)).items
+            if items:
+                offset += len(items)
+                yield [item.get("text") for item in items if item.get("text")]
+                continue
+            if finished:
+                break
+            # Items written before the run finished are drained on the next pass
+            finished = _run_status(client, run_id) in TERMINAL_STATUSES
+            if not finished:
+                if stop is None:
+                    time.sleep(POLL_INTERVAL)
+                elif stop.wait(POLL_INTERVAL):
+                    break
     except Exception as e:
         print(f"❌ Error fetching results: {e}")
-        return []
+        raise
+    finally:
+        if not finished:
+            try:
+                client.run(run_id).abort()
+            except Exception as e:
+                print(f"⚠️ Could not abort Apify run {run_id}: {e}")
 
-    return comments_list
+def fetch_instagram_comments(instagram_url):
+    return [comment for page in iter_instagram_comment_pages(instagram_url) for comment in page]
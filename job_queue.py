@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from sqlite_store import ThreadConnections, Sweeper
+
+# Expired jobs are swept every this many submissions
+PURGE_EVERY = 100
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def new_job_id():
+    # Results can hold decrypted plaintext, so ids must not be guessable
+    return secrets.token_urlsafe(24)
+
+
+def dedup_key(fields):
+    """Stable key for a request's fields; identical submissions share one job."""
+    return hashlib.sha256(json.dumps(fields, sort_keys=True).encode()).hexdigest()
+
+
+class MemoryJobStore:
+    """
+    Jobs held in this process only.
+
+    A status poll that lands on another gunicorn worker would get 404, and
+    identical submissions to different workers run twice; use it with a
+    single worker or in tests.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def claim(self, key, job_id, expires_at):
+        """Creates job_id under key unless a live job already holds it. Returns (job id, created)."""
+        now = time.time()
+        with self._lock:
+            existing = self._keys.get(key)
+            if existing is not None and self._jobs[existing]["expires_at"] >= now:
+                return existing, False
+            self._jobs[job_id] = {"id": job_id, "key": key, "status": QUEUED, "http_status": None,
+                                  "body": None, "created_at": now, "expires_at": expires_at}
+            self._keys[key] = job_id
+            return job_id, True
+
+    def update(self, job_id, status, expires_at, body=None, http_status=None, release_key=False):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(status=status, expires_at=expires_at, body=body, http_status=http_status)
+            if release_key and self._keys.get(job["key"]) == job_id:
+                del self._keys[job["key"]]
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["expires_at"] < time.time():
+                return None
+            return dict(job)
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items() if job["expires_at"] < now]:
+                job = self._jobs.pop(job_id)
+                if self._keys.get(job["key"]) == job_id:
+                    del self._keys[job["key"]]
+
+
+def _handle(secret):
+    """Lookup key stored in place of a job id or dedup key."""
+    return hashlib.sha256(secret.encode()).hexdigest()
+
+
+def _seal_key(secret, purpose):
+    return AESGCM(hashlib.sha256(f"stego-job-{purpose}:{secret}".encode()).digest())
+
+
+def _seal(secret, purpose, data):
+    """AES-GCM encrypts data with a key derived from `secret` (a job id or dedup key)."""
+    nonce = os.urandom(12)
+    return nonce + _seal_key(secret, purpose).encrypt(nonce, data, None)
+
+
+def _unseal(secret, purpose, blob):
+    return _seal_key(secret, purpose).decrypt(blob[:12], blob[12:], None)
+
+
+class SQLiteJobStore:
+    """
+    Store shared by every gunicorn worker on the host.
+
+    A job runs in the worker that accepted it, but any worker can answer a
+    status poll, and the UNIQUE dedup key makes identical submissions to
+    different workers collapse onto one job.
+
+    Results can hold decrypted plaintext, so the file (and its WAL) never does:
+    rows are found by a hash of the job id, result bodies are encrypted with a
+    key derived from the job id, and the job id itself is only stored
+    encrypted with a key derived from the request's dedup key. Reading a
+    result takes the job id, which only the submitter holds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._connections = ThreadConnections(path)
+        self._connections.create(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "handle TEXT PRIMARY KEY, dedup_handle TEXT UNIQUE, sealed_id BLOB NOT NULL, "
+            "status TEXT NOT NULL, http_status INTEGER, body BLOB, created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def claim(self, key, job_id, expires_at):
+        conn = self._connections.get()
+        now = time.time()
+        dedup_handle = _handle(key)
+        # Frees the key of an expired job so the insert below can take it
+        conn.execute("DELETE FROM jobs WHERE dedup_handle = ? AND expires_at < ?", (dedup_handle, now))
+        conn.execute(
+            "INSERT INTO jobs (handle, dedup_handle, sealed_id, status, created_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(dedup_handle) DO NOTHING",
+            (_handle(job_id), dedup_handle, _seal(key, "id", job_id.encode()), QUEUED, now, expires_at),
+        )
+        conn.commit()
+        row = conn.execute("SELECT sealed_id FROM jobs WHERE dedup_handle = ?", (dedup_handle,)).fetchone()
+        existing = _unseal(key, "id", row[0]).decode()
+        return existing, existing == job_id
+
+    def update(self, job_id, status, expires_at, body=None, http_status=None, release_key=False):
+        conn = self._connections.get()
+        sealed = None if body is None else _seal(job_id, "body", json.dumps(body).encode())
+        conn.execute(
+            "UPDATE jobs SET status = ?, expires_at = ?, body = ?, http_status = ?"
+            + (", dedup_handle = NULL" if release_key else "") + " WHERE handle = ?",
+            (status, expires_at, sealed, http_status, _handle(job_id)),
+        )
+        conn.commit()
+
+    def get(self, job_id):
+        row = self._connections.get().execute(
+            "SELECT status, http_status, body, created_at, expires_at FROM jobs "
+            "WHERE handle = ? AND expires_at >= ?", (_handle(job_id), time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return {"id": job_id, "status": row[0], "http_status": row[1],
+                "body": None if row[2] is None else json.loads(_unseal(job_id, "body", row[2])),
+                "created_at": row[3], "expires_at": row[4]}
+
+    def purge(self):
+        conn = self._connections.get()
+        conn.execute("DELETE FROM jobs WHERE expires_at < ?", (time.time(),))
+        conn.commit()
+
+
+class JobQueue:
+    """
+    Runs request handlers in a background worker pool and keeps their results for polling.
+
+    Jobs are deduplicated by key while queued, running, or holding a successful
+    result; a failed job releases its key so a retry runs again. A job that
+    does not finish within job_timeout (e.g. its worker process died) expires
+    like a stale result.
+    """
+
+    def __init__(self, store, workers=4, job_timeout=600, result_ttl=300):
+        self.store = store
+        self.job_timeout = job_timeout
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._sweeper = Sweeper(store.purge, PURGE_EVERY)
+
+    def submit(self, key, fn, *args):
+        """
+        Queues fn(*args), which must return (response body, HTTP status).
+
+        Returns:
+            tuple: (job id, True if a new job was queued / False if deduplicated)
+        """
+        job_id, created = self.store.claim(key, new_job_id(), time.time() + self.job_timeout)
+        if created:
+            self._executor.submit(self._run, job_id, fn, args)
+        self._sweeper.tick()
+        return job_id, created
+
+    def _run(self, job_id, fn, args):
+        self.store.update(job_id, RUNNING, time.time() + self.job_timeout)
+        try:
+            body, status = fn(*args)
+        except Exception as e:
+            traceback.print_exc()
+            body, status = {'error': f'Job failed: {str(e)}'}, 500
+        self.store.update(job_id, DONE if status == 200 else FAILED, time.time() + self.result_ttl,
+                          body=body, http_status=status, release_key=status != 200)
+        print(f"[JOB] {job_id[:8]} finished with status {status}")
+
+    def status(self, job_id):
+        """Returns the job record, or None if it is unknown or expired."""
+        return self.store.get(job_id)
+
+
+def queue_from_env():
+    """
+    Builds the job queue configured by STEGO_JOB_* variables.
+
+    The SQLite store lives at STEGO_JOB_DB, by default decrypt_jobs.sqlite3 in
+    the server's working directory (plus its -wal/-shm files); every worker
+    on the host must point at the same file. STEGO_JOB_BACKEND=memory keeps
+    jobs in process memory instead (single worker only).
+    """
+    if os.getenv("STEGO_JOB_BACKEND", "sqlite") == "memory":
+        store = MemoryJobStore()
+    else:
+        store = SQLiteJobStore(os.getenv("STEGO_JOB_DB", "decrypt_jobs.sqlite3"))
+    return JobQueue(
+        store,
+        workers=int(os.getenv("STEGO_JOB_WORKERS", "4")),
+        job_timeout=float(os.getenv("STEGO_JOB_TIMEOUT", "600")),
+        result_ttl=float(os.getenv("STEGO_JOB_RESULT_TTL", "300")),
+    )
@@ -0,0 +1,102 @@
+import json
+import os
+import secrets
+import threading
+import time
+
+from sqlite_store import ThreadConnections, Sweeper
+
+# Expired entries are swept every this many writes
+PURGE_EVERY = 100
+
+# Key that mirrors the most recent /store-location call, for clients that do
+# not send a session token yet (the old single location_temp.json behaviour);
+# only written and read with STEGO_LOCATION_LATEST_FALLBACK
+LATEST_KEY = "__latest__"
+
+
+def new_session_token():
+    return secrets.token_urlsafe(24)
+
+
+class MemoryLocationStore:
+    """
+    Locations held in this process only.
+
+    Another gunicorn worker would not see a sender's /store-location, so this
+    suits a single-worker dev server or tests.
+    """
+
+    def __init__(self, ttl=3600):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._sweeper = Sweeper(self.purge, PURGE_EVERY)
+
+    def put(self, token, record):
+        with self._lock:
+            self._entries[token] = (record, time.time() + self.ttl)
+        self._sweeper.tick()
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                return None
+            if entry[1] < time.time():
+                del self._entries[token]
+                return None
+            return entry[0]
+
+    def purge(self):
+        now = time.time()
+        with self._lock:
+            for token in [t for t, (_, expires) in self._entries.items() if expires < now]:
+                del self._entries[token]
+
+
+class SQLiteLocationStore:
+    """
+    Store shared by every gunicorn worker on the host.
+
+    Uses WAL mode so readers never block the writer, and one connection per
+    thread so concurrent requests do not serialize on a Python lock.
+    """
+
+    def __init__(self, path, ttl=3600):
+        self.path = path
+        self.ttl = ttl
+        self._connections = ThreadConnections(path)
+        self._sweeper = Sweeper(self.purge, PURGE_EVERY)
+        self._connections.create(
+            "CREATE TABLE IF NOT EXISTS locations ("
+            "token TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def put(self, token, record):
+        conn = self._connections.get()
+        conn.execute(
+            "INSERT OR REPLACE INTO locations (token, record, expires_at) VALUES (?, ?, ?)",
+            (token, json.dumps(record), time.time() + self.ttl),
+        )
+        conn.commit()
+        self._sweeper.tick()
+
+    def get(self, token):
+        row = self._connections.get().execute(
+            "SELECT record FROM locations WHERE token = ? AND expires_at >= ?", (token, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge(self):
+        conn = self._connections.get()
+        conn.execute("DELETE FROM locations WHERE expires_at < ?", (time.time(),))
+        conn.commit()
+
+
+def store_from_env():
+    """Builds the location store configured by STEGO_LOCATION_* variables."""
+    ttl = float(os.getenv("STEGO_LOCATION_TTL", "3600"))
+    if os.getenv("STEGO_LOCATION_BACKEND", "sqlite") == "memory":
+        return MemoryLocationStore(ttl)
+    return SQLiteLocationStore(os.getenv("STEGO_LOCATION_DB", "location_sessions.sqlite3"), ttl)
@@ -0,0 +1,249 @@
+import glob
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# Prometheus-style metrics for the service.
+#
+# Observations only touch in-process counters. With several gunicorn workers,
+# set STEGO_METRICS_DIR to a directory shared by them (gunicorn.conf.py does
+# this automatically): each process then writes a snapshot there every
+# STEGO_METRICS_FLUSH_INTERVAL seconds and /metrics sums all snapshots.
+METRICS_DIR = os.getenv("STEGO_METRICS_DIR")
+FLUSH_INTERVAL = float(os.getenv("STEGO_METRICS_FLUSH_INTERVAL", "5"))
+
+# Upper bounds (seconds) of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, math.inf)
+
+_metrics = {}
+_lock = threading.Lock()
+_flusher_started = False
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _reset_after_fork():
+    """Drops values inherited from the parent (e.g. the preloading gunicorn master); its thread is gone too."""
+    global _lock, _flusher_started
+    _lock = threading.Lock()
+    _flusher_started = False
+    for metric in _metrics.values():
+        metric.clear()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        _ensure_flusher()
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def clear(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+    @staticmethod
+    def merge(total, series):
+        return (total or 0) + series
+
+    def render(self, key, value):
+        yield f"{self.name}{_format_labels(key)} {_format_value(value)}"
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        _ensure_flusher()
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            # Buckets are stored non-cumulative; render() accumulates them
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def clear(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def snapshot(self):
+        with self._lock:
+            return {json.dumps(key): {"buckets": list(s["buckets"]), "sum": s["sum"], "count": s["count"]}
+                    for key, s in self._series.items()}
+
+    @staticmethod
+    def merge(total, series):
+        if total is None:
+            return {"buckets": list(series["buckets"]), "sum": series["sum"], "count": series["count"]}
+        total["buckets"] = [a + b for a, b in zip(total["buckets"], series["buckets"])]
+        total["sum"] += series["sum"]
+        total["count"] += series["count"]
+        return total
+
+    def render(self, key, series):
+        cumulative = 0
+        for bound, count in zip(self.buckets, series["buckets"]):
+            cumulative += count
+            le = "+Inf" if math.isinf(bound) else repr(bound)
+            yield f"{self.name}_bucket{_format_labels(key + [['le', le]])} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}"
+        yield f"{self.name}_count{_format_labels(key)} {series['count']}"
+
+
+def _register(cls, name, help, **kwargs):
+    with _lock:
+        metric = _metrics.get(name)
+        if metric is None:
+            metric = _metrics[name] = cls(name, help, **kwargs)
+        return metric
+
+
+def counter(name, help):
+    """Returns the process-wide counter `name`, creating it on first use."""
+    return _register(Counter, name, help)
+
+
+def histogram(name, help, buckets=DEFAULT_BUCKETS):
+    """Returns the process-wide histogram `name`, creating it on first use."""
+    return _register(Histogram, name, help, buckets=buckets)
+
+
+STAGE_SECONDS = histogram("stego_stage_duration_seconds", "Time spent in each pipeline stage.")
+
+
+@contextmanager
+def span(stage, **labels):
+    """Times the enclosed block into stego_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage, **labels)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in key) + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def snapshot():
+    """All metrics of this process as a JSON-serializable dict."""
+    with _lock:
+        metrics = list(_metrics.values())
+    return {m.name: {"type": m.type, "series": m.snapshot()} for m in metrics}
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+
+def flush():
+    """Writes this process's snapshot to METRICS_DIR, replacing the previous one atomically."""
+    if not METRICS_DIR:
+        return
+    fd, tmp_path = tempfile.mkstemp(dir=METRICS_DIR, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(tmp_path, _snapshot_path(os.getpid()))
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_INTERVAL)
+        try:
+            flush()
+        except OSError as e:
+            print(f"⚠️ Could not write metrics snapshot: {e}")
+
+
+def _ensure_flusher():
+    global _flusher_started
+    if METRICS_DIR and not _flusher_started:
+        with _lock:
+            if not _flusher_started:
+                _flusher_started = True
+                threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+
+
+def _collect():
+    """Merges this process's live values with the snapshots of every other process."""
+    snapshots = [snapshot()]
+    if METRICS_DIR:
+        own = _snapshot_path(os.getpid())
+        for path in glob.glob(os.path.join(METRICS_DIR, "metrics-*.json")):
+            if path == own:
+                continue
+            try:
+                with open(path) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # being replaced or truncated; picked up on the next scrape
+
+    merged = {}
+    for data in snapshots:
+        for name, metric in data.items():
+            series = merged.setdefault(name, {})
+            cls = Histogram if metric["type"] == "histogram" else Counter
+            for key, value in metric["series"].items():
+                series[key] = cls.merge(series.get(key), value)
+    return merged
+
+
+def render():
+    """Prometheus text exposition of every metric, summed across processes."""
+    merged = _collect()
+    with _lock:
+        metrics = dict(_metrics)
+    lines = []
+    for name, series in sorted(merged.items()):
+        metric = metrics.get(name)
+        if metric is None:
+            continue
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for key, value in sorted(series.items()):
+            lines.extend(metric.render(json.loads(key), value))
+    return "\n".join(lines) + "\n"
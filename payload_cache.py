@@ -0,0 +1,118 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from stego_container import decode_container, encode_container
+
+# What we know about a carrier URL from its last download
+UrlEntry = namedtuple("UrlEntry", ["etag", "last_modified", "content_hash", "size", "stored_at"])
+
+
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class PayloadCache:
+    """
+    Cache of extracted stego containers for repeatedly decrypted images.
+
+    Containers are stored still encrypted, re-packed in the binary container
+    format, and addressed by the SHA-256 of the image body. A second index maps
+    image URLs to their ETag/Last-Modified validators, so unchanged images can
+    be revalidated with a conditional GET instead of downloaded again.
+    """
+
+    def __init__(self, max_entries=512, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._urls = OrderedDict()
+        self._containers = OrderedDict()
+        self._lock = threading.Lock()
+        self.url_hits = 0
+        self.hash_hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+
+    def _evict(self, entries):
+        """Drops least recently used entries beyond the size bound, and expired ones at the front."""
+        now = time.time()
+        # Every entry ends with its stored_at timestamp
+        while entries and (len(entries) > self.max_entries or now - next(iter(entries.values()))[-1] > self.ttl):
+            entries.popitem(last=False)
+
+    def validators(self, url):
+        """Conditional-request headers for `url`, or an empty dict if nothing usable is cached."""
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is None or time.time() - entry.stored_at > self.ttl:
+                return {}
+            if entry.content_hash not in self._containers:
+                return {}
+        headers = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def not_modified(self, url):
+        """Returns the container for `url` after the server answered 304, or None if it was evicted."""
+        with self._lock:
+            entry = self._urls.get(url)
+            stored = self._containers.get(entry.content_hash) if entry else None
+            if stored is None:
+                return None
+            self._urls.move_to_end(url)
+            self._containers.move_to_end(entry.content_hash)
+            self.url_hits += 1
+            self.bytes_saved += entry.size
+        return decode_container(stored[0])
+
+    def get(self, digest):
+        """Returns the container for an image body hash, or None."""
+        with self._lock:
+            stored = self._containers.get(digest)
+            if stored is None or time.time() - stored[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._containers.move_to_end(digest)
+            self.hash_hits += 1
+        return decode_container(stored[0])
+
+    def put(self, url, digest, fields, size, etag=None, last_modified=None):
+        blob = encode_container(**fields)
+        now = time.time()
+        with self._lock:
+            self._containers[digest] = (blob, now)
+            self._containers.move_to_end(digest)
+            self._urls[url] = UrlEntry(etag, last_modified, digest, size, now)
+            self._urls.move_to_end(url)
+            self._evict(self._containers)
+            self._evict(self._urls)
+
+    def remember_url(self, url, digest, size, etag=None, last_modified=None):
+        """Points `url` at an already cached body hash with fresh validators."""
+        with self._lock:
+            self._urls[url] = UrlEntry(etag, last_modified, digest, size, time.time())
+            self._urls.move_to_end(url)
+            self._evict(self._urls)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "url_hits": self.url_hits,
+                "hash_hits": self.hash_hits,
+                "misses": self.misses,
+                "bytes_saved": self.bytes_saved,
+                "containers": len(self._containers),
+            }
+
+
+def cache_from_env():
+    """Builds the payload cache configured by STEGO_PAYLOAD_CACHE_* variables, or None if disabled."""
+    max_entries = int(os.getenv("STEGO_PAYLOAD_CACHE_SIZE", "512"))
+    if max_entries <= 0:
+        return None
+    return PayloadCache(max_entries, ttl=float(os.getenv("STEGO_PAYLOAD_CACHE_TTL", "3600")))
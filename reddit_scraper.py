@@ -1,26 +1,42 @@
 import os
 import praw
 
+import client_registry
+
 # Get Reddit API credentials from environment
 REDDIT_CLIENT_ID = os.getenv("REDDIT_CLIENT_ID")
 REDDIT_CLIENT_SECRET = os.getenv("REDDIT_CLIENT_SECRET")
 REDDIT_USER_AGENT = os.getenv("REDDIT_USER_AGENT", "comment-scraper")
 
-def fetch_reddit_comments(post_url):
-    if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]):
-        raise Exception("❌ Missing Reddit API credentials. Please set REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, and REDDIT_USER_AGENT in your .env file.")
-
-    reddit = praw.Reddit(
+def _build_reddit_client():
+    return praw.Reddit(
         client_id=REDDIT_CLIENT_ID,
         client_secret=REDDIT_CLIENT_SECRET,
         user_agent=REDDIT_USER_AGENT
     )
 
+# praw is not thread-safe, so each thread keeps its own authorized client
+client_registry.register("reddit", _build_reddit_client, per_thread=True)
+
+# Comments handed to the matcher at a time; praw loads the whole thread in one request
+PAGE_SIZE = 100
+
+def iter_reddit_comment_pages(post_url, limit=None, page_size=PAGE_SIZE):
+    if not all([REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, REDDIT_USER_AGENT]):
+        raise Exception("❌ Missing Reddit API credentials. Please set REDDIT_CLIENT_ID, REDDIT_CLIENT_SECRET, and REDDIT_USER_AGENT in your .env file.")
+
+    reddit = client_registry.get("reddit")
+
     try:
         submission = reddit.submission(url=post_url)
         submission.comments.replace_more(limit=0)
         comments = [comment.body for comment in submission.comments[:limit]]
-        return comments
     except Exception as e:
         print(f"❌ Error fetching Reddit comments: {e}")
-        return []
+        return
+
+    for start in range(0, len(comments), page_size):
+        yield comments[start:start + page_size]
+
+def fetch_reddit_comments(post_url, limit=None):
+    return [comment for page in iter_reddit_comment_pages(post_url, limit) for comment in page]
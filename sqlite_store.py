@@ -0,0 +1,56 @@
+import os
+import sqlite3
+import threading
+
+# Shared plumbing for the on-disk stores (locations, jobs, comments, embeddings).
+
+
+class ThreadConnections:
+    """
+    Lazily opened SQLite connections to one file, one per thread and process.
+
+    Nothing is opened until the first get(), and connections are keyed by pid
+    as well as thread: a worker forked after the store was built (gunicorn
+    --preload) opens its own and never uses, or closes, the parent's. The
+    connections live on the instance, so a dropped store is freed with them.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self):
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        conn = conns.get(os.getpid())
+        if conn is None:
+            conn = conns[os.getpid()] = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def create(self, *statements):
+        """Switches the file to WAL (readers never block the writer) and runs the schema statements."""
+        conn = self.get()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in statements:
+            conn.execute(statement)
+        conn.commit()
+
+
+class Sweeper:
+    """Calls `purge` on every `every`-th tick(), for stores that expire entries lazily."""
+
+    def __init__(self, purge, every=100):
+        self.purge = purge
+        self.every = every
+        self._ticks = 0
+        self._lock = threading.Lock()
+
+    def tick(self):
+        with self._lock:
+            self._ticks += 1
+            due = self._ticks % self.every == 0
+        if due:
+            self.purge()
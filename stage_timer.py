@@ -0,0 +1,41 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """Collects per-stage wall times for one request; safe to use from worker threads."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._stages[stage] = self._stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def wrap(self, stage, fn, *args, **kwargs):
+        """Returns a zero-argument callable that runs fn under `stage`, e.g. for an executor."""
+        def run():
+            with self.measure(stage):
+                return fn(*args, **kwargs)
+        return run
+
+    def timings(self):
+        with self._lock:
+            stages = dict(self._stages)
+        stages["total"] = time.perf_counter() - self._started
+        return stages
+
+    def server_timing_header(self):
+        """Formats the timings as a Server-Timing header value (durations in ms)."""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.timings().items())
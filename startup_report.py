@@ -0,0 +1,35 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds spent in each boot stage of this process, in the order they ran
+_timings = {}
+_lock = threading.Lock()
+
+
+def record(stage, seconds):
+    with _lock:
+        _timings[stage] = _timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage):
+    """Records the wall time of the wrapped block under `stage`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+def timings():
+    with _lock:
+        return dict(_timings)
+
+
+def format_report():
+    """One-line breakdown of boot time, e.g. for gunicorn hooks."""
+    stages = timings()
+    parts = [f"{stage}={seconds:.3f}s" for stage, seconds in stages.items()]
+    return f"[STARTUP] pid={os.getpid()} total={sum(stages.values()):.3f}s " + " ".join(parts)
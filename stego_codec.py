@@ -0,0 +1,129 @@
+import numpy as np
+
+# Least-significant-bit codec shared by the encoder and the decoder.
+# Bits are written into the image in C order (row, column, channel), i.e. the
+# same order the original per-pixel loop walked the carrier.
+
+
+def _lsb_clear_mask(dtype):
+    """Mask that keeps every bit of a sample except the LSB."""
+    return dtype.type(np.iinfo(dtype).max ^ 1)
+
+
+def _embed_loop(img, data):
+    """Reference engine: the original per-pixel Python loop."""
+    binary_message = ''.join(format(b, '08b') for b in data)
+    data_index = 0
+
+    for row in img:
+        for pixel in row:
+            for channel in range(len(pixel)):
+                if data_index < len(binary_message):
+                    pixel[channel] = (pixel[channel] & 0xFE) | int(binary_message[data_index])
+                    data_index += 1
+    return img
+
+
+def _embed_numpy(img, data):
+    """Vectorized engine: unpack the payload and write it into the needed prefix only."""
+    bits = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    if not img.flags['C_CONTIGUOUS']:
+        img = np.ascontiguousarray(img)
+
+    flat = img.reshape(-1)
+    prefix = flat[:bits.size]
+    prefix &= _lsb_clear_mask(flat.dtype)
+    prefix |= bits.astype(flat.dtype, copy=False)
+    return img
+
+
+EMBED_ENGINES = {
+    "numpy": _embed_numpy,
+    "loop": _embed_loop,
+}
+
+DEFAULT_ENGINE = "numpy"
+
+# Payload bytes unpacked per step when scanning a carrier for a delimiter
+CHUNK_BYTES = 4096
+
+
+def embed_lsb(img, data, engine=DEFAULT_ENGINE):
+    """
+    Writes `data` into the least-significant bits of `img`.
+
+    Args:
+        img (np.ndarray): Carrier image as returned by cv2.imread. Modified in place
+            when it is C-contiguous.
+        data (bytes | str): Payload to embed. Strings are encoded as latin-1 so every
+            character maps to exactly one byte, as the original loop did.
+        engine (str): Name of the embedding engine in EMBED_ENGINES.
+
+    Returns:
+        np.ndarray: The carrier holding the payload.
+    """
+    if isinstance(data, str):
+        data = data.encode('latin-1')
+
+    try:
+        embed = EMBED_ENGINES[engine]
+    except KeyError:
+        raise ValueError(f"Unknown embedding engine: {engine}")
+
+    if len(data) * 8 > img.size:
+        raise ValueError("Message too large to hide in image")
+
+    return embed(img, data)
+
+
+def iter_lsb_bytes(img, chunk_bytes=CHUNK_BYTES):
+    """
+    Yields the bytes hidden in the LSBs of `img`, `chunk_bytes` at a time.
+
+    Only the samples needed for each chunk are touched, so callers that stop
+    early never unpack the rest of the carrier. A trailing partial byte is dropped.
+    """
+    flat = img.reshape(-1)
+    usable = flat.size - flat.size % 8
+    step = chunk_bytes * 8
+
+    for start in range(0, usable, step):
+        lsb = (flat[start:min(start + step, usable)] & 1).astype(np.uint8, copy=False)
+        yield np.packbits(lsb).tobytes()
+
+
+def read_lsb_bytes(img, count, offset=0):
+    """Returns `count` payload bytes starting at byte `offset`, or fewer if the carrier ends."""
+    flat = img.reshape(-1)
+    start = offset * 8
+    stop = min(start + count * 8, flat.size - flat.size % 8)
+    if stop <= start:
+        return b""
+    lsb = (flat[start:stop] & 1).astype(np.uint8, copy=False)
+    return np.packbits(lsb).tobytes()
+
+
+def extract_lsb(img, delimiter=b"###", chunk_bytes=CHUNK_BYTES):
+    """
+    Extracts the payload hidden in `img` up to the first `delimiter`.
+
+    Args:
+        img (np.ndarray): Carrier image as returned by cv2.imread.
+        delimiter (bytes): Sentinel that terminates the payload.
+        chunk_bytes (int): Payload bytes unpacked per step.
+
+    Returns:
+        bytes or None: Payload without the delimiter and without NUL bytes,
+        or None if the delimiter never appears.
+    """
+    buffer = bytearray()
+
+    for chunk in iter_lsb_bytes(img, chunk_bytes):
+        # Resume the search just before the new chunk so a split delimiter is found
+        search_from = max(0, len(buffer) - len(delimiter) + 1)
+        buffer += chunk
+        end = buffer.find(delimiter, search_from)
+        if end != -1:
+            return bytes(buffer[:end]).replace(b"\x00", b"")
+
+    return None
@@ -0,0 +1,277 @@
+import base64
+import hashlib
+import json
+import struct
+import zlib
+from collections import namedtuple
+
+from stego_codec import extract_lsb, read_lsb_bytes
+
+# Binary container layout (all integers big-endian):
+#
+#   header : magic (3s) | version (B) | body length (I)
+#   body   : iv (12s) | tag (16s) | start_timestamp (q) | end_timestamp (q) | ttl (I)
+#            | iv_loc (12s) | tag_loc (16s) | len(lat) (H) | len(lon) (H)
+#            | lat | lon | msg
+#
+# The magic starts with a non-ASCII byte so it can never be confused with the
+# legacy base64(JSON) + '###' payload, which is read as a fallback.
+#
+# A container too large for one carrier is split into shards, one per image:
+#
+#   shard  : magic (3s) | version (B) | index (H) | count (H)
+#            | set digest (16s) | crc32 of data (I) | data length (I) | data
+#
+# The set digest is the truncated SHA-256 of the whole container: it groups
+# the shards of one message and verifies the reassembled container.
+MAGIC = b"\x89SG"
+SHARD_MAGIC = b"\x89SS"
+VERSION = 1
+LEGACY_DELIMITER = b"###"
+
+HEADER = struct.Struct(">3sBI")
+FIELDS = struct.Struct(">12s16sqqI12s16sHH")
+SHARD_HEADER = struct.Struct(">3sBHH16sII")
+MAX_SHARDS = 0xFFFF
+
+Shard = namedtuple("Shard", ["index", "count", "digest", "data"])
+
+FORMAT_BINARY = "binary"
+FORMAT_LEGACY = "legacy"
+
+
+class ContainerError(ValueError):
+    """Raised when a carrier holds no readable stego container."""
+
+
+def encode_container(iv, tag, msg, start_timestamp, end_timestamp, ttl, lat, lon, iv_loc, tag_loc):
+    """
+    Packs the encrypted fields into a versioned binary container.
+
+    All cipher fields are raw bytes; timestamps and ttl are integers.
+    """
+    body = FIELDS.pack(
+        iv, tag, int(start_timestamp), int(end_timestamp), int(ttl),
+        iv_loc, tag_loc, len(lat), len(lon)
+    ) + lat + lon + msg
+    return HEADER.pack(MAGIC, VERSION, len(body)) + body
+
+
+def decode_container(blob):
+    """Unpacks a binary container into a dict of raw fields."""
+    if len(blob) < HEADER.size:
+        raise ContainerError("Container header truncated")
+
+    magic, version, length = HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ContainerError("Not a binary stego container")
+    if version != VERSION:
+        raise ContainerError(f"Unsupported container version: {version}")
+
+    body = blob[HEADER.size:HEADER.size + length]
+    if len(body) != length or length < FIELDS.size:
+        raise ContainerError("Container body truncated")
+
+    iv, tag, start_timestamp, end_timestamp, ttl, iv_loc, tag_loc, lat_len, lon_len = FIELDS.unpack_from(body)
+    offset = FIELDS.size
+    lat = body[offset:offset + lat_len]
+    lon = body[offset + lat_len:offset + lat_len + lon_len]
+    msg = body[offset + lat_len + lon_len:]
+
+    return {
+        'iv': iv,
+        'tag': tag,
+        'msg': msg,
+        'start_timestamp': start_timestamp,
+        'end_timestamp': end_timestamp,
+        'ttl': ttl,
+        'lat': lat,
+        'lon': lon,
+        'iv_loc': iv_loc,
+        'tag_loc': tag_loc,
+    }
+
+
+def split_container(blob, capacities):
+    """
+    Splits a packed container into one shard per carrier.
+
+    Shard sizes follow the carriers' capacities, so no carrier is fuller than
+    it has to be.
+
+    Args:
+        blob (bytes): Output of encode_container.
+        capacities (list): Payload bytes each carrier can hold.
+
+    Returns:
+        list: Shard blobs, in carrier order.
+
+    Raises:
+        ValueError: If the carriers cannot hold the container between them.
+    """
+    room = [max(capacity - SHARD_HEADER.size, 0) for capacity in capacities]
+    if not 0 < len(room) <= MAX_SHARDS:
+        raise ValueError(f"Sharding needs between 1 and {MAX_SHARDS} carriers")
+    if sum(room) < len(blob):
+        raise ValueError("Message too large to hide in these images")
+
+    # Proportional split; the rounding remainder goes to carriers with room left
+    total = sum(room)
+    sizes = [len(blob) * r // total for r in room]
+    for index in range(len(sizes)):
+        extra = min(len(blob) - sum(sizes), room[index] - sizes[index])
+        sizes[index] += extra
+
+    digest = hashlib.sha256(blob).digest()[:16]
+    shards = []
+    offset = 0
+    for index, size in enumerate(sizes):
+        data = blob[offset:offset + size]
+        offset += size
+        shards.append(SHARD_HEADER.pack(SHARD_MAGIC, VERSION, index, len(sizes), digest,
+                                        zlib.crc32(data), len(data)) + data)
+    return shards
+
+
+def decode_shard(blob):
+    """Unpacks and verifies one shard."""
+    if len(blob) < SHARD_HEADER.size:
+        raise ContainerError("Shard header truncated")
+
+    magic, version, index, count, digest, crc, length = SHARD_HEADER.unpack_from(blob)
+    if magic != SHARD_MAGIC:
+        raise ContainerError("Not a stego container shard")
+    if version != VERSION:
+        raise ContainerError(f"Unsupported container version: {version}")
+
+    data = blob[SHARD_HEADER.size:SHARD_HEADER.size + length]
+    if len(data) != length:
+        raise ContainerError(f"Shard {index + 1} of {count} truncated")
+    if zlib.crc32(data) != crc or index >= count:
+        raise ContainerError(f"Shard {index + 1} of {count} is corrupted")
+    return Shard(index, count, digest, data)
+
+
+def join_shards(shards):
+    """
+    Reassembles shards, in any order, into a container.
+
+    Returns:
+        dict: Raw container fields, as decode_container.
+    """
+    if not shards:
+        raise ContainerError("No shards to join")
+    first = shards[0]
+    if any(shard.digest != first.digest or shard.count != first.count for shard in shards):
+        raise ContainerError("Images belong to different messages")
+
+    by_index = {shard.index: shard.data for shard in shards}
+    missing = [str(i + 1) for i in range(first.count) if i not in by_index]
+    if missing:
+        raise ContainerError(f"Missing shard(s) {', '.join(missing)} of {first.count}")
+
+    blob = b"".join(by_index[i] for i in range(first.count))
+    if hashlib.sha256(blob).digest()[:16] != first.digest:
+        raise ContainerError("Reassembled container failed its integrity check")
+    return decode_container(blob)
+
+
+def framed_length(header):
+    """
+    Total size of the binary container or shard that starts with `header`.
+
+    Args:
+        header (bytes): At least SHARD_HEADER.size leading payload bytes.
+
+    Returns:
+        int or None: Byte count, or None if this is not a binary payload.
+    """
+    if header[:len(MAGIC)] == MAGIC and len(header) >= HEADER.size:
+        return HEADER.size + HEADER.unpack_from(header)[2]
+    if header[:len(SHARD_MAGIC)] == SHARD_MAGIC and len(header) >= SHARD_HEADER.size:
+        return SHARD_HEADER.size + SHARD_HEADER.unpack_from(header)[-1]
+    return None
+
+
+def decode_framed(blob):
+    """
+    Unpacks a binary container, or a shard as {'shard': Shard}.
+
+    A shard carries only part of a container; callers join the shards of all
+    carriers with join_shards.
+    """
+    if blob[:len(SHARD_MAGIC)] == SHARD_MAGIC:
+        return {'shard': decode_shard(blob)}
+    return decode_container(blob)
+
+
+def encode_legacy(iv, tag, msg, start_timestamp, end_timestamp, ttl, lat, lon, iv_loc, tag_loc):
+    """Packs the fields the original way: base64(JSON of base64 fields) + '###'."""
+    data_dict = {
+        'iv': base64.b64encode(iv).decode(),
+        'tag': base64.b64encode(tag).decode(),
+        'msg': base64.b64encode(msg).decode(),
+        'start_timestamp': int(start_timestamp),
+        'end_timestamp': int(end_timestamp),
+        'ttl': ttl,
+        'lat': base64.b64encode(lat).decode(),
+        'lon': base64.b64encode(lon).decode(),
+        'iv_loc': base64.b64encode(iv_loc).decode(),
+        'tag_loc': base64.b64encode(tag_loc).decode()
+    }
+    return base64.b64encode(json.dumps(data_dict).encode()) + LEGACY_DELIMITER
+
+
+def decode_legacy(payload):
+    """Unpacks a legacy base64(JSON) payload (without the delimiter) into raw fields."""
+    try:
+        decoded_data = json.loads(base64.b64decode(payload).decode())
+        return {
+            'iv': base64.b64decode(decoded_data['iv']),
+            'tag': base64.b64decode(decoded_data['tag']),
+            'msg': base64.b64decode(decoded_data['msg']),
+            'start_timestamp': decoded_data['start_timestamp'],
+            'end_timestamp': decoded_data['end_timestamp'],
+            'ttl': decoded_data['ttl'],
+            'lat': base64.b64decode(decoded_data.get('lat', '')),
+            'lon': base64.b64decode(decoded_data.get('lon', '')),
+            'iv_loc': base64.b64decode(decoded_data.get('iv_loc', '')),
+            'tag_loc': base64.b64decode(decoded_data.get('tag_loc', '')),
+        }
+    except Exception as e:
+        raise ContainerError(f"Malformed legacy payload: {e}")
+
+
+ENCODERS = {
+    FORMAT_BINARY: encode_container,
+    FORMAT_LEGACY: encode_legacy,
+}
+
+
+def pack_container(fields, container_format=FORMAT_BINARY):
+    """Serializes a dict of raw fields with the named container format."""
+    try:
+        encode = ENCODERS[container_format]
+    except KeyError:
+        raise ValueError(f"Unknown container format: {container_format}")
+    return encode(**fields)
+
+
+def read_container(img):
+    """
+    Reads the stego container hidden in `img`.
+
+    Binary containers and shards are read by their length header; anything
+    else falls back to the legacy delimiter scan.
+
+    Returns:
+        dict: Raw container fields, or {'shard': Shard} (see decode_framed).
+    """
+    length = framed_length(read_lsb_bytes(img, SHARD_HEADER.size))
+    if length is not None:
+        return decode_framed(read_lsb_bytes(img, length))
+
+    payload = extract_lsb(img, LEGACY_DELIMITER)
+    if payload is None:
+        raise ContainerError("No hidden message found")
+    return decode_legacy(payload)
@@ -0,0 +1,31 @@
+import os
+import base64
+from hashlib import sha256
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.backends import default_backend
+
+from metrics import span
+
+def truncate_to_3_decimal_places(value):
+    return float(str(value).split('.')[0] + '.' + str(value).split('.')[1][:3])
+
+def generate_key(lat, lon, keyword, machine_id):
+    lat = truncate_to_3_decimal_places(lat)
+    lon = truncate_to_3_decimal_places(lon)
+    key_data = f"{lat}_{lon}_{keyword}_{machine_id}"
+    return sha256(key_data.encode()).digest()
+
+def encrypt_message(message, key):
+    iv = os.urandom(12)
+    with span("aes_gcm", op="encrypt"):
+        cipher = Cipher(algorithms.AES(key), modes.GCM(iv), backend=default_backend())
+        encryptor = cipher.encryptor()
+        encrypted_message = encryptor.update(message.encode()) + encryptor.finalize()
+    return iv, encryptor.tag, base64.b64encode(encrypted_message).decode()
+
+def decrypt_message(key, iv, tag, encrypted_message):
+    """AES-GCM decrypts raw ciphertext; raises if the tag does not verify."""
+    with span("aes_gcm", op="decrypt"):
+        cipher = Cipher(algorithms.AES(key), modes.GCM(iv, tag), backend=default_backend())
+        decryptor = cipher.decryptor()
+        return decryptor.update(encrypted_message) + decryptor.finalize()
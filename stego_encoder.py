@@ -0,0 +1,149 @@
+import base64
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from stego_codec import embed_lsb, DEFAULT_ENGINE
+from stego_container import pack_container, split_container, FORMAT_BINARY
+from stego_crypto import generate_key, encrypt_message, truncate_to_3_decimal_places
+from metrics import span
+from carrier_io import open_carrier, embed_into_file, CarrierError, RAW_EXTENSIONS
+
+DEFAULT_TTL = 600  # 10 minutes
+
+
+def build_container(message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL, container_format=FORMAT_BINARY):
+    """Encrypts the message and location and packs them into a stego container."""
+    key = generate_key(lat, lon, keyword, machine_id)
+    iv, tag, encrypted_message = encrypt_message(message, key)
+
+    lat = truncate_to_3_decimal_places(lat)
+    lon = truncate_to_3_decimal_places(lon)
+
+    # Encrypt lat/lon
+    iv_loc, tag_loc, encrypted_lat = encrypt_message(str(lat), key)
+    _, _, encrypted_lon = encrypt_message(str(lon), key)
+
+    return pack_container({
+        'iv': iv,
+        'tag': tag,
+        'msg': base64.b64decode(encrypted_message),
+        'start_timestamp': int(start_timestamp),
+        'end_timestamp': int(end_timestamp),
+        'ttl': ttl,
+        'lat': base64.b64decode(encrypted_lat),
+        'lon': base64.b64decode(encrypted_lon),
+        'iv_loc': iv_loc,
+        'tag_loc': tag_loc
+    }, container_format)
+
+
+def hide_message_in_array(img, message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL, engine=DEFAULT_ENGINE, container_format=FORMAT_BINARY):
+    """Hides the encrypted message in a decoded image array and returns the carrier."""
+    data = build_container(message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl, container_format)
+    return embed_payload(img, data, engine)
+
+
+def embed_payload(img, data, engine=DEFAULT_ENGINE):
+    """Embeds an already packed container (or shard) into a decoded image array."""
+    # One bit per sample, whatever the channel count (gray, BGR, BGRA) or depth
+    max_bytes = img.size // 8
+
+    if len(data) > max_bytes:
+        raise ValueError("Message too large to hide in image")
+
+    with span("lsb_embed"):
+        return embed_lsb(img, data, engine=engine)
+
+
+def _same_raw_format(image_path, output_path):
+    ext = os.path.splitext(image_path)[1].lower()
+    return ext in RAW_EXTENSIONS and ext == os.path.splitext(output_path)[1].lower()
+
+
+def hide_message_in_image(image_path, message, output_path, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL, engine=DEFAULT_ENGINE, container_format=FORMAT_BINARY):
+    if _same_raw_format(image_path, output_path):
+        # Copy and patch the payload samples in place instead of decoding and re-encoding the whole image
+        data = build_container(message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl, container_format)
+        if os.path.abspath(image_path) != os.path.abspath(output_path):
+            shutil.copyfile(image_path, output_path)
+        try:
+            embed_into_file(output_path, data)
+            return
+        except CarrierError:
+            pass  # e.g. a 32-bit or RLE BMP: re-encode through cv2 below
+
+    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Invalid image path or unsupported format")
+
+    img = hide_message_in_array(img, message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl, engine, container_format)
+
+    cv2.imwrite(output_path, img)
+
+
+def decode_image_bytes(image_bytes):
+    """Decodes an uploaded/downloaded image without touching disk."""
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise ValueError("Invalid image data or unsupported format")
+    return img
+
+
+def encode_png(img, compression=None):
+    """Encodes an image array as PNG bytes; compression is zlib level 0-9 (None = OpenCV default)."""
+    params = [cv2.IMWRITE_PNG_COMPRESSION, int(compression)] if compression is not None else []
+    with span("png_encode"):
+        ok, buffer = cv2.imencode(".png", img, params)
+    if not ok:
+        raise ValueError("Failed to encode PNG")
+    return buffer.tobytes()
+
+
+def hide_message_in_bytes(image_bytes, message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL, compression=None):
+    """
+    Hides the message in encoded image bytes and returns the carrier as PNG bytes.
+
+    Top-level and free of Flask state so it can run in a process pool.
+    """
+    img = decode_image_bytes(image_bytes)
+    img = hide_message_in_array(img, message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl)
+    return encode_png(img, compression)
+
+
+def hide_payload_in_bytes(image_bytes, data, compression=None):
+    """
+    Embeds a packed container or shard into encoded image bytes and returns PNG bytes.
+
+    Top-level and free of Flask state so it can run in a process pool.
+    """
+    return encode_png(embed_payload(decode_image_bytes(image_bytes), data), compression)
+
+
+def carrier_capacity(image_bytes):
+    """Payload bytes an encoded image can carry; reads only the header for PNG/BMP/PNM."""
+    return open_carrier(image_bytes).size // 8
+
+
+def hide_message_across_bytes(images, message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl=DEFAULT_TTL, compression=None, executor=None):
+    """
+    Hides one message split across several carriers, for messages too large for any one of them.
+
+    The container is encrypted once and split into shards sized to each
+    carrier's capacity (see stego_container.split_container). /decrypt
+    reassembles them from all the carriers' URLs, in any order.
+
+    Args:
+        images (list): Encoded carrier images.
+        executor (concurrent.futures.Executor or None): Embeds the shards in
+            parallel when given, e.g. the /encrypt-batch process pool.
+
+    Returns:
+        list: PNG bytes per carrier, in input order.
+    """
+    data = build_container(message, lat, lon, keyword, machine_id, start_timestamp, end_timestamp, ttl)
+    shards = split_container(data, [carrier_capacity(image) for image in images])
+    mapper = executor.map if executor is not None else map
+    return list(mapper(hide_payload_in_bytes, images, shards, [compression] * len(images)))
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The service modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests that import the app keep its stores in memory and skip the warm-up thread
+os.environ.setdefault("STEGO_LOCATION_BACKEND", "memory")
+os.environ.setdefault("STEGO_JOB_BACKEND", "memory")
+os.environ.setdefault("STEGO_WARMUP", "0")
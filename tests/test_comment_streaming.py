@@ -0,0 +1,139 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import comment_scraper
+from comment_cache import CommentCache, MemoryCommentStore
+from comment_scraper import PrefetchedPages
+
+URL = "https://www.youtube.com/watch?v=abc"
+
+
+class StubPages:
+    """A scraper stand-in that counts pages fetched and records being closed."""
+
+    def __init__(self, pages=10, delay=0.0, fail_after=None):
+        self.pages = pages
+        self.delay = delay
+        self.fail_after = fail_after
+        self.fetched = 0
+        self.calls = 0
+        self.closed = threading.Event()
+
+    def __call__(self, url=None, stop=None):
+        self.calls += 1
+        return self._generate(stop)
+
+    def _generate(self, stop):
+        try:
+            for i in range(self.pages):
+                if self.fail_after is not None and i == self.fail_after:
+                    raise RuntimeError("scraper failed")
+                if stop is not None:
+                    if stop.wait(self.delay):
+                        return
+                elif self.delay:
+                    time.sleep(self.delay)
+                self.fetched += 1
+                yield [f"comment {i}"]
+        finally:
+            self.closed.set()
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        yield pool
+
+
+def test_prefetched_pages_stop_early_and_close_generator(executor):
+    stub = StubPages(pages=50)
+    pages = PrefetchedPages(stub(), executor, depth=2)
+    assert pages.next_page() == ["comment 0"]
+    assert pages.next_page() == ["comment 1"]
+    pages.close()
+
+    assert stub.closed.wait(2)
+    # Never more than `depth` pages ahead of the consumer, plus the one being put
+    assert stub.fetched <= 5 < stub.pages
+
+
+def test_close_interrupts_scraper_waiting_for_next_page(executor):
+    stub = StubPages(pages=3, delay=30)
+    stop = threading.Event()
+    PrefetchedPages(stub(stop=stop), executor, stop=stop).close()
+
+    assert stub.closed.wait(2)
+    assert stub.fetched == 0
+
+
+def test_concurrent_streams_share_one_scrape(executor):
+    cache = CommentCache(MemoryCommentStore())
+    stub = StubPages(pages=5, delay=0.02)
+    start = threading.Barrier(5)
+
+    def read():
+        start.wait()
+        return [page for page in cache.stream(URL, stub)]
+
+    results = [future.result(5) for future in [executor.submit(read) for _ in range(5)]]
+
+    assert stub.calls == 1
+    # Each reader sees every page once, whether it led or followed
+    for pages in results:
+        assert [c for page in pages for c in page] == [f"comment {i}" for i in range(5)]
+    assert cache.stats()["deduplicated"] == 4
+    assert list(cache.stream(URL, stub)) == [[f"comment {i}" for i in range(5)]]
+    assert stub.calls == 1
+
+
+def test_follower_reads_on_after_leader_stops(executor):
+    cache = CommentCache(MemoryCommentStore())
+    stub = StubPages(pages=6, delay=0.02)
+    leader = cache.stream(URL, stub)
+    assert next(leader) == ["comment 0"]
+    follower = cache.stream(URL, stub)
+    assert next(follower) == ["comment 0"]
+
+    leader.close()
+    assert [c for page in follower for c in page] == [f"comment {i}" for i in range(1, 6)]
+    assert stub.calls == 1
+    # The scrape ran to its last page for the follower, so it is cached
+    assert cache.store.get("https://youtube.com/watch?v=abc") is not None
+
+
+def test_early_stop_is_not_cached():
+    cache = CommentCache(MemoryCommentStore())
+    stub = StubPages(pages=10)
+    pages = cache.stream(URL, stub)
+    next(pages)
+    pages.close()
+
+    assert stub.closed.is_set()
+    assert stub.fetched < 10
+    assert cache.store.get("https://youtube.com/watch?v=abc") is None
+
+
+def test_failed_scrape_is_not_cached_and_serves_stale():
+    cache = CommentCache(MemoryCommentStore(), ttl=60, stale_ttl=3600)
+    key = "https://youtube.com/watch?v=abc"
+    stub = StubPages(pages=5, fail_after=2)
+
+    assert list(cache.stream(URL, stub)) == [["comment 0"], ["comment 1"]]
+    assert cache.store.get(key) is None
+
+    cache.store.set(key, ["old comment"], time.time() - 120)
+    assert list(cache.stream(URL, StubPages(pages=5, fail_after=1))) == [["comment 0"], ["old comment"]]
+    assert cache.store.get(key)[0] == ["old comment"]
+    assert cache.stats()["stale_hits"] == 1
+
+
+def test_iter_comment_pages_reports_partial_scrapes(monkeypatch):
+    monkeypatch.setattr(comment_scraper, "iter_youtube_comment_pages", StubPages(pages=5, fail_after=2))
+    assert list(comment_scraper.iter_comment_pages(URL)) == [["comment 0"], ["comment 1"]]
+
+    monkeypatch.setattr(comment_scraper, "iter_youtube_comment_pages", StubPages(pages=5, fail_after=2))
+    with pytest.raises(RuntimeError):
+        list(comment_scraper.iter_comment_pages(URL, raise_errors=True))
@@ -0,0 +1,26 @@
+import pytest
+
+from config import env_flag, parse_flag
+
+
+@pytest.mark.parametrize("raw", ["1", "true", "YES", " on "])
+def test_true_spellings(raw):
+    assert parse_flag(raw) is True
+
+
+@pytest.mark.parametrize("raw", ["0", "false", "No", "off"])
+def test_false_spellings_override_a_true_default(raw):
+    assert parse_flag(raw, default=True) is False
+
+
+@pytest.mark.parametrize("raw", [None, "", "maybe"])
+def test_missing_or_unknown_uses_default(raw):
+    assert parse_flag(raw, default=True) is True
+    assert parse_flag(raw) is False
+
+
+def test_env_flag_reads_environment(monkeypatch):
+    monkeypatch.delenv("STEGO_TEST_FLAG", raising=False)
+    assert env_flag("STEGO_TEST_FLAG", True) is True
+    monkeypatch.setenv("STEGO_TEST_FLAG", "off")
+    assert env_flag("STEGO_TEST_FLAG", True) is False
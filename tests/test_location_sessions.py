@@ -0,0 +1,60 @@
+import io
+import os
+import subprocess
+import sys
+
+import pytest
+
+import final
+from location_store import LATEST_KEY
+
+LOCATION = {"senderEmail": "a@example.com", "latitude": 12.3456, "longitude": 77.5555, "deviceId": "device-1"}
+
+
+@pytest.fixture
+def client():
+    return final.app.test_client()
+
+
+def store(client, **extra):
+    return client.post("/store-location", json={**LOCATION, **extra})
+
+
+def encrypt(client, **fields):
+    return client.post("/encrypt", content_type="multipart/form-data", data={
+        "image": (io.BytesIO(b"not an image"), "carrier.png"), "message": "hi", "keyword": "coffee",
+        "startTimestamp": "2026-01-01T10:00", "endTimestamp": "2026-01-01T11:00", **fields})
+
+
+def test_server_mints_the_session_token(client):
+    response = store(client, sessionToken="guessable")
+    assert response.status_code == 200
+    token = response.get_json()["sessionToken"]
+    assert token != "guessable"
+    assert final.get_location_store().get("guessable") is None
+
+    # A live session minted here is refreshed in place
+    assert store(client, sessionToken=token).get_json()["sessionToken"] == token
+
+
+def test_latest_key_is_never_a_session(client, monkeypatch):
+    monkeypatch.setattr(final, "LATEST_LOCATION_FALLBACK", True)
+    assert store(client, sessionToken=LATEST_KEY).status_code == 400
+
+    store(client)
+    other_sender = final.app.test_client(use_cookies=False)
+    response = encrypt(other_sender, sessionToken=LATEST_KEY)
+    assert response.status_code == 400
+    assert "geolocation" in response.get_json()["error"]
+
+
+def test_no_token_is_rejected_without_fallback(client):
+    store(client)
+    assert encrypt(final.app.test_client(use_cookies=False)).status_code == 400
+
+
+def test_import_creates_no_store_files(tmp_path):
+    repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": repo, "STEGO_LOCATION_BACKEND": "sqlite", "STEGO_JOB_BACKEND": "sqlite"}
+    subprocess.run([sys.executable, "-c", "import final"], cwd=tmp_path, env=env, check=True, capture_output=True)
+    assert not list(tmp_path.glob("*.sqlite3*"))
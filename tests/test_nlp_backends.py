@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+import NLP_comment_and_keyword_analyser as analyser
+from benchmarks.bench_nlp_backends import PARITY_CORPUS
+from benchmarks.common import synthetic_comments
+
+huggingface_hub = pytest.importorskip("huggingface_hub")
+
+# Loading an uncached model would try to download it; only run where it is already on disk
+pytestmark = pytest.mark.skipif(
+    not isinstance(huggingface_hub.try_to_load_from_cache(analyser.MODEL_NAME, "config.json"), str),
+    reason=f"{analyser.MODEL_NAME} is not in the local Hugging Face cache",
+)
+
+MIN_COSINE = 0.98
+
+
+def _model(backend):
+    try:
+        return analyser.get_model(backend)
+    except Exception as e:
+        pytest.skip(f"{backend} backend unavailable: {e}")
+
+
+def _normalized(model, texts):
+    embeddings = model.encode(texts, convert_to_numpy=True)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("backend", analyser.BACKENDS)
+def test_backend_matches_fp32_keyword_picks(backend):
+    _model(backend)
+    for keywords, comments, expected in PARITY_CORPUS:
+        assert analyser.find_best_match(keywords, comments, backend=backend) == expected, (keywords, comments)
+
+
+@pytest.mark.parametrize("backend", [name for name in analyser.BACKENDS if name != "torch"])
+def test_backend_embeddings_stay_close_to_fp32(backend):
+    comments = synthetic_comments(128)
+    reference = _normalized(_model("torch"), comments)
+    embeddings = _normalized(_model(backend), comments)
+    assert float(np.mean(np.sum(embeddings * reference, axis=1))) >= MIN_COSINE
@@ -0,0 +1,128 @@
+import gc
+import os
+import threading
+import time
+import weakref
+
+import numpy as np
+import pytest
+
+from comment_cache import SQLiteCommentStore
+from embedding_cache import SQLiteEmbeddingStore
+from job_queue import SQLiteJobStore, DONE, dedup_key, new_job_id
+from location_store import SQLiteLocationStore
+from sqlite_store import ThreadConnections
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+
+
+def _in_child(fn):
+    """Runs fn() in a forked child; returns its exit status (0 when fn returned True)."""
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if fn() else 1)
+        except BaseException:
+            os._exit(2)
+    return os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1])
+
+
+def test_location_store_reopens_connection_after_fork(tmp_path):
+    store = SQLiteLocationStore(str(tmp_path / "locations.sqlite3"))
+    store.put("parent", {"latitude": 1.0})
+    parent_conn = store._connections.get()
+
+    def child():
+        store.put("child", {"latitude": 2.0})
+        return store._connections.get() is not parent_conn and store.get("parent") == {"latitude": 1.0}
+
+    assert _in_child(child) == 0
+    assert store.get("child") == {"latitude": 2.0}
+    assert store._connections.get() is parent_conn
+
+
+def test_job_store_reopens_connection_after_fork(tmp_path):
+    store = SQLiteJobStore(str(tmp_path / "jobs.sqlite3"))
+    store.claim("key", "job", time.time() + 60)
+    parent_conn = store._connections.get()
+
+    def child():
+        store.update("job", DONE, time.time() + 60, body={"ok": True}, http_status=200)
+        return store._connections.get() is not parent_conn
+
+    assert _in_child(child) == 0
+    assert store.get("job")["status"] == DONE
+    assert store._connections.get() is parent_conn
+
+
+def test_comment_store_reopens_connection_after_fork(tmp_path):
+    store = SQLiteCommentStore(str(tmp_path / "comments.sqlite3"))
+    store.set("post", ["parent"], time.time())
+    parent_conn = store._connections.get()
+
+    def child():
+        store.set("post", ["child"], time.time())
+        return store._connections.get() is not parent_conn
+
+    assert _in_child(child) == 0
+    assert store.get("post")[0] == ["child"]
+    assert store._connections.get() is parent_conn
+
+
+def test_embedding_store_reopens_connection_after_fork(tmp_path):
+    store = SQLiteEmbeddingStore(str(tmp_path / "embeddings.sqlite3"))
+    key = ("model", b"hash")
+    parent_conn = store._connections.get()
+
+    def child():
+        store.put_many("model", [(key, np.ones(4, dtype=np.float32))])
+        return store._connections.get() is not parent_conn
+
+    assert _in_child(child) == 0
+    assert store.get_many("model", [key])[key].tolist() == [1.0] * 4
+    assert store._connections.get() is parent_conn
+
+
+def test_job_store_keeps_no_plaintext_on_disk(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    store = SQLiteJobStore(str(path))
+    key = dedup_key({"image_url": "https://example.com/a.png", "keywords": "coffee"})
+    job_id = new_job_id()
+
+    assert store.claim(key, job_id, time.time() + 60) == (job_id, True)
+    assert store.claim(key, new_job_id(), time.time() + 60) == (job_id, False)
+    store.update(job_id, DONE, time.time() + 60, body={"message": "meet me at the old pier"}, http_status=200)
+
+    job = store.get(job_id)
+    assert job["body"] == {"message": "meet me at the old pier"}
+    assert store.get(new_job_id()) is None
+
+    on_disk = b"".join(p.read_bytes() for p in tmp_path.iterdir())
+    assert b"old pier" not in on_disk
+    assert job_id.encode() not in on_disk
+
+
+def test_thread_connections_open_lazily_per_thread(tmp_path):
+    connections = ThreadConnections(str(tmp_path / "lazy.sqlite3"))
+    assert not (tmp_path / "lazy.sqlite3").exists()
+
+    main_conn = connections.get()
+    assert connections.get() is main_conn
+    other = []
+    thread = threading.Thread(target=lambda: other.append(connections.get()))
+    thread.start()
+    thread.join()
+    assert other[0] is not main_conn
+
+
+@pytest.mark.parametrize("make_store", [
+    lambda path: SQLiteLocationStore(path),
+    lambda path: SQLiteCommentStore(path),
+    lambda path: SQLiteEmbeddingStore(path),
+])
+def test_dropped_store_is_freed(tmp_path, make_store):
+    store = make_store(str(tmp_path / "store.sqlite3"))
+    ref = weakref.ref(store)
+    del store
+    gc.collect()
+    assert ref() is None
@@ -0,0 +1,55 @@
+import cv2
+import numpy as np
+import pytest
+
+from carrier_io import open_carrier, read_carrier_container
+from stego_codec import extract_lsb
+from stego_container import FORMAT_BINARY, FORMAT_LEGACY, LEGACY_DELIMITER, decode_legacy, read_container
+from stego_crypto import generate_key, decrypt_message
+from stego_encoder import hide_message_in_image
+
+MESSAGE = "meet me at the old pier"
+LAT, LON, KEYWORD, MACHINE_ID = 12.3456, 77.5555, "coffee", "test-device"
+START, END = 1_700_000_000, 1_900_000_000
+
+
+def _carrier(path, channels=3):
+    shape = (48, 64, channels) if channels > 1 else (48, 64)
+    cv2.imwrite(str(path), np.random.default_rng(0).integers(0, 256, size=shape, dtype=np.uint8))
+    return str(path)
+
+
+def _decrypt(fields):
+    key = generate_key(LAT, LON, KEYWORD, MACHINE_ID)
+    return decrypt_message(key, fields["iv"], fields["tag"], fields["msg"]).decode()
+
+
+@pytest.mark.parametrize("container_format", [FORMAT_BINARY, FORMAT_LEGACY])
+@pytest.mark.parametrize("ext", [".png", ".bmp"])
+def test_hide_then_read_container(tmp_path, container_format, ext):
+    source = _carrier(tmp_path / f"carrier{ext}")
+    output = str(tmp_path / f"stego{ext}")
+    hide_message_in_image(source, MESSAGE, output, LAT, LON, KEYWORD, MACHINE_ID, START, END,
+                          container_format=container_format)
+
+    fields = read_container(cv2.imread(output, cv2.IMREAD_UNCHANGED))
+    assert _decrypt(fields) == MESSAGE
+    assert (fields["start_timestamp"], fields["end_timestamp"]) == (START, END)
+    # The streaming reader used by /decrypt sees the same container
+    assert read_carrier_container(open_carrier(output)) == fields
+
+
+def test_legacy_payload_is_delimited(tmp_path):
+    output = str(tmp_path / "stego.png")
+    hide_message_in_image(_carrier(tmp_path / "carrier.png"), MESSAGE, output, LAT, LON, KEYWORD, MACHINE_ID,
+                          START, END, container_format=FORMAT_LEGACY)
+
+    payload = extract_lsb(cv2.imread(output, cv2.IMREAD_UNCHANGED), LEGACY_DELIMITER)
+    assert payload is not None
+    assert _decrypt(decode_legacy(payload)) == MESSAGE
+
+
+def test_message_too_large_for_carrier(tmp_path):
+    with pytest.raises(ValueError):
+        hide_message_in_image(_carrier(tmp_path / "carrier.png"), "x" * 10_000, str(tmp_path / "stego.png"),
+                              LAT, LON, KEYWORD, MACHINE_ID, START, END)
@@ -0,0 +1,46 @@
+import pytest
+
+import warmup
+
+
+@pytest.fixture(autouse=True)
+def fresh_state(monkeypatch):
+    warmup._reset_after_fork()
+    monkeypatch.setattr(warmup, "BACKOFF", 0)
+    monkeypatch.setenv("STEGO_WARMUP_STEPS", "flaky,broken")
+    yield
+    warmup._reset_after_fork()
+
+
+def failing(times):
+    calls = []
+
+    def step():
+        calls.append(1)
+        if len(calls) <= times:
+            raise RuntimeError("model download timed out")
+    step.calls = calls
+    return step
+
+
+def test_transient_failure_is_retried(monkeypatch):
+    flaky = failing(2)
+    monkeypatch.setattr(warmup, "STEPS", {"flaky": flaky, "broken": lambda: None})
+    warmup.run()
+
+    assert len(flaky.calls) == 3
+    state = warmup.status()
+    assert state["ready"] and state["status"] == warmup.READY
+    assert set(state["steps"]) == {"flaky", "broken"}
+
+
+def test_persistent_failure_reports_degraded_but_ready(monkeypatch):
+    broken = failing(100)
+    monkeypatch.setattr(warmup, "STEPS", {"flaky": lambda: None, "broken": broken})
+    warmup.run()
+
+    assert len(broken.calls) == warmup.RETRIES + 1
+    state = warmup.status()
+    assert state["ready"] and state["status"] == warmup.DEGRADED
+    assert "broken" in state["error"]
+    assert list(state["steps"]) == ["flaky"]
@@ -0,0 +1,171 @@
+import base64
+import os
+import threading
+import time
+import traceback
+
+import numpy as np
+
+from config import env_flag
+import startup_report
+
+# Warm-up: runs the request hot paths once on synthetic inputs at worker boot,
+# so the first real /decrypt does not pay model load, torch lazy init,
+# tokenizer and OpenCV/PNG codec setup. /readyz reports ready once it is done.
+#
+#   STEGO_WARMUP=0            skip warm-up; /readyz is ready immediately
+#   STEGO_WARMUP_STEPS=...    comma-separated subset of STEPS, in order
+#   STEGO_WARMUP_RETRIES=3    retries of a failing step, STEGO_WARMUP_BACKOFF
+#                             seconds apart, doubling each time
+#
+# A step that still fails after its retries does not keep the worker out of
+# rotation: the request path loads lazily and pays that cost on first use,
+# so the worker reports "degraded" and ready.
+ENABLED = env_flag("STEGO_WARMUP", True)
+RETRIES = int(os.getenv("STEGO_WARMUP_RETRIES", "3"))
+BACKOFF = float(os.getenv("STEGO_WARMUP_BACKOFF", "5"))
+
+PENDING = "pending"
+RUNNING = "running"
+READY = "ready"
+DEGRADED = "degraded"
+
+WARMUP_KEYWORDS = ["sunset", "coffee", "mountain bike"]
+WARMUP_COMMENTS = ["first coffee of the day", "what a sunset over the bay", "new bike, who dis",
+                   "warming up before the ride", "lovely photo"]
+
+
+def _warm_nlp():
+    from NLP_comment_and_keyword_analyser import find_best_match, get_model, DEFAULT_BATCH_SIZE
+
+    # A direct encode runs inference even if the embedding cache already holds these texts
+    get_model().encode(WARMUP_KEYWORDS + WARMUP_COMMENTS, batch_size=DEFAULT_BATCH_SIZE, convert_to_numpy=True)
+    find_best_match(WARMUP_KEYWORDS, WARMUP_COMMENTS)
+
+
+def _warm_codec():
+    from carrier_io import open_carrier, read_carrier_container
+    from stego_encoder import hide_message_in_array, encode_png, decode_image_bytes
+
+    img = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    png = encode_png(hide_message_in_array(img, "warm-up", 12.345, 67.891, "coffee", "warmup", 0, 1))
+    decode_image_bytes(png)
+    read_carrier_container(open_carrier(png))
+
+
+def _warm_crypto():
+    from stego_crypto import generate_key, encrypt_message, decrypt_message
+
+    key = generate_key(12.345, 67.891, "coffee", "warmup")
+    iv, tag, ciphertext = encrypt_message("warm-up", key)
+    decrypt_message(key, iv, tag, base64.b64decode(ciphertext))
+
+
+# name -> step; run in this order
+STEPS = {
+    "crypto": _warm_crypto,
+    "codec": _warm_codec,
+    "nlp": _warm_nlp,
+}
+
+_lock = threading.Lock()
+_state = {"status": PENDING, "steps": {}, "error": None, "started_at": None, "finished_at": None}
+_started = False
+
+
+def _reset_after_fork():
+    """A forked worker warms itself up; the parent's thread and status do not carry over."""
+    global _lock, _started, _state
+    _lock = threading.Lock()
+    _started = False
+    _state = {"status": PENDING, "steps": {}, "error": None, "started_at": None, "finished_at": None}
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _selected_steps():
+    names = [name.strip() for name in os.getenv("STEGO_WARMUP_STEPS", ",".join(STEPS)).split(",") if name.strip()]
+    unknown = [name for name in names if name not in STEPS]
+    if unknown:
+        print(f"⚠️ Unknown warm-up step(s) ignored: {', '.join(unknown)}")
+    return [name for name in names if name in STEPS]
+
+
+def _run_step(name):
+    """Runs one step, retrying with exponential backoff. Returns its seconds, or raises the last error."""
+    for attempt in range(RETRIES + 1):
+        start = time.perf_counter()
+        try:
+            STEPS[name]()
+            return time.perf_counter() - start
+        except Exception as e:
+            traceback.print_exc()
+            if attempt == RETRIES:
+                raise
+            delay = BACKOFF * 2 ** attempt
+            print(f"⚠️ Warm-up step '{name}' failed ({e}); retrying in {delay:.0f}s")
+            time.sleep(delay)
+
+
+def run():
+    """Runs the selected warm-up steps in this thread and records their timings."""
+    with _lock:
+        _state.update(status=RUNNING, started_at=time.time())
+
+    errors = []
+    for name in _selected_steps():
+        try:
+            seconds = _run_step(name)
+        except Exception as e:
+            errors.append(f"{name}: {e}")
+            print(f"❌ Warm-up step '{name}' failed after {RETRIES} retries: {e}")
+            continue
+        startup_report.record(f"warmup_{name}", seconds)
+        with _lock:
+            _state["steps"][name] = seconds
+
+    with _lock:
+        _state.update(status=DEGRADED if errors else READY, error="; ".join(errors) or None,
+                      finished_at=time.time())
+        total = _state["finished_at"] - _state["started_at"]
+    print(f"{'⚠️' if errors else '✅'} Warm-up finished in {total:.2f}s (pid {os.getpid()})")
+
+
+def start():
+    """
+    Starts warm-up in a background thread, once per process.
+
+    The server accepts connections meanwhile, so liveness checks pass while
+    readiness (see status()) still reports not ready.
+    """
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+        if not ENABLED:
+            _state.update(status=READY, started_at=time.time(), finished_at=time.time())
+            return
+    threading.Thread(target=run, name="warmup", daemon=True).start()
+
+
+def status():
+    """
+    Warm-up status of this process.
+
+    Returns:
+        dict: {"ready": bool, "status": str, "steps": {name: seconds},
+        "total": seconds or None, "error": str or None}. A degraded worker
+        (some step kept failing) is ready.
+    """
+    with _lock:
+        state = dict(_state, steps=dict(_state["steps"]))
+    finished = state["finished_at"] is not None and state["started_at"] is not None
+    return {
+        "ready": state["status"] in (READY, DEGRADED),
+        "status": state["status"],
+        "steps": {name: round(seconds, 4) for name, seconds in state["steps"].items()},
+        "total": round(state["finished_at"] - state["started_at"], 4) if finished else None,
+        "error": state["error"],
+    }
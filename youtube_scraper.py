@@ -1,10 +1,25 @@
 import os
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
 from urllib.parse import urlparse, parse_qs
 
+import client_registry
+
 # Get YouTube API key from environment
 YOUTUBE_API_KEY = os.getenv("YOUTUBE_API_KEY")
 
+# Default number of comments fetched per video
+MAX_COMMENTS = 500
+
+def _build_youtube_client():
+    # Built once per process: parsing the discovery document is the expensive part
+    return build('youtube', 'v3', developerKey=YOUTUBE_API_KEY, cache_discovery=False)
+
+# The service object is shared; its httplib2 transport is not thread-safe,
+# so every thread executes requests over its own persistent connection.
+client_registry.register("youtube", _build_youtube_client)
+client_registry.register("youtube_http", build_http, per_thread=True)
+
 def extract_video_id(url):
     parsed_url = urlparse(url)
 
@@ -19,36 +34,39 @@ def extract_video_id(url):
         return parsed_url.path[1:]
     return None
 
-def fetch_youtube_comments(video_url):
+def iter_youtube_comment_pages(video_url, max_comments=MAX_COMMENTS):
+    """Yields one list of comments per commentThreads page, requesting the next page only when asked."""
     if not YOUTUBE_API_KEY:
         raise Exception("❌ YouTube API key not found. Please set 'YOUTUBE_API_KEY' in your .env file.")
 
     video_id = extract_video_id(video_url)
     if not video_id:
         print("❌ Invalid YouTube URL or unable to extract video ID")
-        return []
+        return
 
-    youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
+    youtube = client_registry.get("youtube")
+    http = client_registry.get("youtube_http")
 
-    comments = []
+    fetched = 0
     next_page_token = None
 
-    while len(comments) < max_comments:
+    while fetched < max_comments:
         request = youtube.commentThreads().list(
             part='snippet',
             videoId=video_id,
-            maxResults=min(100, max_comments - len(comments)),
+            maxResults=min(100, max_comments - fetched),
             pageToken=next_page_token,
             textFormat='plainText'
         )
-        response = request.execute()
+        response = request.execute(http=http)
 
-        for item in response.get('items', []):
-            comment = item['snippet']['topLevelComment']['snippet']['textDisplay']
-            comments.append(comment)
+        page = [item['snippet']['topLevelComment']['snippet']['textDisplay'] for item in response.get('items', [])]
+        fetched += len(page)
+        yield page
 
         next_page_token = response.get('nextPageToken')
         if not next_page_token:
             break
 
-    return comments
+def fetch_youtube_comments(video_url, max_comments=MAX_COMMENTS):
+    return [comment for page in iter_youtube_comment_pages(video_url, max_comments) for comment in page]